@@ -0,0 +1,169 @@
+"""
+Genera un juegos.db sintético con volúmenes del tamaño de RAWG, con el
+esquema base de database/migraciones/001_esquema.sql, para que los
+benchmarks sean reproducibles sin descargar nada.
+
+    python -m benchmarks.catalogo_sintetico --salida benchmarks/datos/juegos.db
+
+Por defecto: ~50 consolas, 500k juegos y 800k filas en JUEGOS_CONSOLAS, con
+una fracción de ellas con RUTA_NUBE. Los nombres se forman con palabras de
+un vocabulario con frecuencias Zipf (unas pocas palabras, como en "Super
+Mario" o "Soccer", aparecen en miles de juegos y la mayoría en muy pocos),
+que es lo que hace caras las búsquedas por texto. Con la misma semilla el
+fichero sale idéntico.
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import time
+
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), os.pardir, "database", "migraciones", "001_esquema.sql")
+PRINCIPIO_RUTA = os.getenv("PRINCIPIO_RUTA", "")
+
+EMPRESAS = [
+    "Nintendo", "Sega", "Sony", "Microsoft", "Atari", "SNK", "NEC", "Bandai",
+    "Commodore", "Amstrad", "Sinclair", "Mattel", "Coleco", "Philips", "3DO",
+]
+MODELOS = [
+    "Entertainment System", "Master System", "Mega Drive", "Game Boy", "Saturn",
+    "PlayStation", "Neo Geo", "PC Engine", "WonderSwan", "Amiga", "CPC", "Spectrum",
+    "Intellivision", "ColecoVision", "CD-i", "Interactive Multiplayer", "Lynx",
+    "Jaguar", "Game Gear", "Dreamcast", "Xbox", "64", "GameCube", "Portable", "Advance",
+]
+# Palabras frecuentes en títulos reales; el resto del vocabulario es sintético
+PALABRAS_REALES = [
+    "super", "the", "of", "world", "legend", "mario", "soccer", "racing", "fighter",
+    "dragon", "star", "wars", "final", "fantasy", "quest", "sonic", "street", "ninja",
+    "adventure", "battle", "tennis", "golf", "zelda", "castle", "kong", "pro", "tetris",
+    "mega", "man", "knight", "space", "island", "puzzle", "metal", "gear", "night",
+]
+SILABAS = ["ka", "ro", "mi", "ta", "zu", "ne", "lo", "ga", "ri", "do", "sha", "ven", "tor", "qua", "bel", "xi"]
+
+
+def vocabulario(tamano: int, rnd: random.Random) -> list:
+    palabras = list(PALABRAS_REALES)
+    vistas = set(palabras)
+    while len(palabras) < tamano:
+        palabra = "".join(rnd.choice(SILABAS) for _ in range(rnd.randint(2, 4)))
+        if palabra not in vistas:
+            vistas.add(palabra)
+            palabras.append(palabra)
+    return palabras
+
+
+def pesos_zipf(n: int, s: float) -> list:
+    """Pesos acumulados de una Zipf de exponente s sobre n rangos."""
+    return list(itertools.accumulate(1 / (rango ** s) for rango in range(1, n + 1)))
+
+
+def generar(args) -> dict:
+    rnd = random.Random(args.semilla)
+    if os.path.exists(args.salida):
+        os.remove(args.salida)
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(args.salida)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    with open(SCHEMA_FILE, encoding="utf-8") as f:
+        conn.executescript(f.read())
+
+    empresas = [(i, nombre) for i, nombre in enumerate(EMPRESAS, 1)]
+    consolas = []
+    nombres_consola = set()
+    while len(consolas) < args.consolas:
+        empresa_id, empresa = rnd.choice(empresas)
+        nombre = f"{empresa} {rnd.choice(MODELOS)}"
+        if nombre in nombres_consola:
+            nombre = f"{nombre} {len(consolas) + 1}"
+        nombres_consola.add(nombre)
+        consolas.append((len(consolas) + 1, nombre, empresa_id))
+    conn.executemany("INSERT INTO EMPRESAS (ID, NOMBRE) VALUES (?, ?)", empresas)
+
+    # Unas consolas tienen muchos más juegos que otras, como en RAWG
+    pesos_consola = pesos_zipf(len(consolas), 0.8)
+    palabras = vocabulario(args.vocabulario, rnd)
+    pesos_palabra = pesos_zipf(len(palabras), args.zipf)
+
+    def nombre_juego() -> str:
+        nombre = " ".join(rnd.choices(palabras, cum_weights=pesos_palabra, k=rnd.randint(1, 5))).title()
+        if rnd.random() < 0.2:
+            nombre += f" {rnd.randint(2, 6)}"
+        return nombre
+
+    juegos = []
+    for juego_id in range(1, args.juegos + 1):
+        anio = rnd.randint(1977, 2024)
+        juegos.append((
+            juego_id,
+            nombre_juego(),
+            f"{anio}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            " ".join(rnd.choices(palabras, cum_weights=pesos_palabra, k=args.palabras_descripcion)),
+            rnd.choice(EMPRESAS),
+        ))
+    conn.executemany(
+        "INSERT INTO JUEGOS (ID, NOMBRE, FECHA_LANZAMIENTO, DESCRIPCION, PUBLISHERS) VALUES (?, ?, ?, ?, ?)",
+        juegos
+    )
+
+    # Cada juego en una consola y el resto de relaciones en consolas adicionales
+    relaciones = {}
+    for juego_id in range(1, args.juegos + 1):
+        relaciones[(juego_id, rnd.choices(consolas, cum_weights=pesos_consola)[0][0])] = None
+    while len(relaciones) < args.relaciones:
+        clave = (rnd.randint(1, args.juegos), rnd.choices(consolas, cum_weights=pesos_consola)[0][0])
+        relaciones.setdefault(clave, None)
+    empresa_de = dict(empresas)
+    consola_de = {cid: (nombre, empresa_id) for cid, nombre, empresa_id in consolas}
+    filas_relacion = []
+    con_ruta = 0
+    for juego_id, consola_id in relaciones:
+        ruta = ""
+        if rnd.random() < args.fraccion_nube:
+            nombre, empresa_id = consola_de[consola_id]
+            ruta = f"{PRINCIPIO_RUTA}/{empresa_de[empresa_id]}/{nombre}/{juegos[juego_id - 1][1]}.zip"
+            con_ruta += 1
+        filas_relacion.append((juego_id, consola_id, ruta))
+    cuenta = {}
+    for _, consola_id, _ in filas_relacion:
+        cuenta[consola_id] = cuenta.get(consola_id, 0) + 1
+    conn.executemany(
+        "INSERT INTO CONSOLAS (ID, NOMBRE, EMPRESA_ID, NUM_JUEGOS_API) VALUES (?, ?, ?, ?)",
+        [(cid, nombre, empresa_id, cuenta.get(cid, 0)) for cid, nombre, empresa_id in consolas]
+    )
+    conn.executemany("INSERT INTO JUEGOS_CONSOLAS (JUEGO_ID, CONSOLA_ID, RUTA_NUBE) VALUES (?, ?, ?)", filas_relacion)
+    conn.commit()
+    conn.close()
+    return {
+        "salida": args.salida,
+        "semilla": args.semilla,
+        "empresas": len(empresas),
+        "consolas": len(consolas),
+        "juegos": args.juegos,
+        "juegos_consolas": len(filas_relacion),
+        "con_ruta_nube": con_ruta,
+        "bytes": os.path.getsize(args.salida),
+        "segundos": round(time.perf_counter() - inicio, 1),
+    }
+
+
+def argumentos(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    parser.add_argument("--salida", default=os.path.join("benchmarks", "datos", "juegos.db"))
+    parser.add_argument("--consolas", type=int, default=50)
+    parser.add_argument("--juegos", type=int, default=500_000)
+    parser.add_argument("--relaciones", type=int, default=800_000, help="filas de JUEGOS_CONSOLAS")
+    parser.add_argument("--fraccion-nube", type=float, default=0.3, help="fracción de relaciones con RUTA_NUBE")
+    parser.add_argument("--vocabulario", type=int, default=20_000, help="palabras distintas en los nombres")
+    parser.add_argument("--zipf", type=float, default=1.1, help="exponente de la Zipf de las palabras")
+    parser.add_argument("--palabras-descripcion", type=int, default=30)
+    parser.add_argument("--semilla", type=int, default=42)
+    return parser
+
+
+if __name__ == "__main__":
+    args = argumentos(argparse.ArgumentParser(description="Catálogo sintético para benchmarks")).parse_args()
+    if args.relaciones < args.juegos:
+        raise SystemExit("--relaciones no puede ser menor que --juegos (cada juego está en una consola)")
+    print(generar(args))
@@ -0,0 +1,18 @@
+import statistics
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return round(valores[min(len(valores) - 1, int(len(valores) * p))] * 1000, 1)
+
+
+def resumen_latencias(latencias):
+    return {
+        "peticiones": len(latencias),
+        "p50_ms": percentil(latencias, 0.50),
+        "p95_ms": percentil(latencias, 0.95),
+        "p99_ms": percentil(latencias, 0.99),
+        "media_ms": round(statistics.mean(latencias) * 1000, 1) if latencias else None,
+    }
@@ -0,0 +1,139 @@
+"""
+Compara las consultas de GameService con y sin los índices de la migración
+010 (IDX_JUEGOS_NOMBRE es el que rehace la 012) y sus estadísticas de ANALYZE
+sobre el mismo catálogo sintético.
+
+    python -m benchmarks.catalogo_sintetico
+    python -m benchmarks.indices --datos benchmarks/datos/juegos.db
+
+La variante "sin_indices" es una copia de la base de datos ya migrada a la
+que se le quitan esos índices y sqlite_stat1, y que pagina todas las
+consolas con el plan de antes (ordenando la consola entera).
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.comun import resumen_latencias
+from benchmarks.suite import RAIZ, entorno, preparar_entorno
+
+INDICES_010 = ("IDX_CONSOLAS_EMPRESA", "IDX_JUEGOS_CONSOLAS_JUEGO_CON_RUTA", "IDX_JUEGOS_NOMBRE")
+
+
+def preparar_bases() -> dict:
+    """database.db migrada e importada y su copia sin los índices de la 010."""
+    from database.database import DB_FILE, cerrar_pool, init_db
+    from services.database_service import DatabaseService
+
+    init_db()
+    DatabaseService.merge_juegos_db()
+    cerrar_pool()
+    sin_indices = os.path.join(os.path.dirname(DB_FILE), "sin_indices.db")
+    shutil.copyfile(DB_FILE, sin_indices)
+    conn = sqlite3.connect(sin_indices)
+    for indice in INDICES_010:
+        conn.execute(f"DROP INDEX IF EXISTS {indice}")
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        conn.execute("DELETE FROM sqlite_stat1")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    return {"con_indices": DB_FILE, "sin_indices": sin_indices}
+
+
+def consultas(db: sqlite3.Connection) -> dict:
+    """Las consultas a medir, con parámetros elegidos sobre el propio catálogo."""
+    from services.game_service import GameService
+
+    por_consola = db.execute(
+        "SELECT CONSOLA_ID, EMPRESA_ID FROM CONSOLAS_DISPONIBLES ORDER BY NUM_JUEGOS DESC"
+    ).fetchall()
+    grande, empresa = por_consola[0]
+    pequena = por_consola[-1][0]
+    pagina = GameService.get_todos_juegos_por_consola(db, grande, limite=100)
+    despues = tuple(pagina[-1][1::-1]) if pagina else None
+    return {
+        "todas_consolas": lambda: GameService.get_todas_consolas(db),
+        "todas_consolas_pagina": lambda: GameService.get_todas_consolas(db, limite=50),
+        "consolas_empresa": lambda: GameService.get_consolas_por_empresa_todas(db, empresa),
+        "juegos_consola_grande_pagina": lambda: GameService.get_todos_juegos_por_consola(db, grande, limite=100),
+        "juegos_consola_grande_siguiente": lambda: GameService.get_todos_juegos_por_consola(
+            db, grande, limite=100, despues=despues
+        ),
+        "juegos_consola_pequena_pagina": lambda: GameService.get_todos_juegos_por_consola(db, pequena, limite=100),
+        "juegos_consola_grande_json": lambda: GameService.get_juegos_por_consola_json(db, grande),
+        "buscar_palabra_comun": lambda: GameService.search_all(db, "super", "games", limite=50),
+        "buscar_dos_palabras": lambda: GameService.search_all(db, "super mario", "games", limite=50),
+    }
+
+
+def medir(path: str, recorrer_por_nombre: bool, repeticiones: int) -> dict:
+    from services import game_service
+    from services.paginacion import ContadorCache
+
+    fraccion = game_service.FRACCION_RECORRIDO_NOMBRE
+    if not recorrer_por_nombre:
+        game_service.FRACCION_RECORRIDO_NOMBRE = float("inf")
+    ContadorCache.invalidar()
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        resultado = {}
+        for nombre, consulta in consultas(db).items():
+            consulta()
+            latencias = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                consulta()
+                latencias.append(time.perf_counter() - inicio)
+            resultado[nombre] = resumen_latencias(latencias)
+        return resultado
+    finally:
+        db.close()
+        game_service.FRACCION_RECORRIDO_NOMBRE = fraccion
+        ContadorCache.invalidar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas del catálogo con y sin los índices de la migración 010")
+    parser.add_argument("--datos", default=os.path.join(RAIZ, "benchmarks", "datos", "juegos.db"),
+                        help="juegos.db generado con benchmarks.catalogo_sintetico")
+    parser.add_argument("--salida", help="fichero JSON de resultados")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+    if not os.path.exists(args.datos):
+        raise SystemExit(f"No existe {args.datos}; genéralo con: python -m benchmarks.catalogo_sintetico")
+
+    salida = os.path.abspath(args.salida) if args.salida else None
+    args.trabajo = tempfile.mkdtemp(prefix="retrocloud-indices-")
+    trabajo = preparar_entorno(args)
+    try:
+        bases = preparar_bases()
+        resultado = {
+            "entorno": entorno(),
+            "parametros": {"datos": args.datos, "repeticiones": args.repeticiones},
+            "con_indices": medir(bases["con_indices"], True, args.repeticiones),
+            "sin_indices": medir(bases["sin_indices"], False, args.repeticiones),
+        }
+    finally:
+        os.chdir(RAIZ)
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+    if salida is None:
+        carpeta = os.path.join(RAIZ, "benchmarks", "resultados")
+        os.makedirs(carpeta, exist_ok=True)
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-indices-{resultado['entorno']['commit'] or 'sin-commit'}.json"
+        salida = os.path.join(carpeta, nombre)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    for consulta, con in resultado["con_indices"].items():
+        sin = resultado["sin_indices"][consulta]
+        print(f"{consulta:36} {sin['p50_ms']:>9} ms -> {con['p50_ms']:>9} ms")
+    print(f"Resultados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Carga mixta: logins concurrentes contra peticiones de catálogo.
+
+Mide cuántos logins por segundo salen (y cuántos se rechazan con 429) y la
+latencia del catálogo mientras tanto, frente a la del catálogo sin logins.
+La aplicación se ejecuta en el mismo proceso (ASGI), con su lifespan.
+
+    python -m benchmarks.login_mixto --segundos 10 --logins 32 --catalogo 8
+
+Crea un usuario temporal y lo borra al terminar.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+os.environ.setdefault("version", "benchmark")
+os.environ.setdefault("DATABASE", "benchmark")
+
+import httpx
+
+from benchmarks.comun import resumen_latencias
+from database.database import get_pool
+from main import app
+
+
+async def catalogo(cliente, ruta, fin, latencias):
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        r = await cliente.get(ruta)
+        r.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+
+
+async def logins(cliente, credenciales, fin, resultados):
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        r = await cliente.post("/auth/login", json=credenciales)
+        if r.status_code == 429:
+            resultados["rechazados"] += 1
+            await asyncio.sleep(float(r.headers.get("retry-after", "1")))
+            continue
+        r.raise_for_status()
+        resultados["latencias"].append(time.perf_counter() - inicio)
+
+
+async def fase(cliente, segundos, ruta, num_catalogo, num_logins, credenciales):
+    fin = time.perf_counter() + segundos
+    latencias_catalogo = []
+    resultados_login = {"latencias": [], "rechazados": 0}
+    tareas = [catalogo(cliente, ruta, fin, latencias_catalogo) for _ in range(num_catalogo)]
+    tareas += [logins(cliente, credenciales, fin, resultados_login) for _ in range(num_logins)]
+    await asyncio.gather(*tareas)
+    resultado = {"catalogo": resumen_latencias(latencias_catalogo)}
+    if num_logins:
+        resultado["login"] = {
+            **resumen_latencias(resultados_login["latencias"]),
+            "por_segundo": round(len(resultados_login["latencias"]) / segundos, 1),
+            "rechazados_429": resultados_login["rechazados"],
+        }
+    return resultado
+
+
+async def main(args):
+    credenciales = {"nombre": f"benchmark-{uuid.uuid4().hex[:8]}", "contraseña": uuid.uuid4().hex}
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=120) as cliente:
+            r = await cliente.post("/auth/register", json=credenciales)
+            r.raise_for_status()
+            try:
+                resultado = {
+                    "parametros": vars(args),
+                    "solo_catalogo": await fase(cliente, args.segundos, args.ruta, args.catalogo, 0, credenciales),
+                    "mixto": await fase(cliente, args.segundos, args.ruta, args.catalogo, args.logins, credenciales),
+                    "pool_hash": (await cliente.get("/health/hash")).json(),
+                }
+            finally:
+                with get_pool().escritor() as db:
+                    db.execute("DELETE FROM usuarios WHERE nombre = ?", (credenciales["nombre"],))
+                    db.commit()
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput de login frente a latencia del catálogo")
+    parser.add_argument("--segundos", type=float, default=10, help="duración de cada fase")
+    parser.add_argument("--logins", type=int, default=32, help="clientes haciendo login en bucle")
+    parser.add_argument("--catalogo", type=int, default=8, help="clientes pidiendo el catálogo en bucle")
+    parser.add_argument("--ruta", default="/consolas/all?limit=50", help="endpoint de catálogo a medir")
+    asyncio.run(main(parser.parse_args()))
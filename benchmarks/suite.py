@@ -0,0 +1,331 @@
+"""
+Batería de benchmarks sobre un catálogo sintético (ver catalogo_sintetico).
+
+Mide el arranque (init_db, importación de juegos.db y carga de los índices
+en memoria), la latencia de cada endpoint de catálogo y búsqueda con la caché
+de respuestas vacía y llena, el throughput de login y la velocidad de
+descarga de un archivo. Todo corre en el mismo proceso con un cliente ASGI,
+en una carpeta de trabajo aparte para no tocar database/database.db.
+
+    python -m benchmarks.catalogo_sintetico
+    python -m benchmarks.suite --datos benchmarks/datos/juegos.db
+
+El resultado se guarda en JSON (por defecto en benchmarks/resultados/, con
+la fecha y el commit en el nombre) para comparar ejecuciones entre sí.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from benchmarks.comun import resumen_latencias
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def preparar_entorno(args) -> str:
+    """Carpeta de trabajo con database/juegos.db y files/ para las descargas."""
+    trabajo = os.path.abspath(args.trabajo or tempfile.mkdtemp(prefix="retrocloud-bench-"))
+    os.makedirs(os.path.join(trabajo, "database"), exist_ok=True)
+    destino = os.path.join(trabajo, "database", "juegos.db")
+    if not os.path.exists(destino):
+        shutil.copyfile(os.path.abspath(args.datos), destino)
+    for fichero in ("database.db", "database.db-wal", "database.db-shm"):
+        path = os.path.join(trabajo, "database", fichero)
+        if os.path.exists(path):
+            os.remove(path)
+    # DB_FILE y juegos.db son rutas relativas al directorio actual
+    sys.path.insert(0, RAIZ)
+    os.chdir(trabajo)
+    os.environ.setdefault("version", "benchmark")
+    os.environ.setdefault("DATABASE", "benchmark")
+    os.environ["DIRECTORIO_JUEGOS"] = os.path.join(trabajo, "files")
+    return trabajo
+
+
+def cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    funcion(*args)
+    return round(time.perf_counter() - inicio, 3)
+
+
+def arranque() -> dict:
+    """Los pasos del lifespan de main.py, en primer plano para medir cada uno."""
+    from database.database import init_db
+    from ext_class.seguridad import MapaRoles
+    from services.blob_service import BlobService
+    from services.catalogo_service import CatalogoService
+    from services.database_service import DatabaseService
+    from services.fuzzy_service import FuzzyService
+    from services.suggest_service import SuggestService
+
+    return {
+        "init_db_s": cronometrar(init_db),
+        "merge_juegos_db_s": cronometrar(DatabaseService.merge_juegos_db),
+        "init_db_con_datos_s": cronometrar(init_db),
+        "roles_s": cronometrar(MapaRoles.cargar),
+        "blobs_s": cronometrar(BlobService.recolectar),
+        "fuzzy_s": cronometrar(FuzzyService.cargar),
+        "suggest_s": cronometrar(SuggestService.cargar),
+        "catalogo_s": cronometrar(CatalogoService.cargar),
+    }
+
+
+def elegir_parametros() -> dict:
+    """IDs y términos representativos del catálogo cargado."""
+    from database.database import get_pool
+
+    with get_pool().lector() as db:
+        consola_grande = db.execute(
+            "SELECT CONSOLA_ID FROM JUEGOS_CONSOLAS GROUP BY CONSOLA_ID ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()[0]
+        consola_pequena = db.execute(
+            "SELECT CONSOLA_ID FROM JUEGOS_CONSOLAS GROUP BY CONSOLA_ID ORDER BY COUNT(*) LIMIT 1"
+        ).fetchone()[0]
+        empresa = db.execute("SELECT EMPRESA_ID FROM CONSOLAS WHERE ID = ?", (consola_grande,)).fetchone()[0]
+        # El último juego suele tener un nombre de palabras poco frecuentes
+        nombre_raro = db.execute("SELECT NOMBRE FROM JUEGOS ORDER BY ID DESC LIMIT 1").fetchone()[0]
+        archivo = db.execute(
+            "SELECT JUEGO_ID, CONSOLA_ID, RUTA_NUBE FROM JUEGOS_CONSOLAS WHERE RUTA_NUBE <> '' LIMIT 1"
+        ).fetchone()
+        totales = {
+            tabla.lower(): db.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+            for tabla in ("EMPRESAS", "CONSOLAS", "JUEGOS", "JUEGOS_CONSOLAS")
+        }
+    return {
+        "consola_grande": consola_grande,
+        "consola_pequena": consola_pequena,
+        "empresa": empresa,
+        "palabra_rara": max(nombre_raro.split(), key=len),
+        "archivo": archivo,
+        "totales": totales,
+    }
+
+
+def endpoints(p: dict) -> dict:
+    grande, pequena, empresa, rara = p["consola_grande"], p["consola_pequena"], p["empresa"], p["palabra_rara"]
+    return {
+        "empresas": "/empresas/",
+        "consolas_con_juegos": "/consolas/",
+        "consolas_todas": "/consolas/all",
+        "consolas_todas_pagina": "/consolas/all?limit=50",
+        "consolas_empresa": f"/consolas/empresa/{empresa}",
+        "consolas_todas_empresa": f"/consolas/all/empresa/{empresa}",
+        "juegos_consola_grande": f"/juegos/consola/{grande}",
+        "juegos_consola_pequena": f"/juegos/consola/{pequena}",
+        "juegos_todos_consola_grande": f"/juegos/all/consola/{grande}",
+        "juegos_todos_pagina": f"/juegos/all/consola/{grande}?limit=100",
+        "buscar_palabra_comun": "/search/?q=super&limit=50",
+        "buscar_palabra_rara": f"/search/?q={rara}",
+        "buscar_dos_palabras": "/search/?q=super%20mario&type=games&limit=50",
+        "buscar_fuzzy": "/search/?q=supr%20maro&mode=fuzzy",
+        "buscar_general": "/search-general/all?q=world&limit=50",
+        "sugerencias": "/search/suggest?q=sup",
+    }
+
+
+async def medir_endpoints(cliente, rutas: dict, repeticiones: int) -> dict:
+    """Latencia secuencial con la caché de respuestas vacía y luego llena."""
+    from services.cache_service import RespuestaCache
+    from services.compresion import CacheComprimidos
+
+    resultado = {}
+    for nombre, ruta in rutas.items():
+        frio, caliente, tamano = [], [], 0
+        for _ in range(repeticiones):
+            RespuestaCache.invalidar()
+            CacheComprimidos.invalidar()
+            inicio = time.perf_counter()
+            r = await cliente.get(ruta)
+            frio.append(time.perf_counter() - inicio)
+            r.raise_for_status()
+            tamano = len(r.content)
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            r = await cliente.get(ruta)
+            caliente.append(time.perf_counter() - inicio)
+        resultado[nombre] = {
+            "ruta": ruta,
+            "bytes": tamano,
+            "frio": resumen_latencias(frio),
+            "caliente": resumen_latencias(caliente),
+        }
+    return resultado
+
+
+async def medir_concurrencia(cliente, rutas: dict, clientes: int, segundos: float) -> dict:
+    """Peticiones por segundo con varios clientes repartidos entre todas las rutas."""
+    lista = list(rutas.values())
+    latencias, errores = [], 0
+    fin = time.perf_counter() + segundos
+
+    async def bucle(desplazamiento):
+        nonlocal errores
+        i = desplazamiento
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            r = await cliente.get(lista[i % len(lista)])
+            if r.status_code >= 400:
+                errores += 1
+            latencias.append(time.perf_counter() - inicio)
+            i += 1
+
+    await asyncio.gather(*(bucle(i) for i in range(clientes)))
+    return {
+        "clientes": clientes,
+        **resumen_latencias(latencias),
+        "por_segundo": round(len(latencias) / segundos, 1),
+        "errores": errores,
+    }
+
+
+async def medir_login(cliente, segundos: float, clientes: int) -> dict:
+    from benchmarks.login_mixto import fase
+    from database.database import get_pool
+
+    credenciales = {"nombre": f"benchmark-{uuid.uuid4().hex[:8]}", "contraseña": uuid.uuid4().hex}
+    r = await cliente.post("/auth/register", json=credenciales)
+    r.raise_for_status()
+    try:
+        return (await fase(cliente, segundos, "/", 0, clientes, credenciales))["login"]
+    finally:
+        with get_pool().escritor() as db:
+            db.execute("DELETE FROM usuarios WHERE nombre = ?", (credenciales["nombre"],))
+            db.commit()
+
+
+async def medir_descarga(cliente, archivo, megas: int, repeticiones: int, clientes: int) -> dict:
+    from services.descarga_service import DescargaService
+
+    if archivo is None:
+        return {"error": "ningún juego tiene RUTA_NUBE"}
+    juego_id, consola_id, ruta_nube = archivo
+    path = DescargaService.ruta_local(ruta_nube)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        for _ in range(megas):
+            f.write(os.urandom(1024 * 1024))
+    ruta = f"/juegos/{juego_id}/consola/{consola_id}/download"
+
+    async def descargar():
+        inicio = time.perf_counter()
+        recibidos = 0
+        async with cliente.stream("GET", ruta) as r:
+            r.raise_for_status()
+            async for bloque in r.aiter_raw():
+                recibidos += len(bloque)
+        return recibidos, time.perf_counter() - inicio
+
+    secuencial = [await descargar() for _ in range(repeticiones)]
+    inicio = time.perf_counter()
+    paralelo = await asyncio.gather(*(descargar() for _ in range(clientes)))
+    total_paralelo = time.perf_counter() - inicio
+    return {
+        "ruta": ruta,
+        "megas": megas,
+        "secuencial_mb_s": round(sum(b for b, _ in secuencial) / sum(t for _, t in secuencial) / 2 ** 20, 1),
+        "paralelo_clientes": clientes,
+        "paralelo_mb_s": round(sum(b for b, _ in paralelo) / total_paralelo / 2 ** 20, 1),
+    }
+
+
+def entorno() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import orjson  # noqa: F401
+        con_orjson = True
+    except ImportError:
+        con_orjson = False
+    return {
+        "commit": commit,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "orjson": con_orjson,
+    }
+
+
+async def ejecutar(args) -> dict:
+    resultado = {"entorno": entorno(), "parametros": vars(args), "arranque": arranque()}
+    parametros = elegir_parametros()
+    resultado["catalogo"] = parametros["totales"]
+    rutas = endpoints(parametros)
+
+    from database.database import cerrar_pool
+    from main import app
+
+    transporte = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=300) as cliente:
+            resultado["endpoints"] = await medir_endpoints(cliente, rutas, args.repeticiones)
+            resultado["concurrencia"] = await medir_concurrencia(cliente, rutas, args.clientes, args.segundos)
+            if args.segundos_login:
+                resultado["login"] = await medir_login(cliente, args.segundos_login, args.clientes_login)
+            if args.megas_descarga:
+                resultado["descarga"] = await medir_descarga(
+                    cliente, parametros["archivo"], args.megas_descarga, args.repeticiones_descarga, args.clientes
+                )
+            resultado["pool"] = (await cliente.get("/health/pool")).json()
+    finally:
+        cerrar_pool()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de arranque, catálogo, búsqueda, login y descargas")
+    parser.add_argument("--datos", default=os.path.join(RAIZ, "benchmarks", "datos", "juegos.db"),
+                        help="juegos.db generado con benchmarks.catalogo_sintetico")
+    parser.add_argument("--trabajo", help="carpeta de trabajo (por defecto, una temporal que se borra)")
+    parser.add_argument("--salida", help="fichero JSON de resultados")
+    parser.add_argument("--repeticiones", type=int, default=20, help="peticiones por endpoint y por fase")
+    parser.add_argument("--clientes", type=int, default=8, help="clientes concurrentes")
+    parser.add_argument("--segundos", type=float, default=10, help="duración de la fase concurrente")
+    parser.add_argument("--segundos-login", type=float, default=10, help="duración del login en bucle (0 la omite)")
+    parser.add_argument("--clientes-login", type=int, default=16)
+    parser.add_argument("--megas-descarga", type=int, default=64, help="tamaño del archivo a descargar (0 la omite)")
+    parser.add_argument("--repeticiones-descarga", type=int, default=3)
+    args = parser.parse_args()
+    if not os.path.exists(args.datos):
+        raise SystemExit(f"No existe {args.datos}; genéralo con: python -m benchmarks.catalogo_sintetico")
+
+    salida = os.path.abspath(args.salida) if args.salida else None
+    temporal = args.trabajo is None
+    trabajo = preparar_entorno(args)
+    try:
+        resultado = asyncio.run(ejecutar(args))
+    finally:
+        os.chdir(RAIZ)
+        if temporal:
+            shutil.rmtree(trabajo, ignore_errors=True)
+
+    if salida is None:
+        carpeta = os.path.join(RAIZ, "benchmarks", "resultados")
+        os.makedirs(carpeta, exist_ok=True)
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{resultado['entorno']['commit'] or 'sin-commit'}.json"
+        salida = os.path.join(carpeta, nombre)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(json.dumps({clave: v for clave, v in resultado.items() if clave in ("arranque", "concurrencia", "login", "descarga")},
+                     ensure_ascii=False, indent=2))
+    print(f"Resultados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, ContextManager
+
+from fastapi import HTTPException
+
+from database.database import get_pool
+from database.pool import NUM_LECTORES
+
+# Consultas esperando hilo además de las que se están ejecutando; a partir de
+# ahí se responde 503 en vez de acumular peticiones que tardarían demasiado
+DB_COLA = int(os.getenv("DB_COLA", str(NUM_LECTORES * 16)))
+DB_REINTENTAR_EN = 1
+
+
+class EjecutorDB:
+    """
+    Hilos dedicados a la base de datos para los endpoints async, tantos como
+    conexiones puede prestar el pool: las consultas esperan turno en la cola
+    del ejecutor sin bloquear el event loop ni ocupar el threadpool de
+    FastAPI, y una consulta lenta solo retrasa a las que van detrás de ella
+    en la base de datos. Admite `hilos + cola` consultas a la vez; las demás
+    reciben 503.
+    """
+
+    def __init__(self, nombre: str, hilos: int, cola: int, prestar: Callable[[], ContextManager]):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, hilos), thread_name_prefix=nombre)
+        self._prestar = prestar
+        self._hilos = max(1, hilos)
+        self._maximo = self._hilos + max(0, cola)
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._stats = {"completadas": 0, "rechazadas": 0, "maximo_pendientes": 0}
+
+    def _con_conexion(self, funcion: Callable, args: tuple):
+        with self._prestar() as db:
+            return funcion(db, *args)
+
+    def _terminada(self, _futuro: Future):
+        # También se llama si la petición se cancela antes de que la consulta empiece
+        with self._lock:
+            self._pendientes -= 1
+            self._stats["completadas"] += 1
+
+    async def ejecutar(self, funcion: Callable, *args):
+        """`funcion(db, *args)` en un hilo del ejecutor con una conexión del pool."""
+        with self._lock:
+            if self._pendientes >= self._maximo:
+                self._stats["rechazadas"] += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="La base de datos está saturada, inténtalo de nuevo en unos segundos",
+                    headers={"Retry-After": str(DB_REINTENTAR_EN)}
+                )
+            self._pendientes += 1
+            self._stats["maximo_pendientes"] = max(self._stats["maximo_pendientes"], self._pendientes)
+        futuro = self._executor.submit(self._con_conexion, funcion, args)
+        futuro.add_done_callback(self._terminada)
+        return await asyncio.wrap_future(futuro)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "hilos": self._hilos,
+                "maximo": self._maximo,
+                "pendientes": self._pendientes,
+            }
+
+
+# get_pool() en cada consulta: el pool se puede cerrar y volver a abrir
+lectura = EjecutorDB("db-lector", NUM_LECTORES, DB_COLA, lambda: get_pool().lector())
+escritura = EjecutorDB("db-escritor", 1, DB_COLA, lambda: get_pool().escritor())
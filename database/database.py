@@ -1,50 +1,103 @@
 import os
 import sqlite3
+import threading
+from typing import Callable
+
+from database.migrador import aplicar_migraciones
+from database.pool import ConnectionPool
 
 DB_FILE    = "database/database.db"
-SCHEMA_FILE = os.path.join(os.path.dirname(__file__), "schema.sql")
+FTS_TABLAS = ("EMPRESAS_FTS", "CONSOLAS_FTS", "JUEGOS_FTS")
+# Cada cuánto se pasa PRAGMA optimize por la conexión de escritura y se hace
+# el resto del mantenimiento periódico (0 = nunca)
+OPTIMIZAR_CADA = float(os.getenv("DB_OPTIMIZAR_HORAS", "6")) * 3600
 
 def init_db():
-    db_exists = os.path.exists(DB_FILE)
+    """
+    Crea la base de datos o la pone al día aplicando las migraciones de
+    database/migraciones que falten según PRAGMA user_version.
+    """
     conn = sqlite3.connect(DB_FILE, check_same_thread=False)
     try:
-        with open(SCHEMA_FILE, encoding="utf-8") as f:
-            schema_sql = f.read()
-        if not db_exists:
-            conn.executescript(schema_sql)
-        else:
-            # Check if JUEGOS_CONSOLAS has RUTA_NUBE and JUEGOS does NOT have ROUTE
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(JUEGOS_CONSOLAS)")
-            juegos_consolas_cols = [row[1] for row in cursor.fetchall()]
-            cursor.execute("PRAGMA table_info(JUEGOS)")
-            juegos_cols = [row[1] for row in cursor.fetchall()]
-            needs_migration = False
-            if "RUTA_NUBE" not in juegos_consolas_cols:
-                needs_migration = True
-            if "ROUTE" in juegos_cols:
-                needs_migration = True
-            if needs_migration:
-                try:
-                    # Try to migrate: add RUTA_NUBE, remove ROUTE
-                    if "RUTA_NUBE" not in juegos_consolas_cols:
-                        cursor.execute("ALTER TABLE JUEGOS_CONSOLAS ADD COLUMN RUTA_NUBE TEXT DEFAULT ''")
-                    if "ROUTE" in juegos_cols:
-                        # SQLite does not support DROP COLUMN directly; need to recreate table
-                        raise Exception("La columna 'ROUTE' debe eliminarse manualmente de la tabla JUEGOS. Por favor, realiza una migración manual.")
-                    conn.commit()
-                except Exception as e:
-                    raise Exception(f"Error actualizando la estructura de la base de datos: {e}")
+        aplicadas = aplicar_migraciones(conn)
+        if aplicadas:
+            print(f"Migraciones aplicadas: {', '.join(aplicadas)}")
     finally:
         conn.close()
 
-def get_db():
+def recalcular_disponibles(conn: sqlite3.Connection):
     """
-    Dependencia de FastAPI que abre una conexión SQLite
-    y la cierra al terminar la petición.
+    Reconstruye CONSOLAS_DISPONIBLES y EMPRESAS_DISPONIBLES desde JUEGOS_CONSOLAS
+    (el cálculo inicial está en la migración 004).
     """
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-    try:
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM CONSOLAS_DISPONIBLES")
+    cursor.execute("DELETE FROM EMPRESAS_DISPONIBLES")
+    cursor.execute("""
+        INSERT INTO CONSOLAS_DISPONIBLES (CONSOLA_ID, EMPRESA_ID, NUM_JUEGOS)
+        SELECT c.ID, c.EMPRESA_ID, COUNT(*)
+        FROM JUEGOS_CONSOLAS jc
+        JOIN CONSOLAS c ON c.ID = jc.CONSOLA_ID
+        WHERE jc.RUTA_NUBE <> ''
+        GROUP BY c.ID
+    """)
+    cursor.execute("""
+        INSERT INTO EMPRESAS_DISPONIBLES (EMPRESA_ID, NUM_JUEGOS)
+        SELECT EMPRESA_ID, SUM(NUM_JUEGOS)
+        FROM CONSOLAS_DISPONIBLES
+        GROUP BY EMPRESA_ID
+    """)
+
+_pool = None
+_pool_lock = threading.Lock()
+_parar_optimizacion = threading.Event()
+
+def get_pool() -> ConnectionPool:
+    """Devuelve el pool de conexiones, creándolo la primera vez."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_FILE)
+    return _pool
+
+def cerrar_pool():
+    """Cierra el pool de conexiones si estaba abierto, con un último PRAGMA optimize."""
+    global _pool
+    _parar_optimizacion.set()
+    with _pool_lock:
+        if _pool is not None:
+            _pool.optimizar()
+            _pool.cerrar()
+            _pool = None
+
+def optimizar_en_segundo_plano(*tareas: Callable[[], object]):
+    """
+    Pasa PRAGMA optimize cada OPTIMIZAR_CADA segundos, como recomienda SQLite
+    para conexiones de larga duración: vuelve a analizar las tablas cuyas
+    estadísticas se han quedado viejas para que el planificador siga
+    eligiendo bien los índices. Después ejecuta las `tareas` de mantenimiento
+    que se le pasen; un fallo en una no para las demás.
+    """
+    if OPTIMIZAR_CADA <= 0:
+        return
+    _parar_optimizacion.clear()
+
+    def bucle():
+        while not _parar_optimizacion.wait(OPTIMIZAR_CADA):
+            get_pool().optimizar()
+            for tarea in tareas:
+                try:
+                    tarea()
+                except Exception as e:
+                    print(f"Error en el mantenimiento ({getattr(tarea, '__qualname__', tarea)}): {e}")
+
+    threading.Thread(target=bucle, name="optimizar-db", daemon=True).start()
+
+def get_db_lectura():
+    """
+    Dependencia de FastAPI que presta una conexión de solo lectura del pool
+    y la devuelve al terminar la petición.
+    """
+    with get_pool().lector() as conn:
         yield conn
-    finally:
-        conn.close()
\ No newline at end of file
@@ -1,16 +1,37 @@
+import os
+import queue
+import random
 import sqlite3
 import requests
+import threading
 import time
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from math import ceil
-from requests.exceptions import HTTPError, RequestException
+from requests.exceptions import RequestException
 
 MAX_RESULTS = 200000
 PAGE_SIZE   = 40
-API_KEY     = "0085cd9d23e74fc3b1bc723f749f7f4a"
-SLEEP_API   = 0.3
-MAX_RETRIES = 200
-RETRY_DELAY = 5
+API_KEY     = os.getenv("RAWG_API_KEY", "0085cd9d23e74fc3b1bc723f749f7f4a")
+# URL base de la API; se puede apuntar a un servidor RAWG simulado en local
+BASE_URL    = os.getenv("RAWG_BASE_URL", "https://api.rawg.io/api").rstrip("/")
+DB_PATH     = os.getenv("RAWG_DB", "juegos.db")
+
+# Peticiones simultáneas y ritmo máximo compartido por todos los hilos
+CONCURRENCIA          = int(os.getenv("RAWG_CONCURRENCIA", "8"))
+PETICIONES_POR_SEGUNDO = float(os.getenv("RAWG_RPS", "5"))
+RAFAGA                = int(os.getenv("RAWG_RAFAGA", "10"))
+
+# Reintentos con espera exponencial (base * 2^intento, con jitter y tope)
+MAX_RETRIES   = 8
+BACKOFF_BASE  = 1.0
+BACKOFF_MAX   = 60.0
+REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Filas por transacción del escritor y espera máxima antes de volcar un lote incompleto
+LOTE_ESCRITURA = 2000
+ESPERA_VOLCADO = 2.0
 
 # Consolas a omitir por nombre (case-insensitive, exacto)
 PLATAFORMAS_OMITIDAS = {"ios", "pc", "macos", "linux", "android", "web"}
@@ -52,6 +73,22 @@ def crear_base_de_datos(conn):
       FOREIGN KEY (JUEGO_ID) REFERENCES JUEGOS(ID),
       FOREIGN KEY (CONSOLA_ID) REFERENCES CONSOLAS(ID)
     );
+    -- Estado de la descarga por consola: última página contigua guardada en
+    -- el recorrido completo y, una vez completado, la marca de sincronización
+    CREATE TABLE IF NOT EXISTS ESTADO_CONSOLAS (
+      CONSOLA_ID INTEGER PRIMARY KEY,
+      ULTIMA_PAGINA INTEGER NOT NULL DEFAULT 0,
+      COMPLETADA INTEGER NOT NULL DEFAULT 0,
+      TOTAL_API INTEGER,
+      ULTIMO_UPDATED TEXT,
+      ETAG TEXT,
+      FECHA TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    -- Juegos con descripción ya descargada y su fecha "updated" en RAWG
+    CREATE TABLE IF NOT EXISTS JUEGOS_RAWG (
+      JUEGO_ID INTEGER PRIMARY KEY,
+      UPDATED TEXT
+    );
     """)
     conn.commit()
     agregar_columna_si_no_existe(conn, "CONSOLAS", "NUM_JUEGOS_API", "INTEGER")
@@ -94,14 +131,203 @@ def determine_manufacturer(name: str) -> str:
     if n.strip() == 'pc': return "PC"
     return "Desconocida"
 
-def fetch_consolas_empresas(session, conn):
-    url = f"https://api.rawg.io/api/platforms?key={API_KEY}&page_size=100"
+
+def _retry_after(resp):
+    """Segundos de la cabecera Retry-After, si la hay y es numérica."""
+    valor = resp.headers.get("Retry-After", "")
+    try:
+        return min(BACKOFF_MAX, max(0.0, float(valor)))
+    except ValueError:
+        return None
+
+# Respuesta 304 de una petición condicional
+NO_MODIFICADO = object()
+
+class TokenBucket:
+    """Limitador de ritmo compartido: `tasa` peticiones por segundo con ráfagas de hasta `capacidad`."""
+
+    def __init__(self, tasa: float, capacidad: int):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._fichas = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        """Espera hasta que haya una ficha libre y la consume."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.tasa
+            time.sleep(espera)
+
+class ClienteRawg:
+    """Cliente de la API de RAWG con una sesión HTTP por hilo, límite de ritmo y reintentos."""
+
+    def __init__(self, base_url: str = BASE_URL, api_key: str = API_KEY, limitador: TokenBucket = None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.limitador = limitador or TokenBucket(PETICIONES_POR_SEGUNDO, RAFAGA)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.peticiones = 0
+        self.reintentos = 0
+
+    def _sesion(self) -> requests.Session:
+        sesion = getattr(self._local, "sesion", None)
+        if sesion is None:
+            sesion = self._local.sesion = requests.Session()
+        return sesion
+
+    def get(self, ruta: str, **params):
+        """
+        GET a la API. Devuelve el JSON, o None si responde 404. Los errores de
+        red, 429 y 5xx se reintentan con espera exponencial; el resto se lanza.
+        """
+        return self.get_condicional(ruta, None, **params)[0]
+
+    def get_condicional(self, ruta: str, etag, **params):
+        """
+        Como `get`, pero envía If-None-Match con `etag` y devuelve (datos, etag
+        nuevo). Si la API responde 304, datos es NO_MODIFICADO.
+        """
+        cabeceras = {"If-None-Match": etag} if etag else {}
+        params["key"] = self.api_key
+        url = f"{self.base_url}/{ruta.lstrip('/')}"
+        for intento in range(MAX_RETRIES + 1):
+            self.limitador.adquirir()
+            with self._lock:
+                self.peticiones += 1
+            espera = None
+            try:
+                resp = self._sesion().get(url, params=params, headers=cabeceras, timeout=30)
+            except RequestException as err:
+                if intento == MAX_RETRIES:
+                    raise
+                motivo = f"error de red ({err.__class__.__name__})"
+            else:
+                if resp.status_code == 404:
+                    return None, None
+                if resp.status_code == 304:
+                    return NO_MODIFICADO, etag
+                if resp.status_code not in REINTENTABLES or intento == MAX_RETRIES:
+                    resp.raise_for_status()
+                    return resp.json(), resp.headers.get("ETag")
+                motivo = f"HTTP {resp.status_code}"
+                espera = _retry_after(resp)
+            if espera is None:
+                espera = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** intento) * random.uniform(0.5, 1.0)
+            with self._lock:
+                self.reintentos += 1
+            print(f"  → {motivo} en {ruta}, reintento {intento + 1}/{MAX_RETRIES} en {espera:.1f}s")
+            time.sleep(espera)
+
+class Escritor(threading.Thread):
+    """
+    Etapa de escritura: recibe filas por una cola y las inserta con
+    executemany en transacciones de hasta LOTE_ESCRITURA filas. Es el único
+    hilo que escribe en la base de datos durante la descarga.
+    """
+
+    SQL = {
+        "juegos": """
+            INSERT INTO JUEGOS (ID,NOMBRE,FECHA_LANZAMIENTO,DESCRIPCION,PUBLISHERS)
+            VALUES (?,?,?,?,?)
+            ON CONFLICT (ID) DO UPDATE SET
+              NOMBRE=excluded.NOMBRE, FECHA_LANZAMIENTO=excluded.FECHA_LANZAMIENTO,
+              DESCRIPCION=excluded.DESCRIPCION, PUBLISHERS=excluded.PUBLISHERS
+        """,
+        "juegos_rawg": """
+            INSERT INTO JUEGOS_RAWG (JUEGO_ID, UPDATED) VALUES (?, ?)
+            ON CONFLICT (JUEGO_ID) DO UPDATE SET UPDATED=excluded.UPDATED
+        """,
+        "juegos_consolas": """
+            INSERT OR IGNORE INTO JUEGOS_CONSOLAS (JUEGO_ID, CONSOLA_ID, RUTA_NUBE)
+            VALUES (?, ?, '')
+        """,
+        "num_juegos_api": "UPDATE CONSOLAS SET NUM_JUEGOS_API=? WHERE ID=?",
+        # Los puntos de control van al final del lote, en la misma transacción
+        # que las filas a las que se refieren
+        "pagina": """
+            INSERT INTO ESTADO_CONSOLAS (CONSOLA_ID, ULTIMA_PAGINA) VALUES (?, ?)
+            ON CONFLICT (CONSOLA_ID) DO UPDATE SET
+              ULTIMA_PAGINA=excluded.ULTIMA_PAGINA, FECHA=CURRENT_TIMESTAMP
+        """,
+        "sincronizada": """
+            INSERT INTO ESTADO_CONSOLAS (CONSOLA_ID, COMPLETADA, TOTAL_API, ULTIMO_UPDATED, ETAG)
+            VALUES (?, 1, ?, ?, ?)
+            ON CONFLICT (CONSOLA_ID) DO UPDATE SET
+              COMPLETADA=1, TOTAL_API=excluded.TOTAL_API, ULTIMO_UPDATED=excluded.ULTIMO_UPDATED,
+              ETAG=excluded.ETAG, FECHA=CURRENT_TIMESTAMP
+        """,
+    }
+
+    def __init__(self, db_path: str):
+        super().__init__(name="rawg-escritor", daemon=True)
+        self.db_path = db_path
+        self._cola = queue.Queue(maxsize=LOTE_ESCRITURA * 4)
+        self.filas_escritas = 0
+        self.error = None
+
+    def poner(self, tipo: str, fila: tuple):
+        self._cola.put((tipo, fila))
+
+    def cerrar(self):
+        """Vuelca lo pendiente, espera al hilo y relanza su error si lo hubo."""
+        self._cola.put(None)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+    def _volcar(self, conn, pendientes: dict):
+        with conn:
+            for tipo, filas in pendientes.items():
+                if filas:
+                    conn.executemany(self.SQL[tipo], filas)
+                    self.filas_escritas += len(filas)
+                    filas.clear()
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        pendientes = {tipo: [] for tipo in self.SQL}
+        num = 0
+        try:
+            while True:
+                try:
+                    item = self._cola.get(timeout=ESPERA_VOLCADO)
+                except queue.Empty:
+                    item = ()
+                if item:
+                    tipo, fila = item
+                    pendientes[tipo].append(fila)
+                    num += 1
+                if num and (num >= LOTE_ESCRITURA or not item):
+                    self._volcar(conn, pendientes)
+                    num = 0
+                if item is None:
+                    break
+        except Exception as e:
+            self.error = e
+            # Seguir vaciando la cola para no bloquear a los productores
+            while self._cola.get() is not None:
+                pass
+        finally:
+            conn.close()
+
+def fetch_consolas_empresas(cliente: ClienteRawg, conn):
     page = 1
     c = conn.cursor()
     while True:
-        resp = session.get(f"{url}&page={page}")
-        resp.raise_for_status()
-        data = resp.json()
+        data = cliente.get("platforms", page_size=100, page=page)
+        if data is None:
+            break
         for p in data['results']:
             pid  = p['id']
             name = p['name']
@@ -116,143 +342,221 @@ def fetch_consolas_empresas(session, conn):
         if not data.get('next'):
             break
         page += 1
-        time.sleep(SLEEP_API)
     conn.commit()
 
-def get_num_juegos_api(session, consola_id):
-    url = f"https://api.rawg.io/api/games?key={API_KEY}&platforms={consola_id}&page_size=1"
-    resp = session.get(url)
-    resp.raise_for_status()
-    data = resp.json()
-    return data.get('count', 0)
-
-def get_game_description(session, juego_id: int) -> str:
-    url = f"https://api.rawg.io/api/games/{juego_id}?key={API_KEY}"
-    resp = session.get(url)
-    if resp.status_code == 200:
-        return resp.json().get('description_raw','')
-    return ""
-
-def contar_juegos_bbdd(conn, consola_id):
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM JUEGOS_CONSOLAS WHERE CONSOLA_ID=?", (consola_id,))
-    return cur.fetchone()[0]
 
-def main():
+def sondear_consola(cliente: ClienteRawg, consola_id, etag):
+    """
+    Pide el juego actualizado más recientemente de la consola. Devuelve
+    NO_MODIFICADO o (nº de juegos, fecha "updated" más reciente, etag).
+    """
+    data, etag = cliente.get_condicional("games", etag, platforms=consola_id, page_size=1, ordering="-updated")
+    if data is NO_MODIFICADO:
+        return NO_MODIFICADO
+    data = data or {}
+    results = data.get('results') or []
+    return data.get('count', 0), results[0].get('updated') if results else None, etag
+
+def get_pagina_juegos(cliente: ClienteRawg, consola_id, page, ordering):
+    data = cliente.get("games", platforms=consola_id, page_size=PAGE_SIZE, page=page, ordering=ordering)
+    return (data or {}).get('results', [])
+
+def get_game_description(cliente: ClienteRawg, juego_id: int) -> str:
+    data = cliente.get(f"games/{juego_id}")
+    return (data or {}).get('description_raw', '')
+
+def get_juego(cliente: ClienteRawg, juego: tuple, consola_id, page):
+    """Completa (id, nombre, fecha, publishers, updated) con la descripción del juego."""
+    gid, name, date, pubs, updated = juego
+    desc = get_game_description(cliente, gid)
+    return (gid, name, date, desc, pubs), updated
+
+class Sincronizacion:
+    """
+    Descarga de una consola en curso.
+
+    En modo "completa" se recorren las páginas por fecha de alta en RAWG, un
+    orden estable en el que lo nuevo queda al final, desde la última página
+    contigua guardada. En modo "delta" (consola ya completada) se recorren
+    por fecha de actualización descendente hasta alcanzar lo ya sincronizado.
+    """
+
+    def __init__(self, consola_id, modo, total, updated, etag, ultima_pagina=0, desde_updated=None):
+        self.consola_id = consola_id
+        self.modo = modo
+        self.total = total
+        self.updated = updated
+        self.etag = etag
+        self.desde_updated = desde_updated
+        self.contigua = ultima_pagina
+        self.hechas = set()
+        # Descripciones pendientes de cada página
+        self.faltan = {}
+        # Páginas pedidas o a la espera de sus descripciones
+        self.pendientes = 0
+        self.juegos = 0
+
+    @property
+    def ordering(self):
+        return "created" if self.modo == "completa" else "-updated"
+
+def main(db_path: str = DB_PATH, base_url: str = BASE_URL):
     inicio = time.time()
-    conn    = sqlite3.connect("juegos.db")
-    session = requests.Session()
-    
+    conn    = sqlite3.connect(db_path)
+    cliente = ClienteRawg(base_url)
+
     crear_base_de_datos(conn)
-    fetch_consolas_empresas(session, conn)
+    fetch_consolas_empresas(cliente, conn)
 
     cur = conn.cursor()
     cur.execute("SELECT ID, NOMBRE FROM CONSOLAS")
     consolas = cur.fetchall()
+    estados = {
+        row[0]: row[1:] for row in cur.execute(
+            "SELECT CONSOLA_ID, ULTIMA_PAGINA, COMPLETADA, TOTAL_API, ULTIMO_UPDATED, ETAG FROM ESTADO_CONSOLAS"
+        )
+    }
+    # Juegos con descripción y su fecha "updated"; los descargados antes de
+    # existir JUEGOS_RAWG cuentan como descritos con fecha desconocida
+    descritos = dict(cur.execute("SELECT JUEGO_ID, UPDATED FROM JUEGOS_RAWG"))
+    sin_describir = object()
+    for (gid,) in cur.execute("SELECT ID FROM JUEGOS WHERE IFNULL(DESCRIPCION, '') <> ''"):
+        descritos.setdefault(gid, None)
+    conn.close()
 
+    escritor = Escritor(db_path)
+    escritor.start()
+    nombres = dict(consolas)
+    sincronizaciones = {}
+    paginas_pendientes = deque()
     juegos_totales = 0
+    ultimo_aviso = time.time()
 
-    for cid, cname in consolas:
-        if cname.strip().lower() in PLATAFORMAS_OMITIDAS:
-            print(f"\nConsola omitida por configuración: {cname} (ID {cid})")
-            continue
+    def pagina_terminada(sync: Sincronizacion, page):
+        sync.pendientes -= 1
+        if sync.modo == "completa":
+            sync.hechas.add(page)
+            avance = sync.contigua
+            while sync.contigua + 1 in sync.hechas:
+                sync.contigua += 1
+                sync.hechas.discard(sync.contigua)
+            if sync.contigua != avance:
+                escritor.poner("pagina", (sync.consola_id, sync.contigua))
+        if sync.pendientes == 0:
+            escritor.poner("sincronizada", (sync.consola_id, sync.total, sync.updated, sync.etag))
+            print(f"  ✔️  {nombres[sync.consola_id]}: sincronización {sync.modo} terminada "
+                  f"({sync.juegos} juegos descargados)")
 
-        print(f"\nConsola: {cname} (ID {cid})")
-        # Obtener y guardar número de juegos de la API
-        try:
-            num_juegos_api = get_num_juegos_api(session, cid)
-        except Exception as e:
-            print(f"  Error obteniendo número de juegos para {cname}: {e}")
-            num_juegos_api = None
+    with ThreadPoolExecutor(max_workers=CONCURRENCIA, thread_name_prefix="rawg") as pool:
+        pendientes = {}
 
-        cur.execute("UPDATE CONSOLAS SET NUM_JUEGOS_API=? WHERE ID=?", (num_juegos_api, cid))
-        conn.commit()
+        def lanzar(tarea, *args):
+            pendientes[pool.submit(tarea, cliente, *args)] = (tarea, args)
 
-        # Contar juegos en la BBDD para esa consola
-        num_juegos_bbdd = contar_juegos_bbdd(conn, cid)
-        print(f"  Juegos en BBDD: {num_juegos_bbdd} | Juegos según API: {num_juegos_api}")
-
-        if num_juegos_api is not None and num_juegos_bbdd == num_juegos_api:
-            print("  ✔️  La base de datos está sincronizada con la API para esta consola.")
-            continue
-        else:
-            print("  ❗ Diferencia detectada. Descargando e insertando nuevos juegos...")
-
-        # Si la diferencia es mayor de 40, calcular la página de inicio
-        start_page = 1
-        if num_juegos_api is not None and abs(num_juegos_api - num_juegos_bbdd) > PAGE_SIZE:
-            start_page = ceil(num_juegos_bbdd / PAGE_SIZE) + 1
-            print(f"  ➡️  Empezando por la página {start_page} para ahorrar llamadas.")
-
-        pages = ceil(min(num_juegos_api or MAX_RESULTS, MAX_RESULTS) / PAGE_SIZE)
-        juegos_descargados = 0
-
-        for page in range(start_page, pages + 1):
-            url = (
-                f"https://api.rawg.io/api/games?key={API_KEY}"
-                f"&platforms={cid}&page_size={PAGE_SIZE}&page={page}"
-            )
-            retries = 0
-            while True:
+        for cid, cname in consolas:
+            if cname.strip().lower() in PLATAFORMAS_OMITIDAS:
+                print(f"Consola omitida por configuración: {cname} (ID {cid})")
+                continue
+            estado = estados.get(cid)
+            # Solo una consola completada puede darse por sincronizada con un 304
+            lanzar(sondear_consola, cid, estado[4] if estado and estado[1] else None)
+
+        while pendientes:
+            hechas, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in hechas:
+                tarea, args = pendientes.pop(futuro)
                 try:
-                    resp = session.get(url)
-                    resp.raise_for_status()
-                    break
-                except HTTPError as err:
-                    code = err.response.status_code
-                    if code == 404:
-                        print("  → 404: fin de datos para esta consola")
-                        page = pages + 1
-                        break
-                    if code == 502 and retries < MAX_RETRIES:
-                        retries += 1
-                        print(f"  → 502 Bad Gateway, reintentando {retries}/{MAX_RETRIES} en {RETRY_DELAY}s")
-                        time.sleep(RETRY_DELAY)
-                        continue
-                    print(f"  → Error HTTP {code}, saltando consola")
-                    page = pages + 1
-                    break
+                    resultado = futuro.result()
                 except RequestException as err:
-                    print(f"  → Error de red: {err}, saltando consola")
-                    page = pages + 1
-                    break
+                    # La página afectada no se marca como hecha: la próxima
+                    # ejecución retoma la consola desde el último punto de control
+                    print(f"  → Error en {tarea.__name__}{args}: {err}")
+                    continue
 
-            if page > pages:
-                break
-
-            data = resp.json()
-            batch = data.get('results', [])
-            if not batch:
-                break
-
-            for j in batch:
-                gid   = j["id"]
-                name  = j.get("name")
-                date  = j.get("released")
-                pubs  = ", ".join([p["name"] for p in j.get("publishers", [])])
-                desc  = get_game_description(session, gid)
-                cur.execute("""
-                    INSERT OR IGNORE INTO JUEGOS (ID,NOMBRE,FECHA_LANZAMIENTO,DESCRIPCION,PUBLISHERS)
-                    VALUES (?,?,?,?,?)
-                """, (gid,name,date,desc,pubs))
-                cur.execute("""
-                    INSERT OR IGNORE INTO JUEGOS_CONSOLAS (JUEGO_ID, CONSOLA_ID, RUTA_NUBE)
-                    VALUES (?, ?, '')
-                """, (gid, cid))
-                juegos_descargados += 1
-                juegos_totales += 1
-
-            conn.commit()
-            print(f"  Página {page}: {juegos_descargados} juegos insertados/actualizados para esta consola")
-            time.sleep(SLEEP_API)
-            if juegos_descargados >= MAX_RESULTS:
-                break
-
-        print(f"  Total recolectados en {cname}: {juegos_descargados} juegos")
-
-    session.close()
-    conn.close()
-    print(f"\n¡Proceso completado! Juegos descargados/actualizados en total: {juegos_totales}")
+                if tarea is sondear_consola:
+                    cid = args[0]
+                    ultima, completada, total_previo, ultimo_updated, _ = estados.get(cid, (0, 0, None, None, None))
+                    if resultado is NO_MODIFICADO:
+                        print(f"Consola: {nombres[cid]} (ID {cid}) | ✔️  sin cambios (304)")
+                        continue
+                    total, updated, etag = resultado
+                    escritor.poner("num_juegos_api", (total, cid))
+                    if completada and updated == ultimo_updated and total == total_previo:
+                        print(f"Consola: {nombres[cid]} (ID {cid}) | Juegos según API: {total} | ✔️  sin cambios")
+                        escritor.poner("sincronizada", (cid, total, updated, etag))
+                        continue
+                    if completada:
+                        sync = sincronizaciones[cid] = Sincronizacion(
+                            cid, "delta", total, updated, etag, desde_updated=ultimo_updated
+                        )
+                        paginas = [1]
+                    else:
+                        sync = sincronizaciones[cid] = Sincronizacion(cid, "completa", total, updated, etag, ultima)
+                        ultima_api = ceil(min(total, MAX_RESULTS) / PAGE_SIZE)
+                        paginas = list(range(ultima + 1, ultima_api + 1))
+                    print(f"Consola: {nombres[cid]} (ID {cid}) | Juegos según API: {total} | "
+                          f"descarga {sync.modo} desde la página {paginas[0] if paginas else '-'}")
+                    if not paginas:
+                        sync.pendientes = 1
+                        pagina_terminada(sync, ultima)
+                        continue
+                    sync.pendientes = len(paginas)
+                    paginas_pendientes.extend((cid, page, sync.ordering) for page in paginas)
+
+                elif tarea is get_pagina_juegos:
+                    cid, page, _ = args
+                    sync = sincronizaciones[cid]
+                    nuevas = 0
+                    for j in resultado:
+                        gid = j["id"]
+                        updated = j.get("updated")
+                        previo = descritos.get(gid, sin_describir)
+                        # Sin descripción, o con cambios desde que se descargó
+                        if previo is sin_describir or (previo != updated and (previo is not None or sync.modo == "delta")):
+                            descritos[gid] = updated
+                            pubs = ", ".join([p["name"] for p in j.get("publishers") or []])
+                            lanzar(get_juego, (gid, j.get("name"), j.get("released"), pubs, updated), cid, page)
+                            nuevas += 1
+                        else:
+                            escritor.poner("juegos_consolas", (gid, cid))
+                    # En modo delta se sigue mientras la página entera sea posterior a la última sincronización
+                    if (sync.modo == "delta" and len(resultado) == PAGE_SIZE and page * PAGE_SIZE < MAX_RESULTS
+                            and (sync.desde_updated is None or (resultado[-1].get("updated") or "") > sync.desde_updated)):
+                        sync.pendientes += 1
+                        paginas_pendientes.append((cid, page + 1, sync.ordering))
+                    if nuevas:
+                        sync.faltan[page] = nuevas
+                    else:
+                        pagina_terminada(sync, page)
+
+                else:
+                    (fila, updated), (_, cid, page) = resultado, args
+                    escritor.poner("juegos", fila)
+                    escritor.poner("juegos_rawg", (fila[0], updated))
+                    escritor.poner("juegos_consolas", (fila[0], cid))
+                    juegos_totales += 1
+                    sync = sincronizaciones[cid]
+                    sync.juegos += 1
+                    sync.faltan[page] -= 1
+                    if not sync.faltan[page]:
+                        del sync.faltan[page]
+                        pagina_terminada(sync, page)
+
+            # Las descripciones van primero; solo se piden páginas nuevas si hay
+            # hueco, para no acumular en memoria miles de juegos sin completar
+            while paginas_pendientes and len(pendientes) < CONCURRENCIA * 2:
+                lanzar(get_pagina_juegos, *paginas_pendientes.popleft())
+
+            if time.time() - ultimo_aviso >= 10:
+                ultimo_aviso = time.time()
+                transcurrido = ultimo_aviso - inicio
+                print(f"  {cliente.peticiones} peticiones ({cliente.peticiones / transcurrido:.1f}/s), "
+                      f"{cliente.reintentos} reintentos, {juegos_totales} juegos descargados, "
+                      f"{escritor.filas_escritas} filas escritas")
+
+    escritor.cerrar()
+    print(f"\n¡Proceso completado! Juegos nuevos o actualizados en total: {juegos_totales}")
+    print(f"Peticiones: {cliente.peticiones} | Reintentos: {cliente.reintentos}")
     print(f"Tiempo total: {time.time() - inicio:.2f} segundos")
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
--- Activa el soporte de claves foráneas
-PRAGMA foreign_keys = ON;
+-- Esquema base del catálogo y los usuarios. Como todas las migraciones, se
+-- puede aplicar sobre una base de datos de antes de las migraciones (versión
+-- 0) que ya tenga estas tablas.
 
 -- 1. Tabla de roles
 CREATE TABLE IF NOT EXISTS roles (
@@ -8,7 +9,7 @@ CREATE TABLE IF NOT EXISTS roles (
 );
 
 -- Inserta los roles básicos
-INSERT INTO roles (nombre) VALUES
+INSERT OR IGNORE INTO roles (nombre) VALUES
   ('ADMIN'),
   ('USER');
 
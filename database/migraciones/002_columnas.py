@@ -0,0 +1,81 @@
+"""
+Pone al día las tablas creadas por versiones anteriores: añade las columnas
+JUEGOS_CONSOLAS.RUTA_NUBE y JUEGOS_CONSOLAS.BLOB_SHA256 si faltan y quita la
+columna JUEGOS.ROUTE, que pasó a ser RUTA_NUBE en JUEGOS_CONSOLAS.
+"""
+import re
+import sqlite3
+
+
+def _columnas(conn: sqlite3.Connection, tabla: str) -> list:
+    return [fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})")]
+
+
+def _definiciones(ddl: str) -> list:
+    """Columnas y restricciones de un CREATE TABLE, separadas por las comas de primer nivel."""
+    cuerpo = ddl[ddl.index("(") + 1:ddl.rindex(")")]
+    partes, actual, nivel, cierre = [], "", 0, None
+    for caracter in cuerpo:
+        if cierre:
+            if caracter == cierre:
+                cierre = None
+        elif caracter in "'\"`[":
+            cierre = "]" if caracter == "[" else caracter
+        elif caracter == "(":
+            nivel += 1
+        elif caracter == ")":
+            nivel -= 1
+        elif caracter == "," and nivel == 0:
+            partes.append(actual.strip())
+            actual = ""
+            continue
+        actual += caracter
+    partes.append(actual.strip())
+    return partes
+
+
+def _nombre(definicion: str) -> str:
+    return definicion.split(None, 1)[0].strip("\"`[]").upper()
+
+
+def _quitar_columna(conn: sqlite3.Connection, tabla: str, columna: str):
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        conn.execute(f"ALTER TABLE {tabla} DROP COLUMN {columna}")
+        return
+    _rehacer_sin_columna(conn, tabla, columna)
+
+
+def _rehacer_sin_columna(conn: sqlite3.Connection, tabla: str, columna: str):
+    """
+    SQLite sin DROP COLUMN: rehacer la tabla con su CREATE TABLE original
+    (sqlite_master) menos la columna, para no perder PRIMARY KEY, FOREIGN
+    KEY, NOT NULL ni DEFAULT, y volver a crear sus índices. Sus triggers (los
+    de FTS) se pierden con ella y los vuelve a crear la 003.
+    """
+    ddl = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)
+    ).fetchone()[0]
+    indices = [
+        sql for (sql,) in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (tabla,)
+        )
+        if not re.search(rf"\b{columna}\b", sql, re.IGNORECASE)
+    ]
+    definiciones = [d for d in _definiciones(ddl) if _nombre(d) != columna.upper()]
+    lista = ", ".join(fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})") if fila[1] != columna)
+    conn.execute(f"CREATE TABLE {tabla}_NUEVA ({', '.join(definiciones)}){ddl[ddl.rindex(')') + 1:]}")
+    conn.execute(f"INSERT INTO {tabla}_NUEVA ({lista}) SELECT {lista} FROM {tabla}")
+    conn.execute(f"DROP TABLE {tabla}")
+    conn.execute(f"ALTER TABLE {tabla}_NUEVA RENAME TO {tabla}")
+    for sql in indices:
+        conn.execute(sql)
+
+
+def migrar(conn: sqlite3.Connection):
+    juegos_consolas = _columnas(conn, "JUEGOS_CONSOLAS")
+    if "RUTA_NUBE" not in juegos_consolas:
+        conn.execute("ALTER TABLE JUEGOS_CONSOLAS ADD COLUMN RUTA_NUBE TEXT DEFAULT ''")
+    if "BLOB_SHA256" not in juegos_consolas:
+        conn.execute("ALTER TABLE JUEGOS_CONSOLAS ADD COLUMN BLOB_SHA256 TEXT")
+    if "ROUTE" in _columnas(conn, "JUEGOS"):
+        _quitar_columna(conn, "JUEGOS", "ROUTE")
@@ -0,0 +1,62 @@
+-- Índices de texto completo (FTS5) sobre los nombres del catálogo.
+-- Son tablas de contenido externo: guardan solo el índice y leen el texto
+-- de EMPRESAS, CONSOLAS y JUEGOS. Los triggers las mantienen sincronizadas.
+
+-- 1. Empresas
+CREATE VIRTUAL TABLE IF NOT EXISTS EMPRESAS_FTS USING fts5(
+  NOMBRE,
+  content='EMPRESAS', content_rowid='ID',
+  tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS EMPRESAS_FTS_AI AFTER INSERT ON EMPRESAS BEGIN
+  INSERT INTO EMPRESAS_FTS(rowid, NOMBRE) VALUES (new.ID, new.NOMBRE);
+END;
+CREATE TRIGGER IF NOT EXISTS EMPRESAS_FTS_AD AFTER DELETE ON EMPRESAS BEGIN
+  INSERT INTO EMPRESAS_FTS(EMPRESAS_FTS, rowid, NOMBRE) VALUES ('delete', old.ID, old.NOMBRE);
+END;
+CREATE TRIGGER IF NOT EXISTS EMPRESAS_FTS_AU AFTER UPDATE OF NOMBRE ON EMPRESAS BEGIN
+  INSERT INTO EMPRESAS_FTS(EMPRESAS_FTS, rowid, NOMBRE) VALUES ('delete', old.ID, old.NOMBRE);
+  INSERT INTO EMPRESAS_FTS(rowid, NOMBRE) VALUES (new.ID, new.NOMBRE);
+END;
+
+-- 2. Consolas
+CREATE VIRTUAL TABLE IF NOT EXISTS CONSOLAS_FTS USING fts5(
+  NOMBRE,
+  content='CONSOLAS', content_rowid='ID',
+  tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS CONSOLAS_FTS_AI AFTER INSERT ON CONSOLAS BEGIN
+  INSERT INTO CONSOLAS_FTS(rowid, NOMBRE) VALUES (new.ID, new.NOMBRE);
+END;
+CREATE TRIGGER IF NOT EXISTS CONSOLAS_FTS_AD AFTER DELETE ON CONSOLAS BEGIN
+  INSERT INTO CONSOLAS_FTS(CONSOLAS_FTS, rowid, NOMBRE) VALUES ('delete', old.ID, old.NOMBRE);
+END;
+CREATE TRIGGER IF NOT EXISTS CONSOLAS_FTS_AU AFTER UPDATE OF NOMBRE ON CONSOLAS BEGIN
+  INSERT INTO CONSOLAS_FTS(CONSOLAS_FTS, rowid, NOMBRE) VALUES ('delete', old.ID, old.NOMBRE);
+  INSERT INTO CONSOLAS_FTS(rowid, NOMBRE) VALUES (new.ID, new.NOMBRE);
+END;
+
+-- 3. Juegos
+CREATE VIRTUAL TABLE IF NOT EXISTS JUEGOS_FTS USING fts5(
+  NOMBRE,
+  content='JUEGOS', content_rowid='ID',
+  tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS JUEGOS_FTS_AI AFTER INSERT ON JUEGOS BEGIN
+  INSERT INTO JUEGOS_FTS(rowid, NOMBRE) VALUES (new.ID, new.NOMBRE);
+END;
+CREATE TRIGGER IF NOT EXISTS JUEGOS_FTS_AD AFTER DELETE ON JUEGOS BEGIN
+  INSERT INTO JUEGOS_FTS(JUEGOS_FTS, rowid, NOMBRE) VALUES ('delete', old.ID, old.NOMBRE);
+END;
+CREATE TRIGGER IF NOT EXISTS JUEGOS_FTS_AU AFTER UPDATE OF NOMBRE ON JUEGOS BEGIN
+  INSERT INTO JUEGOS_FTS(JUEGOS_FTS, rowid, NOMBRE) VALUES ('delete', old.ID, old.NOMBRE);
+  INSERT INTO JUEGOS_FTS(rowid, NOMBRE) VALUES (new.ID, new.NOMBRE);
+END;
+
+-- Rellenar los índices con lo que ya hubiera en el catálogo
+INSERT INTO EMPRESAS_FTS(EMPRESAS_FTS) VALUES ('rebuild');
+INSERT INTO CONSOLAS_FTS(CONSOLAS_FTS) VALUES ('rebuild');
+INSERT INTO JUEGOS_FTS(JUEGOS_FTS) VALUES ('rebuild');
@@ -0,0 +1,85 @@
+-- Catálogo descargable materializado: consolas y empresas que tienen juegos
+-- con ruta en la nube y cuántos. Los triggers de JUEGOS_CONSOLAS lo mantienen
+-- al día cuando registrar_juego o la importación cambian RUTA_NUBE.
+
+-- Índice parcial solo con las filas que tienen ruta
+CREATE INDEX IF NOT EXISTS IDX_JUEGOS_CONSOLAS_CON_RUTA
+  ON JUEGOS_CONSOLAS (CONSOLA_ID, JUEGO_ID) WHERE RUTA_NUBE <> '';
+
+CREATE TABLE IF NOT EXISTS CONSOLAS_DISPONIBLES (
+  CONSOLA_ID INTEGER PRIMARY KEY,
+  EMPRESA_ID INTEGER NOT NULL,
+  NUM_JUEGOS INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS IDX_CONSOLAS_DISPONIBLES_EMPRESA
+  ON CONSOLAS_DISPONIBLES (EMPRESA_ID);
+
+CREATE TABLE IF NOT EXISTS EMPRESAS_DISPONIBLES (
+  EMPRESA_ID INTEGER PRIMARY KEY,
+  NUM_JUEGOS INTEGER NOT NULL
+);
+
+-- Sumar un juego con ruta a su consola y a su empresa
+CREATE TRIGGER IF NOT EXISTS JUEGOS_CONSOLAS_RUTA_AI
+AFTER INSERT ON JUEGOS_CONSOLAS
+WHEN IFNULL(new.RUTA_NUBE, '') <> ''
+BEGIN
+  INSERT INTO CONSOLAS_DISPONIBLES (CONSOLA_ID, EMPRESA_ID, NUM_JUEGOS)
+    SELECT ID, EMPRESA_ID, 1 FROM CONSOLAS WHERE ID = new.CONSOLA_ID
+    ON CONFLICT (CONSOLA_ID) DO UPDATE SET NUM_JUEGOS = NUM_JUEGOS + 1;
+  INSERT INTO EMPRESAS_DISPONIBLES (EMPRESA_ID, NUM_JUEGOS)
+    SELECT EMPRESA_ID, 1 FROM CONSOLAS WHERE ID = new.CONSOLA_ID
+    ON CONFLICT (EMPRESA_ID) DO UPDATE SET NUM_JUEGOS = NUM_JUEGOS + 1;
+END;
+
+-- Restar un juego que deja de tener ruta (o se borra)
+CREATE TRIGGER IF NOT EXISTS JUEGOS_CONSOLAS_RUTA_AD
+AFTER DELETE ON JUEGOS_CONSOLAS
+WHEN IFNULL(old.RUTA_NUBE, '') <> ''
+BEGIN
+  UPDATE CONSOLAS_DISPONIBLES SET NUM_JUEGOS = NUM_JUEGOS - 1 WHERE CONSOLA_ID = old.CONSOLA_ID;
+  UPDATE EMPRESAS_DISPONIBLES SET NUM_JUEGOS = NUM_JUEGOS - 1
+    WHERE EMPRESA_ID = (SELECT EMPRESA_ID FROM CONSOLAS WHERE ID = old.CONSOLA_ID);
+  DELETE FROM CONSOLAS_DISPONIBLES WHERE NUM_JUEGOS <= 0;
+  DELETE FROM EMPRESAS_DISPONIBLES WHERE NUM_JUEGOS <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS JUEGOS_CONSOLAS_RUTA_ALTA
+AFTER UPDATE OF RUTA_NUBE ON JUEGOS_CONSOLAS
+WHEN IFNULL(old.RUTA_NUBE, '') = '' AND IFNULL(new.RUTA_NUBE, '') <> ''
+BEGIN
+  INSERT INTO CONSOLAS_DISPONIBLES (CONSOLA_ID, EMPRESA_ID, NUM_JUEGOS)
+    SELECT ID, EMPRESA_ID, 1 FROM CONSOLAS WHERE ID = new.CONSOLA_ID
+    ON CONFLICT (CONSOLA_ID) DO UPDATE SET NUM_JUEGOS = NUM_JUEGOS + 1;
+  INSERT INTO EMPRESAS_DISPONIBLES (EMPRESA_ID, NUM_JUEGOS)
+    SELECT EMPRESA_ID, 1 FROM CONSOLAS WHERE ID = new.CONSOLA_ID
+    ON CONFLICT (EMPRESA_ID) DO UPDATE SET NUM_JUEGOS = NUM_JUEGOS + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS JUEGOS_CONSOLAS_RUTA_BAJA
+AFTER UPDATE OF RUTA_NUBE ON JUEGOS_CONSOLAS
+WHEN IFNULL(old.RUTA_NUBE, '') <> '' AND IFNULL(new.RUTA_NUBE, '') = ''
+BEGIN
+  UPDATE CONSOLAS_DISPONIBLES SET NUM_JUEGOS = NUM_JUEGOS - 1 WHERE CONSOLA_ID = old.CONSOLA_ID;
+  UPDATE EMPRESAS_DISPONIBLES SET NUM_JUEGOS = NUM_JUEGOS - 1
+    WHERE EMPRESA_ID = (SELECT EMPRESA_ID FROM CONSOLAS WHERE ID = old.CONSOLA_ID);
+  DELETE FROM CONSOLAS_DISPONIBLES WHERE NUM_JUEGOS <= 0;
+  DELETE FROM EMPRESAS_DISPONIBLES WHERE NUM_JUEGOS <= 0;
+END;
+
+-- Cálculo inicial (el mismo que recalcular_disponibles en database.py)
+DELETE FROM CONSOLAS_DISPONIBLES;
+DELETE FROM EMPRESAS_DISPONIBLES;
+
+INSERT INTO CONSOLAS_DISPONIBLES (CONSOLA_ID, EMPRESA_ID, NUM_JUEGOS)
+  SELECT c.ID, c.EMPRESA_ID, COUNT(*)
+  FROM JUEGOS_CONSOLAS jc
+  JOIN CONSOLAS c ON c.ID = jc.CONSOLA_ID
+  WHERE jc.RUTA_NUBE <> ''
+  GROUP BY c.ID;
+
+INSERT INTO EMPRESAS_DISPONIBLES (EMPRESA_ID, NUM_JUEGOS)
+  SELECT EMPRESA_ID, SUM(NUM_JUEGOS)
+  FROM CONSOLAS_DISPONIBLES
+  GROUP BY EMPRESA_ID;
@@ -0,0 +1,18 @@
+-- Control de la importación de juegos.db: huella del fichero ya importado y,
+-- por tabla, el último rowid copiado (marca de agua) para reanudar o copiar
+-- solo lo nuevo.
+
+CREATE TABLE IF NOT EXISTS IMPORTACIONES (
+  ORIGEN   TEXT PRIMARY KEY,
+  TAMANO   INTEGER NOT NULL,
+  MTIME_NS INTEGER NOT NULL,
+  HUELLA   TEXT    NOT NULL,
+  FECHA    TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS IMPORTACIONES_TABLAS (
+  ORIGEN       TEXT    NOT NULL,
+  TABLA        TEXT    NOT NULL,
+  ULTIMO_ROWID INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (ORIGEN, TABLA)
+);
@@ -0,0 +1,15 @@
+-- Subidas por bloques en curso. Los datos se escriben directamente en un
+-- fichero temporal; aquí solo se guarda cuántos bloques seguidos han llegado
+-- bien, para poder reanudar tras un corte.
+
+CREATE TABLE IF NOT EXISTS SUBIDAS (
+  ID             TEXT PRIMARY KEY,
+  JUEGO_ID       INTEGER NOT NULL,
+  CONSOLA_ID     INTEGER NOT NULL,
+  TAMANO         INTEGER NOT NULL,
+  TAMANO_BLOQUE  INTEGER NOT NULL,
+  SHA256         TEXT,
+  BLOQUES        INTEGER NOT NULL DEFAULT 0,
+  ESTADO         TEXT    NOT NULL DEFAULT 'en_curso',
+  FECHA          TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,43 @@
+-- Almacén de archivos por contenido: cada archivo se guarda una sola vez con
+-- su SHA-256 como nombre y JUEGOS_CONSOLAS.BLOB_SHA256 (columna añadida en
+-- la migración 002) apunta a él. Los triggers llevan la cuenta de
+-- referencias; los blobs que se quedan a cero los borra BlobService.recolectar().
+
+CREATE TABLE IF NOT EXISTS BLOBS (
+  SHA256      TEXT PRIMARY KEY,
+  TAMANO      INTEGER NOT NULL,
+  REFERENCIAS INTEGER NOT NULL DEFAULT 0,
+  FECHA       TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS IDX_BLOBS_SIN_REFERENCIAS
+  ON BLOBS (SHA256) WHERE REFERENCIAS <= 0;
+
+CREATE TRIGGER IF NOT EXISTS JUEGOS_CONSOLAS_BLOB_AI
+AFTER INSERT ON JUEGOS_CONSOLAS
+WHEN new.BLOB_SHA256 IS NOT NULL
+BEGIN
+  UPDATE BLOBS SET REFERENCIAS = REFERENCIAS + 1 WHERE SHA256 = new.BLOB_SHA256;
+END;
+
+CREATE TRIGGER IF NOT EXISTS JUEGOS_CONSOLAS_BLOB_AD
+AFTER DELETE ON JUEGOS_CONSOLAS
+WHEN old.BLOB_SHA256 IS NOT NULL
+BEGIN
+  UPDATE BLOBS SET REFERENCIAS = REFERENCIAS - 1 WHERE SHA256 = old.BLOB_SHA256;
+END;
+
+CREATE TRIGGER IF NOT EXISTS JUEGOS_CONSOLAS_BLOB_AU
+AFTER UPDATE OF BLOB_SHA256 ON JUEGOS_CONSOLAS
+WHEN old.BLOB_SHA256 IS NOT new.BLOB_SHA256
+BEGIN
+  UPDATE BLOBS SET REFERENCIAS = REFERENCIAS - 1 WHERE SHA256 = old.BLOB_SHA256;
+  UPDATE BLOBS SET REFERENCIAS = REFERENCIAS + 1 WHERE SHA256 = new.BLOB_SHA256;
+END;
+
+-- Vista de compatibilidad: la ruta legible de siempre junto al blob que la respalda
+CREATE VIEW IF NOT EXISTS JUEGOS_ARCHIVOS AS
+  SELECT jc.JUEGO_ID, jc.CONSOLA_ID, jc.RUTA_NUBE, jc.BLOB_SHA256, b.TAMANO
+  FROM JUEGOS_CONSOLAS jc
+  LEFT JOIN BLOBS b ON b.SHA256 = jc.BLOB_SHA256
+  WHERE jc.RUTA_NUBE <> '';
@@ -0,0 +1,18 @@
+-- Último escaneo de la carpeta de juegos. Cada carpeta de consola guarda su
+-- mtime: si no ha cambiado, su lista de ficheros no ha cambiado y el
+-- siguiente escaneo la toma de aquí en vez de volver a listarla.
+
+CREATE TABLE IF NOT EXISTS ESCANEO_DIRECTORIOS (
+  RUTA     TEXT PRIMARY KEY,
+  MTIME_NS INTEGER NOT NULL,
+  FECHA    TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ESCANEO_ARCHIVOS (
+  RUTA       TEXT PRIMARY KEY,
+  DIRECTORIO TEXT    NOT NULL,
+  TAMANO     INTEGER NOT NULL,
+  MTIME_NS   INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS IDX_ESCANEO_ARCHIVOS_DIRECTORIO ON ESCANEO_ARCHIVOS (DIRECTORIO);
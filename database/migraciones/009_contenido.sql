@@ -0,0 +1,28 @@
+-- Índice del directorio central de los zips servidos: qué contiene cada
+-- archivo y dónde empieza cada miembro, para listar o extraer uno solo sin
+-- leer el archivo entero. Se rehace cuando cambian el tamaño o el mtime.
+
+CREATE TABLE IF NOT EXISTS ZIP_ARCHIVOS (
+  ID       INTEGER PRIMARY KEY,
+  RUTA     TEXT    NOT NULL UNIQUE,
+  TAMANO   INTEGER NOT NULL,
+  MTIME_NS INTEGER NOT NULL,
+  FECHA    TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ZIP_MIEMBROS (
+  ARCHIVO_ID        INTEGER NOT NULL,
+  INDICE            INTEGER NOT NULL,
+  NOMBRE            TEXT    NOT NULL,
+  TAMANO            INTEGER NOT NULL,
+  TAMANO_COMPRIMIDO INTEGER NOT NULL,
+  CRC32             INTEGER NOT NULL,
+  METODO            INTEGER NOT NULL,
+  FLAGS             INTEGER NOT NULL,
+  OFFSET            INTEGER NOT NULL,
+  FECHA_MOD         TEXT,
+  PRIMARY KEY (ARCHIVO_ID, INDICE),
+  FOREIGN KEY (ARCHIVO_ID) REFERENCES ZIP_ARCHIVOS(ID)
+);
+
+CREATE INDEX IF NOT EXISTS IDX_ZIP_MIEMBROS_NOMBRE ON ZIP_MIEMBROS (ARCHIVO_ID, NOMBRE);
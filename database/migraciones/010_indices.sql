@@ -0,0 +1,20 @@
+-- Índices secundarios para las consultas de GameService (los planes se
+-- pueden revisar en /admin/sql) y estadísticas iniciales para el planificador.
+-- usuarios.nombre y EMPRESAS.NOMBRE ya tienen el índice de su UNIQUE.
+
+-- Consolas de una empresa ordenadas por nombre y listado de todas las
+-- consolas por (empresa, consola), sin B-tree temporal
+CREATE INDEX IF NOT EXISTS IDX_CONSOLAS_EMPRESA
+  ON CONSOLAS (EMPRESA_ID, NOMBRE);
+
+-- Búsqueda de juegos: de cada resultado de JUEGOS_FTS a sus consolas con ruta
+-- sin leer la fila de JUEGOS_CONSOLAS
+CREATE INDEX IF NOT EXISTS IDX_JUEGOS_CONSOLAS_JUEGO_CON_RUTA
+  ON JUEGOS_CONSOLAS (JUEGO_ID, CONSOLA_ID) WHERE RUTA_NUBE <> '';
+
+-- Juegos en orden (NOMBRE, ID): las páginas de las consolas con muchos
+-- juegos lo recorren hasta llenarse en vez de ordenar la consola entera
+CREATE INDEX IF NOT EXISTS IDX_JUEGOS_NOMBRE
+  ON JUEGOS (NOMBRE);
+
+ANALYZE;
@@ -0,0 +1,5 @@
+-- La marca de agua de cada tabla vale solo para el juegos.db con el que se
+-- copió: se guarda su huella y, si el fichero cambia, se recorre de nuevo
+-- entero. Las marcas de antes no tienen huella y se descartan.
+
+ALTER TABLE IMPORTACIONES_TABLAS ADD COLUMN HUELLA TEXT;
@@ -0,0 +1,11 @@
+-- Los listados de juegos se ordenan y paginan por (IFNULL(NOMBRE, ''), ID):
+-- con (NOMBRE, ID) un cursor con nombre NULL nunca es menor que ninguna fila
+-- y la paginación se cortaba ahí. El índice de nombres pasa a ser el de esa
+-- expresión para que las páginas se sigan leyendo en su orden.
+
+DROP INDEX IF EXISTS IDX_JUEGOS_NOMBRE;
+
+CREATE INDEX IF NOT EXISTS IDX_JUEGOS_NOMBRE
+  ON JUEGOS (IFNULL(NOMBRE, ''));
+
+ANALYZE JUEGOS;
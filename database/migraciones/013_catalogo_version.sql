@@ -0,0 +1,11 @@
+-- Versión del catálogo compartida entre procesos. El servidor lleva la suya
+-- en memoria; los procesos aparte que cambian el catálogo (como
+-- `python -m services.escaneo_service`) suben esta y el servidor, que la
+-- consulta cada poco, invalida sus cachés al verla cambiar.
+
+CREATE TABLE IF NOT EXISTS CATALOGO_VERSION (
+  ID      INTEGER PRIMARY KEY CHECK (ID = 1),
+  VERSION INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO CATALOGO_VERSION (ID, VERSION) VALUES (1, 0);
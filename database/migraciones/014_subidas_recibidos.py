@@ -0,0 +1,25 @@
+"""
+Las subidas guardan qué bloques han llegado en un mapa de bits (RECIBIDOS,
+un bit por bloque) en vez de cuántos bloques seguidos: reenviar un bloque
+ya no obliga a volver a enviar todos los siguientes. BLOQUES pasa a ser el
+número de bloques recibidos; las subidas abiertas conservan los suyos.
+"""
+import sqlite3
+
+
+def _mapa(total: int, recibidos: int) -> bytes:
+    """Mapa de `total` bloques con los `recibidos` primeros marcados."""
+    mapa = bytearray(-(-total // 8))
+    mapa[:recibidos // 8] = b"\xff" * (recibidos // 8)
+    if recibidos % 8:
+        mapa[recibidos // 8] = (1 << recibidos % 8) - 1
+    return bytes(mapa)
+
+
+def migrar(conn: sqlite3.Connection):
+    conn.execute("ALTER TABLE SUBIDAS ADD COLUMN RECIBIDOS BLOB")
+    filas = conn.execute("SELECT ID, TAMANO, TAMANO_BLOQUE, BLOQUES FROM SUBIDAS").fetchall()
+    conn.executemany(
+        "UPDATE SUBIDAS SET RECIBIDOS = ? WHERE ID = ?",
+        [(_mapa(-(-tamano // tamano_bloque), bloques), upload_id) for upload_id, tamano, tamano_bloque, bloques in filas]
+    )
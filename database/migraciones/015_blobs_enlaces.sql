@@ -0,0 +1,14 @@
+-- Rutas legibles (RUTA_NUBE) que BlobService.enlazar ha dejado como enlace
+-- duro a cada blob. Al recolectar un blob se borran también los enlaces que
+-- nadie usa: si no, el fichero sigue ocupando disco aunque el blob ya no esté.
+-- Las rutas de los blobs que ya estaban asignados se dan por enlazadas.
+
+CREATE TABLE IF NOT EXISTS BLOBS_ENLACES (
+  SHA256 TEXT NOT NULL,
+  RUTA   TEXT NOT NULL,
+  PRIMARY KEY (SHA256, RUTA)
+);
+
+INSERT OR IGNORE INTO BLOBS_ENLACES (SHA256, RUTA)
+  SELECT BLOB_SHA256, RUTA_NUBE FROM JUEGOS_CONSOLAS
+  WHERE BLOB_SHA256 IS NOT NULL AND RUTA_NUBE <> '';
@@ -0,0 +1,80 @@
+import importlib.util
+import os
+import re
+import sqlite3
+from typing import Iterator, List, Tuple
+
+MIGRACIONES_DIR = os.path.join(os.path.dirname(__file__), "migraciones")
+# NNN_nombre.sql (se ejecuta tal cual) o NNN_nombre.py (con una función migrar(conn))
+_FICHERO = re.compile(r"^(\d{3})_(\w+)\.(sql|py)$")
+
+
+class MigracionError(sqlite3.DatabaseError):
+    """Una migración ha fallado (y se ha deshecho) o la base de datos es más nueva que el código."""
+
+
+def migraciones() -> List[Tuple[int, str, str]]:
+    """(versión, nombre, ruta) de cada migración, en orden y sin huecos."""
+    lista = []
+    for fichero in os.listdir(MIGRACIONES_DIR):
+        coincide = _FICHERO.match(fichero)
+        if coincide:
+            lista.append((int(coincide.group(1)), coincide.group(2), os.path.join(MIGRACIONES_DIR, fichero)))
+    lista.sort()
+    for esperada, (version, nombre, _) in enumerate(lista, 1):
+        if version != esperada:
+            raise MigracionError(f"Falta la migración {esperada:03d} o está repetida (encontrada {version:03d}_{nombre})")
+    return lista
+
+
+def sentencias(script: str) -> Iterator[str]:
+    """Parte un script SQL en sentencias completas (los triggers BEGIN ... END van enteros)."""
+    actual = ""
+    for linea in script.splitlines(keepends=True):
+        actual += linea
+        if sqlite3.complete_statement(actual):
+            yield actual.strip()
+            actual = ""
+
+
+def _aplicar(conn: sqlite3.Connection, ruta: str):
+    if ruta.endswith(".sql"):
+        with open(ruta, encoding="utf-8") as f:
+            # Sentencia a sentencia: executescript haría COMMIT a mitad de la migración
+            for sentencia in sentencias(f.read()):
+                conn.execute(sentencia)
+        return
+    spec = importlib.util.spec_from_file_location(f"migracion_{os.path.basename(ruta)[:-3]}", ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    modulo.migrar(conn)
+
+
+def aplicar_migraciones(conn: sqlite3.Connection) -> List[str]:
+    """
+    Aplica las migraciones posteriores a PRAGMA user_version, cada una en su
+    propia transacción junto con el cambio de versión: si falla, la base de
+    datos se queda en la versión anterior. Devuelve las aplicadas.
+    """
+    conn.isolation_level = None
+    todas = migraciones()
+    actual = conn.execute("PRAGMA user_version").fetchone()[0]
+    if todas and actual > todas[-1][0]:
+        raise MigracionError(
+            f"La base de datos está en la versión {actual} y este código solo conoce hasta la {todas[-1][0]}"
+        )
+    aplicadas = []
+    for version, nombre, ruta in todas:
+        if version <= actual:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _aplicar(conn, ruta)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise MigracionError(f"Error en la migración {version:03d}_{nombre}: {e}") from e
+        aplicadas.append(f"{version:03d}_{nombre}")
+    return aplicadas
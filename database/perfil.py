@@ -0,0 +1,141 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Perfilado por sentencia: desactivado salvo DB_PERFIL=1 o desde /admin/sql
+PERFIL_ACTIVO = os.getenv("DB_PERFIL", "0") == "1"
+# Sentencias más lentas que esto se escriben en el log con sus parámetros
+LENTA_MS = float(os.getenv("DB_LENTA_MS", "100"))
+# Sentencias lentas recientes que se guardan para /admin/sql
+LENTAS_GUARDADAS = 100
+# Tope de sentencias distintas; las IN (?, ?, ...) ya se agrupan en una
+MAX_SENTENCIAS = 2000
+
+_espacios = re.compile(r"\s+")
+_lista_parametros = re.compile(r"\?(?:\s*,\s*\?)+")
+# Operaciones de las que SQLite sabe dar plan
+_CON_PLAN = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def normalizar(sql: str) -> str:
+    """Texto de la sentencia en una línea y con las listas de ? en una sola."""
+    return _lista_parametros.sub("?, ...", _espacios.sub(" ", sql).strip())
+
+
+def _resumen_parametros(parametros) -> Optional[str]:
+    if parametros is None:
+        return None
+    texto = repr(parametros)
+    return texto if len(texto) <= 200 else texto[:200] + "..."
+
+
+def _escaneo_completo(linea: str) -> bool:
+    # "SCAN JUEGOS" recorre la tabla; "SCAN ... USING INDEX", las FTS y
+    # "SCAN CONSTANT ROW" no
+    linea = linea.strip()
+    return linea.startswith("SCAN ") and not any(
+        marca in linea for marca in (" USING ", "VIRTUAL TABLE", "CONSTANT ROW")
+    )
+
+
+class PerfilSQL:
+    """
+    Tiempo acumulado y plan de ejecución de cada sentencia distinta que pasa
+    por el pool. El plan (EXPLAIN QUERY PLAN) se captura solo la primera vez
+    que se ve una sentencia, en la misma conexión y con los mismos parámetros,
+    y se marca si recorre una tabla entera o necesita un B-tree temporal
+    (DISTINCT, ORDER BY o GROUP BY sin índice que los cubra).
+    """
+
+    activo = PERFIL_ACTIVO
+    _lock = threading.Lock()
+    _sentencias: dict = {}
+    _lentas: deque = deque(maxlen=LENTAS_GUARDADAS)
+
+    @staticmethod
+    def registrar(conn: sqlite3.Connection, sql: str, parametros, duracion: float, origen: str, operacion: str):
+        clave = normalizar(sql)
+        with PerfilSQL._lock:
+            datos = PerfilSQL._sentencias.get(clave)
+            nueva = datos is None
+            if nueva:
+                if len(PerfilSQL._sentencias) >= MAX_SENTENCIAS:
+                    return
+                datos = PerfilSQL._sentencias[clave] = {
+                    "sql": clave, "operacion": operacion, "origenes": set(),
+                    "llamadas": 0, "total_s": 0.0, "maximo_s": 0.0, "lentas": 0, "plan": None,
+                }
+            datos["llamadas"] += 1
+            datos["total_s"] += duracion
+            datos["maximo_s"] = max(datos["maximo_s"], duracion)
+            datos["origenes"].add(origen)
+            lenta = duracion * 1000 >= LENTA_MS
+            if lenta:
+                datos["lentas"] += 1
+                PerfilSQL._lentas.append({
+                    "sql": clave, "origen": origen, "ms": round(duracion * 1000, 2),
+                    "parametros": _resumen_parametros(parametros), "fecha": time.time(),
+                })
+        if lenta:
+            logger.warning("SQL lenta (%.1f ms) en %s: %s parámetros=%s",
+                           duracion * 1000, origen, clave, _resumen_parametros(parametros))
+        if nueva and operacion in _CON_PLAN:
+            plan = PerfilSQL._explicar(conn, sql, parametros)
+            with PerfilSQL._lock:
+                datos["plan"] = plan
+
+    @staticmethod
+    def _explicar(conn: sqlite3.Connection, sql: str, parametros) -> Optional[List[str]]:
+        # Con los métodos de sqlite3.Connection para no volver a pasar por el perfil
+        try:
+            filas = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parametros or ()).fetchall()
+        except sqlite3.Error as e:
+            return [f"sin plan: {e}"]
+        # (id, padre, no usado, detalle): sangrar según la profundidad
+        profundidad = {0: -1}
+        lineas = []
+        for id_, padre, _, detalle in filas:
+            profundidad[id_] = profundidad.get(padre, -1) + 1
+            lineas.append("  " * profundidad[id_] + detalle)
+        return lineas
+
+    @staticmethod
+    def _con_avisos(datos: dict) -> dict:
+        plan = datos["plan"] or []
+        return {
+            **datos,
+            "origenes": sorted(datos["origenes"]),
+            "total_s": round(datos["total_s"], 4),
+            "maximo_s": round(datos["maximo_s"], 4),
+            "media_ms": round(datos["total_s"] / datos["llamadas"] * 1000, 3),
+            "escaneo_completo": any(_escaneo_completo(linea) for linea in plan),
+            "btree_temporal": any("USE TEMP B-TREE" in linea for linea in plan),
+        }
+
+    @staticmethod
+    def top(limite: int = 20, orden: str = "total_s") -> dict:
+        """Las `limite` sentencias con más tiempo (o llamadas, máximo...) y las últimas lentas."""
+        with PerfilSQL._lock:
+            sentencias = [PerfilSQL._con_avisos(d) for d in PerfilSQL._sentencias.values()]
+            lentas = list(PerfilSQL._lentas)
+        sentencias.sort(key=lambda d: d[orden], reverse=True)
+        return {
+            "activo": PerfilSQL.activo,
+            "lenta_ms": LENTA_MS,
+            "sentencias_distintas": len(sentencias),
+            "sentencias": sentencias[:limite],
+            "lentas_recientes": lentas[::-1],
+        }
+
+    @staticmethod
+    def reiniciar():
+        with PerfilSQL._lock:
+            PerfilSQL._sentencias.clear()
+            PerfilSQL._lentas.clear()
@@ -0,0 +1,220 @@
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from database.perfil import PerfilSQL
+from ext_class.metricas import Metricas
+
+# Ajustes del pool (se pueden sobreescribir por variables de entorno)
+NUM_LECTORES   = int(os.getenv("DB_POOL_LECTORES", "4"))
+ESPERA_MAXIMA  = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+CACHE_SIZE_KIB = int(os.getenv("DB_CACHE_KIB", "16384"))
+MMAP_SIZE      = int(os.getenv("DB_MMAP_BYTES", str(256 * 1024 * 1024)))
+BUSY_TIMEOUT   = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+# Filas que examina ANALYZE por índice al optimizar: acota lo que tarda en la Pi
+LIMITE_ANALISIS = int(os.getenv("DB_LIMITE_ANALISIS", "1000"))
+# Medir cada sentencia SQL para /metrics (unos 5 µs por sentencia; 0 para
+# desactivarlo, lo que también desactiva el perfil de database/perfil.py)
+MEDIR_SQL      = os.getenv("DB_METRICAS", "1") != "0"
+
+
+class PoolAgotadoError(sqlite3.OperationalError):
+    """No hay conexiones libres tras esperar ESPERA_MAXIMA segundos."""
+
+
+def _origen() -> str:
+    """Función (Clase.metodo) que lanzó la sentencia, saltando los marcos de este módulo."""
+    marco = sys._getframe(1)
+    while marco is not None and marco.f_code.co_filename == __file__:
+        marco = marco.f_back
+    return marco.f_code.co_qualname if marco is not None else "desconocida"
+
+
+def _operacion(sql: str) -> str:
+    palabra = sql.lstrip().split(None, 1)
+    return palabra[0].upper() if palabra else ""
+
+
+def _medir(conn: sqlite3.Connection, funcion, sql: str, *args, parametros=None):
+    # En un SELECT solo se mide hasta la primera fila; el resto se lee con fetch*
+    inicio = time.perf_counter()
+    fallo = False
+    try:
+        return funcion(sql, *args)
+    except sqlite3.Error:
+        fallo = True
+        raise
+    finally:
+        duracion = time.perf_counter() - inicio
+        etiquetas = (_origen(), _operacion(sql))
+        Metricas.sql.observar(duracion, *etiquetas)
+        if fallo:
+            Metricas.sql_errores.inc(*etiquetas)
+        elif PerfilSQL.activo:
+            PerfilSQL.registrar(conn, sql, parametros, duracion, *etiquetas)
+
+
+class CursorMedido(sqlite3.Cursor):
+    def execute(self, sql, parametros=()):
+        return _medir(self.connection, super().execute, sql, parametros, parametros=parametros)
+
+    def executemany(self, sql, parametros):
+        # El plan se saca con la primera fila si se puede ver sin consumir un iterador
+        primera = parametros[0] if isinstance(parametros, (list, tuple)) and parametros else None
+        return _medir(self.connection, super().executemany, sql, parametros, parametros=primera)
+
+    def executescript(self, script):
+        return _medir(self.connection, super().executescript, script)
+
+
+class ConexionMedida(sqlite3.Connection):
+    """
+    Conexión que registra la duración de cada sentencia en Metricas.sql,
+    etiquetada con la función que la lanza (GameService.get_juegos_por_consola,
+    DatabaseService._merge...). Connection.execute no pasa por cursor(), así
+    que se redefinen los dos caminos.
+    """
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite abiertas de antemano.
+
+    Mantiene una única conexión de escritura (serializada con un lock) y un
+    conjunto de conexiones de solo lectura que se reparten mediante una cola.
+    """
+
+    def __init__(self, db_file: str, lectores: int = NUM_LECTORES):
+        self.db_file = db_file
+        self._lock_stats = threading.Lock()
+        self._lock_escritor = threading.Lock()
+        self._escritor = self._abrir(solo_lectura=False)
+        self._lectores = queue.Queue()
+        for _ in range(max(1, lectores)):
+            self._lectores.put(self._abrir(solo_lectura=True))
+        self._num_lectores = max(1, lectores)
+        self._en_uso = 0
+        self._stats = {
+            "checkouts": 0,
+            "esperas": 0,
+            "maximo_en_uso": 0,
+            "escritor_checkouts": 0,
+            "escritor_esperas": 0,
+        }
+
+    def _abrir(self, solo_lectura: bool) -> sqlite3.Connection:
+        # Con uri=True también se pueden adjuntar otras bases en modo solo lectura
+        uri = f"file:{pathname2url(os.path.abspath(self.db_file))}"
+        factory = ConexionMedida if MEDIR_SQL else sqlite3.Connection
+        if solo_lectura:
+            conn = sqlite3.connect(uri + "?mode=ro", uri=True, check_same_thread=False,
+                                   timeout=BUSY_TIMEOUT / 1000, factory=factory)
+        else:
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                   timeout=BUSY_TIMEOUT / 1000, factory=factory)
+            # El modo WAL es persistente en el fichero; basta con fijarlo desde el escritor
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT}")
+        return conn
+
+    @staticmethod
+    def _limpiar(conn: sqlite3.Connection):
+        # No devolver al pool una conexión con una transacción a medias
+        if conn.in_transaction:
+            conn.rollback()
+
+    @contextmanager
+    def lector(self, espera: float = ESPERA_MAXIMA):
+        """Presta una conexión de solo lectura y la devuelve al terminar."""
+        try:
+            conn = self._lectores.get_nowait()
+            espero = False
+        except queue.Empty:
+            espero = True
+            try:
+                conn = self._lectores.get(timeout=espera)
+            except queue.Empty:
+                raise PoolAgotadoError("No hay conexiones de lectura disponibles")
+        with self._lock_stats:
+            self._stats["checkouts"] += 1
+            if espero:
+                self._stats["esperas"] += 1
+            self._en_uso += 1
+            if self._en_uso > self._stats["maximo_en_uso"]:
+                self._stats["maximo_en_uso"] = self._en_uso
+        try:
+            yield conn
+        finally:
+            self._limpiar(conn)
+            with self._lock_stats:
+                self._en_uso -= 1
+            self._lectores.put(conn)
+
+    @contextmanager
+    def escritor(self):
+        """Presta la conexión de escritura en exclusiva."""
+        espero = not self._lock_escritor.acquire(blocking=False)
+        if espero and not self._lock_escritor.acquire(timeout=ESPERA_MAXIMA):
+            raise PoolAgotadoError("La conexión de escritura está ocupada")
+        with self._lock_stats:
+            self._stats["escritor_checkouts"] += 1
+            if espero:
+                self._stats["escritor_esperas"] += 1
+        try:
+            yield self._escritor
+        finally:
+            self._limpiar(self._escritor)
+            self._lock_escritor.release()
+
+    def optimizar(self):
+        """
+        PRAGMA optimize en la conexión de escritura. Si está ocupada (una
+        importación, por ejemplo) se deja para la próxima vez.
+        """
+        try:
+            with self.escritor() as conn:
+                conn.execute(f"PRAGMA analysis_limit={LIMITE_ANALISIS}")
+                conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+
+    def estadisticas(self) -> dict:
+        """Devuelve una copia de los contadores del pool."""
+        with self._lock_stats:
+            return {
+                **self._stats,
+                "lectores": self._num_lectores,
+                "lectores_en_uso": self._en_uso,
+                "escritor_ocupado": self._lock_escritor.locked(),
+            }
+
+    def cerrar(self):
+        """Cierra todas las conexiones del pool."""
+        while True:
+            try:
+                self._lectores.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock_escritor:
+            self._escritor.close()
@@ -1,20 +1,54 @@
+import asyncio
+import os
+import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException
 from pydantic import BaseModel
 from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
 
-# Configuración JWT
-SECRET_KEY = "cambia_esto_por_una_clave_secreta"
+# Configuración JWT. El rol va dentro del token y es lo único que se mira en
+# las rutas de admin: sin JWT_SECRET_KEY se usa una clave aleatoria de este
+# proceso (los tokens dejan de valer al reiniciar) en vez de una conocida
+SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+if not SECRET_KEY:
+    SECRET_KEY = secrets.token_urlsafe(32)
+    print("JWT_SECRET_KEY no está definida: se usa una clave aleatoria y los tokens no sobrevivirán a un reinicio")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+# El refresh token permite pedir tokens nuevos sin volver a pasar por bcrypt
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# Coste de bcrypt (log2 de las rondas). Los hashes con otro coste se rehacen
+# en el siguiente login correcto, así que se puede subir o bajar sin migrar
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt suelta el GIL mientras calcula: con hilos se aprovechan todos los
+# núcleos sin el coste de arrancar procesos en la Raspberry
+HASH_HILOS = int(os.getenv("HASH_HILOS", str(os.cpu_count() or 1)))
+# Hashes esperando turno además de los que se están calculando; a partir de
+# ahí se responde 429 en vez de acumular peticiones
+HASH_COLA = int(os.getenv("HASH_COLA", str(HASH_HILOS * 4)))
+HASH_REINTENTAR_EN = 2
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 # Modelos Pydantic
 class UserCreate(BaseModel):
     nombre: str
     contraseña: str
-    rol_id: int
+
+class CambioRol(BaseModel):
+    rol: str
 
 class UserLogin(BaseModel):
     nombre: str
@@ -23,6 +57,60 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class PoolHash:
+    """
+    Hilos dedicados a bcrypt, separados del threadpool de FastAPI para que
+    una ráfaga de logins no deje sin hilos al resto de endpoints. Admite como
+    mucho `hilos + cola` operaciones a la vez; las demás reciben 429.
+    """
+
+    def __init__(self, hilos: int = HASH_HILOS, cola: int = HASH_COLA):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, hilos), thread_name_prefix="bcrypt")
+        self._hilos = max(1, hilos)
+        self._maximo = self._hilos + max(0, cola)
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._stats = {"completadas": 0, "rechazadas": 0, "maximo_pendientes": 0}
+
+    def _terminada(self, _futuro: Future):
+        # Cuando acaba el hash, no la petición: si el cliente se va antes, el
+        # hilo sigue ocupado y la operación debe seguir contando
+        with self._lock:
+            self._pendientes -= 1
+            self._stats["completadas"] += 1
+
+    async def ejecutar(self, funcion: Callable, *args):
+        with self._lock:
+            if self._pendientes >= self._maximo:
+                self._stats["rechazadas"] += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail="Demasiadas peticiones de autenticación, inténtalo de nuevo en unos segundos",
+                    headers={"Retry-After": str(HASH_REINTENTAR_EN)}
+                )
+            self._pendientes += 1
+            self._stats["maximo_pendientes"] = max(self._stats["maximo_pendientes"], self._pendientes)
+        futuro = self._executor.submit(funcion, *args)
+        futuro.add_done_callback(self._terminada)
+        return await asyncio.wrap_future(futuro)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "hilos": self._hilos,
+                "maximo": self._maximo,
+                "pendientes": self._pendientes,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+            }
+
+pool_hash = PoolHash()
 
 class AuthUtils:
     @staticmethod
@@ -34,8 +122,34 @@ class AuthUtils:
         return pwd_context.verify(plain_password, hashed_password)
 
     @staticmethod
-    def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
+    def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verifica la contraseña y devuelve (correcta, nuevo hash). El nuevo hash
+        solo viene si el guardado usa otro coste o esquema que el configurado.
+        """
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+
+    @staticmethod
+    def create_access_token(data: dict, expires_delta: timedelta = None, token_type: str = "access") -> str:
         to_encode = data.copy()
         expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
-        to_encode.update({"exp": expire})
+        to_encode.update({"exp": expire, "type": token_type})
         return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+    @staticmethod
+    def create_tokens(user_id: int, nombre: str, rol: str) -> dict:
+        """Par de tokens de acceso y de refresco para la respuesta de login."""
+        data = {"sub": nombre, "user_id": user_id, "role": rol}
+        return {
+            "access_token": AuthUtils.create_access_token(data, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)),
+            "refresh_token": AuthUtils.create_access_token(
+                data, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS), token_type="refresh"
+            ),
+            "token_type": "bearer",
+            "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        }
+
+    @staticmethod
+    def decode_token(token: str) -> dict:
+        """Comprueba firma y caducidad; lanza JWTError si el token no es válido."""
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
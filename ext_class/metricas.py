@@ -0,0 +1,176 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Cubos de los histogramas (segundos y bytes), pensados para la Raspberry:
+# una consulta normal tarda milisegundos y una petición de catálogo decenas
+CUBOS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CUBOS_SQL = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0)
+CUBOS_BYTES = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: Tuple, extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, etiquetas
+        self._lock = threading.Lock()
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, *valores, cantidad: float = 1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            valores = list(self._valores.items())
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        lineas += [f"{self.nombre}{_etiquetas(self.etiquetas, k)} {v}" for k, v in sorted(valores)]
+        return lineas
+
+
+class Medidor(Contador):
+    def fijar(self, *valores, valor: float):
+        with self._lock:
+            self._valores[valores] = valor
+
+    def exponer(self) -> List[str]:
+        lineas = super().exponer()
+        lineas[1] = f"# TYPE {self.nombre} gauge"
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...], cubos: Tuple[float, ...]):
+        self.nombre, self.ayuda, self.etiquetas, self.cubos = nombre, ayuda, etiquetas, cubos
+        self._lock = threading.Lock()
+        # Por combinación de etiquetas: [conteo por cubo..., +Inf], suma
+        self._series: Dict[Tuple, list] = {}
+
+    def observar(self, valor: float, *valores):
+        indice = bisect_left(self.cubos, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.cubos) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            series = [(k, list(c), s) for k, (c, s) in self._series.items()]
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for valores, conteos, suma in sorted(series):
+            acumulado = 0
+            for cubo, conteo in zip(self.cubos + (float("inf"),), conteos):
+                acumulado += conteo
+                le = 'le="+Inf"' if cubo == float("inf") else f'le="{cubo}"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {suma}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {acumulado}")
+        return lineas
+
+
+class Metricas:
+    """
+    Registro de métricas en proceso con salida en el formato de texto de
+    Prometheus. Los valores que ya llevan otros servicios (pool, cachés...)
+    se leen con `recolectores` al pedir /metrics en vez de duplicarlos.
+    """
+
+    peticiones = Contador("http_peticiones_total", "Peticiones HTTP atendidas", ("metodo", "ruta", "estado"))
+    duracion = Histograma("http_duracion_segundos", "Duración de las peticiones HTTP", ("metodo", "ruta"), CUBOS_HTTP)
+    tamano = Histograma("http_respuesta_bytes", "Tamaño del cuerpo de las respuestas", ("ruta",), CUBOS_BYTES)
+    en_curso = Medidor("http_peticiones_en_curso", "Peticiones HTTP en curso")
+    sql = Histograma("sql_duracion_segundos", "Duración de las sentencias SQL por función que las lanza",
+                     ("consulta", "operacion"), CUBOS_SQL)
+    sql_errores = Contador("sql_errores_total", "Sentencias SQL que han fallado", ("consulta", "operacion"))
+
+    _lock = threading.Lock()
+    _en_curso = 0
+    _recolectores: List[Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]] = []
+
+    @staticmethod
+    def recolector(funcion: Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]):
+        """Registra una función que devuelve (nombre, ayuda, etiquetas, valor) de medidores externos."""
+        Metricas._recolectores.append(funcion)
+
+    @staticmethod
+    def _cambiar_en_curso(delta: int):
+        with Metricas._lock:
+            Metricas._en_curso += delta
+            Metricas.en_curso.fijar(valor=Metricas._en_curso)
+
+    @staticmethod
+    def exponer() -> str:
+        lineas = []
+        for metrica in (Metricas.peticiones, Metricas.duracion, Metricas.tamano,
+                        Metricas.en_curso, Metricas.sql, Metricas.sql_errores):
+            lineas += metrica.exponer()
+        vistos = set()
+        for recolector in Metricas._recolectores:
+            for nombre, ayuda, etiquetas, valor in recolector():
+                if nombre not in vistos:
+                    vistos.add(nombre)
+                    lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge"]
+                nombres = tuple(etiquetas)
+                lineas.append(f"{nombre}{_etiquetas(nombres, tuple(etiquetas[n] for n in nombres))} {float(valor)}")
+        return "\n".join(lineas) + "\n"
+
+
+def medidores(prefijo: str, ayuda: str, estadisticas: Callable[[], dict]):
+    """Recolector que publica como medidores los valores numéricos de un dict de estadísticas."""
+
+    def recolectar():
+        for clave, valor in estadisticas().items():
+            if isinstance(valor, (int, float)):
+                yield f"{prefijo}_{clave}", ayuda, {}, valor
+
+    return recolectar
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que mide cada petición hasta que termina de enviarse el
+    cuerpo. Se etiqueta con la plantilla de la ruta (/juegos/consola/{consola_id})
+    y no con la URL, para que el número de series no crezca con cada ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        inicio = time.perf_counter()
+        estado, enviados = 500, 0
+
+        async def enviar(mensaje):
+            nonlocal estado, enviados
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                enviados += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        Metricas._cambiar_en_curso(1)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            Metricas._cambiar_en_curso(-1)
+            ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+            metodo = scope["method"]
+            Metricas.peticiones.inc(metodo, ruta, estado)
+            Metricas.duracion.observar(time.perf_counter() - inicio, metodo, ruta)
+            Metricas.tamano.observar(enviados, ruta)
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError
+from pydantic import BaseModel
+
+from database.database import get_pool
+from ext_class.auth_utils import AuthUtils
+
+# Tokens ya verificados que se recuerdan, y durante cuánto como máximo
+TOKEN_CACHE_ENTRADAS = int(os.getenv("TOKEN_CACHE_ENTRADAS", "4096"))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+# Administrador que se asegura al arrancar. El registro público solo crea
+# usuarios USER, así que en una instalación nueva es la forma de tener el
+# primero; si el usuario ya existe solo se le da el rol ADMIN
+ADMIN_USUARIO = os.getenv("ADMIN_USUARIO")
+ADMIN_CONTRASENA = os.getenv("ADMIN_CONTRASENA")
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+class UsuarioToken(BaseModel):
+    id: int
+    nombre: str
+    rol: str
+
+
+class MapaRoles:
+    """
+    Roles (id -> nombre) cargados al arrancar, para no consultar la tabla
+    roles en cada login ni en cada petición autenticada.
+    """
+
+    _roles: Dict[int, str] = {}
+
+    @staticmethod
+    def cargar(db: Optional[sqlite3.Connection] = None):
+        if db is None:
+            with get_pool().lector() as conn:
+                return MapaRoles.cargar(conn)
+        MapaRoles._roles = {rol_id: nombre.lower() for rol_id, nombre in db.execute("SELECT id, nombre FROM roles")}
+
+    @staticmethod
+    def nombre(rol_id: int) -> Optional[str]:
+        return MapaRoles._roles.get(rol_id)
+
+    @staticmethod
+    def existe(nombre: str) -> bool:
+        return nombre in MapaRoles._roles.values()
+
+
+def asegurar_admin():
+    """
+    Crea ADMIN_USUARIO con rol ADMIN si no existe, o le da ese rol si ya
+    existía (sin tocar su contraseña). No hace nada si no está definido.
+    """
+    if not ADMIN_USUARIO:
+        return
+    with get_pool().lector() as db:
+        existe = db.execute("SELECT 1 FROM usuarios WHERE nombre = ?", (ADMIN_USUARIO,)).fetchone()
+    if not existe and not ADMIN_CONTRASENA:
+        print(f"ADMIN_USUARIO={ADMIN_USUARIO} no existe y falta ADMIN_CONTRASENA para crearlo")
+        return
+    # El hash se calcula sin tener el escritor, como en el registro
+    hashed_password = None if existe else AuthUtils.get_password_hash(ADMIN_CONTRASENA)
+    with get_pool().escritor() as db:
+        rol = db.execute("SELECT id FROM roles WHERE nombre = 'ADMIN'").fetchone()
+        if not rol:
+            raise RuntimeError("No existe el rol ADMIN")
+        if hashed_password is None:
+            db.execute("UPDATE usuarios SET rol_id = ? WHERE nombre = ?", (rol[0], ADMIN_USUARIO))
+        else:
+            db.execute(
+                "INSERT INTO usuarios (nombre, contraseña, rol_id) VALUES (?, ?, ?) "
+                "ON CONFLICT (nombre) DO UPDATE SET rol_id = excluded.rol_id",
+                (ADMIN_USUARIO, hashed_password, rol[0])
+            )
+        db.commit()
+
+
+class CacheTokens:
+    """
+    LRU con caducidad de claims ya verificados, indexada por el hash del
+    token. Una entrada nunca dura más que el propio token.
+    """
+
+    _lock = threading.Lock()
+    _entradas: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+    @staticmethod
+    def _clave(token: str) -> bytes:
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+    @staticmethod
+    def obtener(token: str) -> Optional[dict]:
+        clave = CacheTokens._clave(token)
+        with CacheTokens._lock:
+            entrada = CacheTokens._entradas.get(clave)
+            if entrada is None:
+                return None
+            caduca, claims = entrada
+            if caduca <= time.time():
+                del CacheTokens._entradas[clave]
+                return None
+            CacheTokens._entradas.move_to_end(clave)
+            return claims
+
+    @staticmethod
+    def guardar(token: str, claims: dict):
+        caduca = min(float(claims.get("exp", 0)), time.time() + TOKEN_CACHE_TTL)
+        with CacheTokens._lock:
+            CacheTokens._entradas[CacheTokens._clave(token)] = (caduca, claims)
+            while len(CacheTokens._entradas) > TOKEN_CACHE_ENTRADAS:
+                CacheTokens._entradas.popitem(last=False)
+
+
+def _no_autorizado(detalle: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detalle, headers={"WWW-Authenticate": "Bearer"})
+
+
+def verificar_token(token: str, tipo: str = "access") -> UsuarioToken:
+    """Valida un token sin consultar la base de datos; 401 si no sirve."""
+    claims = CacheTokens.obtener(token)
+    if claims is None:
+        try:
+            claims = AuthUtils.decode_token(token)
+        except JWTError:
+            raise _no_autorizado("Token no válido o caducado")
+        CacheTokens.guardar(token, claims)
+    # Los tokens de antes de los refresh tokens no llevan tipo: son de acceso
+    if claims.get("type", "access") != tipo:
+        raise _no_autorizado("Tipo de token incorrecto")
+    rol = claims.get("role")
+    if "user_id" not in claims or not rol or not MapaRoles.existe(rol):
+        raise _no_autorizado("Token no válido o caducado")
+    return UsuarioToken(id=claims["user_id"], nombre=claims.get("sub", ""), rol=rol)
+
+
+async def usuario_actual(credenciales: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> UsuarioToken:
+    """Dependencia que exige un token de acceso válido en Authorization: Bearer."""
+    if credenciales is None:
+        raise _no_autorizado("Falta el token de acceso")
+    return verificar_token(credenciales.credentials)
+
+
+def requiere_rol(*roles: str):
+    """Dependencia que además exige uno de los roles indicados; 403 si no lo tiene."""
+    permitidos = {r.lower() for r in roles}
+
+    async def comprobar(usuario: UsuarioToken = Depends(usuario_actual)) -> UsuarioToken:
+        if usuario.rol not in permitidos:
+            raise HTTPException(status_code=403, detail="No tienes permiso para esta operación")
+        return usuario
+
+    return comprobar
@@ -1,29 +1,62 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 from functools import lru_cache
 
 from ext_class.config import Settings
-from database.database import init_db
+from database.database import init_db, get_pool, cerrar_pool, optimizar_en_segundo_plano
+from database.pool import PoolAgotadoError
+from database import asincrono
 from services.database_service import DatabaseService
+from services.fuzzy_service import FuzzyService
+from services.suggest_service import SuggestService
+from services.catalogo_service import CatalogoService
+from services.cache_service import CatalogoVersion, RespuestaCache
+from services.serializacion import RespuestaJSON
+from services.compresion import CompresionMiddleware, CacheComprimidos
+from services.descarga_service import DescargaService
+from services.blob_service import BlobService
+from services.subida_service import SubidaService
+from ext_class.auth_utils import pool_hash
+from ext_class.seguridad import MapaRoles, asegurar_admin
+from ext_class.metricas import Metricas, MetricasMiddleware, medidores
 
 # Importar routers
-from routers import auth, empresas, consolas, juegos, usuarios, search, search_general
+from routers import auth, empresas, consolas, juegos, usuarios, search, search_general, admin
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestiona el ciclo de vida de la aplicación."""
     init_db()
-    DatabaseService.merge_juegos_db()
+    MapaRoles.cargar()
+    asegurar_admin()
+    BlobService.recolectar()
+    SubidaService.limpiar_caducadas()
+    DatabaseService.merge_en_segundo_plano()
+    FuzzyService.cargar_en_segundo_plano()
+    SuggestService.cargar_en_segundo_plano()
+    CatalogoService.cargar_en_segundo_plano()
+    optimizar_en_segundo_plano(SubidaService.limpiar_caducadas)
+    CatalogoVersion.vigilar_en_segundo_plano()
     yield
+    CatalogoVersion.parar()
+    cerrar_pool()
 
 app = FastAPI(
     title="API de Juegos Retro",
     description="API para gestionar juegos retro con autenticación y rutas en la nube",
     version="1.0.0",
+    default_response_class=RespuestaJSON,
     lifespan=lifespan
 )
 
+# Compresión de las respuestas JSON (la de CORS se añade después y queda por fuera)
+app.add_middleware(CompresionMiddleware)
+
+# Métricas por ruta; queda por fuera de la compresión y mide los bytes enviados
+app.add_middleware(MetricasMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +64,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["WWW-Authenticate", "X-Next-Cursor", "X-Total-Count", "ETag", "Content-Range", "Content-Disposition"],
 )
 
 # Incluir routers
@@ -41,6 +75,7 @@ app.include_router(consolas.router)
 app.include_router(juegos.router)
 app.include_router(search.router)
 app.include_router(search_general.router)
+app.include_router(admin.router)
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -54,6 +89,90 @@ async def root():
 async def get_version(settings: Settings = Depends(get_settings)):
     return {"version": settings.version}
 
+# Ocupación del pool a partir de la cual /health avisa de que va justo
+SATURACION_DEGRADADA = 0.9
+
+Metricas.recolector(medidores("db_pool", "Pool de conexiones SQLite", lambda: get_pool().estadisticas()))
+Metricas.recolector(medidores("db_lectura", "Consultas de los endpoints async", asincrono.lectura.estadisticas))
+Metricas.recolector(medidores("db_escritura", "Escrituras de los endpoints async", asincrono.escritura.estadisticas))
+Metricas.recolector(medidores("hash_pool", "Pool de bcrypt", pool_hash.estadisticas))
+Metricas.recolector(medidores("descargas", "Descargas en curso", DescargaService.estadisticas))
+Metricas.recolector(medidores("cache_respuestas", "Caché de respuestas del catálogo", RespuestaCache.estadisticas))
+Metricas.recolector(medidores("catalogo_memoria", "Instantánea del catálogo en memoria", CatalogoService.estadisticas))
+Metricas.recolector(medidores("cache_comprimidos", "Caché de cuerpos comprimidos", CacheComprimidos.estadisticas))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas en formato de texto de Prometheus."""
+    return PlainTextResponse(Metricas.exponer(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+def health_check():
+    """
+    Comprueba que la base de datos responde (con una conexión del pool y
+    una espera corta) y la ocupación del pool. 503 si no hay base de datos.
+    """
+    pool = get_pool()
+    try:
+        with pool.lector(espera=1.0) as db:
+            db.execute("SELECT 1").fetchone()
+        base_datos = "ok"
+    except PoolAgotadoError:
+        base_datos = "sin conexiones libres"
+    except Exception as e:
+        return RespuestaJSON({"status": "unhealthy", "base_datos": str(e)}, status_code=503)
+    stats = pool.estadisticas()
+    saturacion = round(stats["lectores_en_uso"] / stats["lectores"], 2)
+    degradado = base_datos != "ok" or saturacion >= SATURACION_DEGRADADA
+    return {
+        "status": "degraded" if degradado else "healthy",
+        "base_datos": base_datos,
+        "saturacion_lectores": saturacion,
+        "escritor_ocupado": stats["escritor_ocupado"],
+        "consultas_pendientes": asincrono.lectura.estadisticas()["pendientes"],
+        "pendientes_hash": pool_hash.estadisticas()["pendientes"],
+    }
+
+@app.get("/health/pool")
+async def pool_stats():
+    """Estadísticas del pool de conexiones SQLite y de los hilos que lo usan desde los endpoints async."""
+    return {
+        **get_pool().estadisticas(),
+        "ejecutor_lectura": asincrono.lectura.estadisticas(),
+        "ejecutor_escritura": asincrono.escritura.estadisticas(),
+    }
+
+@app.get("/health/hash")
+async def hash_stats():
+    """Ocupación del pool de bcrypt y peticiones rechazadas con 429."""
+    return pool_hash.estadisticas()
+
+@app.get("/health/descargas")
+async def download_stats():
+    """Descargas en curso frente al máximo permitido."""
+    return DescargaService.estadisticas()
+
+@app.get("/health/blobs")
+async def blob_stats():
+    """Espacio del almacén de blobs y lo que se ahorra deduplicando."""
+    return await asincrono.lectura.ejecutar(BlobService.estadisticas)
+
+@app.get("/health/importacion")
+async def import_stats():
+    """Progreso de la importación de juegos.db (filas procesadas y filas por segundo)."""
+    return DatabaseService.estado_importacion()
+
+@app.get("/health/cache")
+async def cache_stats():
+    """Estadísticas de la caché de respuestas del catálogo."""
+    return RespuestaCache.estadisticas()
+
+@app.get("/health/catalogo")
+async def catalog_stats():
+    """Instantánea del catálogo en memoria: si está al día, tamaño y tiempo de carga."""
+    return CatalogoService.estadisticas()
+
+@app.get("/health/compresion")
+async def compression_stats():
+    """Bytes ahorrados comprimiendo y aciertos de la caché de cuerpos comprimidos."""
+    return CacheComprimidos.estadisticas()
@@ -51,4 +51,32 @@ class SearchGameResponse(BaseModel):
 class SearchResponse(BaseModel):
     companies: List[SearchCompanyResponse]
     consoles: List[SearchConsoleResponse]
-    games: List[SearchGameResponse]
\ No newline at end of file
+    games: List[SearchGameResponse]
+
+class SuggestItem(BaseModel):
+    id: int
+    name: str
+
+class SuggestResponse(BaseModel):
+    games: List[SuggestItem]
+    consoles: List[SuggestItem]
+    companies: List[SuggestItem]
+
+class SubidaResponse(BaseModel):
+    upload_id: str
+    juego_id: int
+    consola_id: int
+    size: int
+    chunk_size: int
+    chunks: int
+    next_chunk: int
+    received_bytes: int
+    status: str
+    ruta: Optional[str] = None
+
+class MiembroZipResponse(BaseModel):
+    nombre: str
+    tamano: int
+    tamano_comprimido: int
+    crc32: str
+    fecha: Optional[str] = None
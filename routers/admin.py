@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query
+from database.perfil import PerfilSQL
+from ext_class.seguridad import requiere_rol
+from services.escaneo_service import EscaneoService
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(requiere_rol("admin"))])
+
+@router.post("/escaneo")
+def escanear_archivos(
+    limpiar_colgadas: bool = Query(False, description="Vacía las rutas cuyo archivo ya no existe")
+):
+    """
+    Recorre la carpeta de juegos y registra de una vez todos los archivos que
+    casan con un juego del catálogo. Las carpetas sin cambios desde el último
+    escaneo no se vuelven a listar.
+    """
+    return EscaneoService.escanear(limpiar_colgadas)
+
+@router.get("/sql")
+def sentencias_sql(
+    limite: int = Query(20, ge=1, le=500, description="Número de sentencias"),
+    orden: str = Query("total_s", pattern="^(total_s|media_ms|maximo_s|llamadas|lentas)$", description="Criterio de orden")
+):
+    """
+    Sentencias SQL con más tiempo acumulado desde que se activó el perfil,
+    con su plan de ejecución y avisos de recorridos completos de tabla o
+    B-trees temporales, más las últimas sentencias lentas con sus parámetros.
+    """
+    return PerfilSQL.top(limite, orden)
+
+@router.post("/sql")
+def activar_perfil_sql(activo: bool = Query(..., description="Activa o desactiva el perfil de SQL")):
+    """Activa o desactiva el perfil sin reiniciar; al activarlo se empieza de cero."""
+    if activo and not PerfilSQL.activo:
+        PerfilSQL.reiniciar()
+    PerfilSQL.activo = activo
+    return {"activo": PerfilSQL.activo}
+
+@router.delete("/sql", status_code=204)
+def reiniciar_perfil_sql():
+    """Vacía las estadísticas del perfil de SQL."""
+    PerfilSQL.reiniciar()
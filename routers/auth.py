@@ -1,52 +1,93 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
-from database.database import get_db
-from ext_class.auth_utils import UserCreate, UserLogin, Token, AuthUtils
+from database.database import get_pool, get_db_lectura
+from ext_class.auth_utils import UserCreate, UserLogin, Token, RefreshRequest, AuthUtils, pool_hash
+from ext_class.seguridad import MapaRoles, verificar_token
 from models.responses import UsuarioResponse, RolResponse
 from typing import List
 import sqlite3
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-@router.post("/register", status_code=201)
-def crear_usuario(user: UserCreate, db=Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT id FROM usuarios WHERE nombre = ?", (user.nombre,))
-    if cursor.fetchone():
-        raise HTTPException(status_code=400, detail="El usuario ya existe")
+# Rol de los usuarios que se registran solos; solo un admin puede cambiarlo
+ROL_REGISTRO = "USER"
+
+def _crear_usuario(user: UserCreate):
+    with get_pool().lector() as db:
+        if db.execute("SELECT 1 FROM usuarios WHERE nombre = ?", (user.nombre,)).fetchone():
+            raise HTTPException(status_code=400, detail="El usuario ya existe")
     
+    # El hash se calcula sin tener el escritor, que es único
     hashed_password = AuthUtils.get_password_hash(user.contraseña)
-    cursor.execute(
-        "INSERT INTO usuarios (nombre, contraseña, rol_id) VALUES (?, ?, ?)",
-        (user.nombre, hashed_password, user.rol_id)
-    )
-    db.commit()
-    return {"msg": "Usuario creado correctamente"}
+    with get_pool().escritor() as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT id FROM usuarios WHERE nombre = ?", (user.nombre,))
+        if cursor.fetchone():
+            raise HTTPException(status_code=400, detail="El usuario ya existe")
+        cursor.execute(
+            "INSERT INTO usuarios (nombre, contraseña, rol_id) SELECT ?, ?, id FROM roles WHERE nombre = ?",
+            (user.nombre, hashed_password, ROL_REGISTRO)
+        )
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=500, detail="Rol de registro no encontrado")
+        db.commit()
 
-@router.post("/login", response_model=Token)
-def login(user: UserLogin, db=Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT id, contraseña, rol_id FROM usuarios WHERE nombre = ?", (user.nombre,))
-    row = cursor.fetchone()
+def _login(user: UserLogin) -> dict:
+    with get_pool().lector() as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT id, contraseña, rol_id FROM usuarios WHERE nombre = ?", (user.nombre,))
+        row = cursor.fetchone()
     if not row:
         raise HTTPException(status_code=400, detail="Usuario o contraseña incorrectos")
     
     user_id, hashed_password, rol_id = row
     
-    if not AuthUtils.verify_password(user.contraseña, hashed_password):
+    correcta, nuevo_hash = AuthUtils.verify_and_update(user.contraseña, hashed_password)
+    if not correcta:
         raise HTTPException(status_code=400, detail="Usuario o contraseña incorrectos")
+    if nuevo_hash:
+        # Cambió BCRYPT_ROUNDS: guardar el hash con el coste nuevo, salvo que
+        # la contraseña haya cambiado mientras tanto
+        with get_pool().escritor() as db:
+            db.execute(
+                "UPDATE usuarios SET contraseña = ? WHERE id = ? AND contraseña = ?",
+                (nuevo_hash, user_id, hashed_password)
+            )
+            db.commit()
     
-    cursor.execute("SELECT nombre FROM roles WHERE id = ?", (rol_id,))
-    rol_row = cursor.fetchone()
-    
-    if not rol_row:
+    rol_nombre = MapaRoles.nombre(rol_id)
+    if not rol_nombre:
         raise HTTPException(status_code=400, detail="Rol no encontrado para el usuario")
     
-    rol_nombre = rol_row[0].lower()
-    access_token = AuthUtils.create_access_token(data={"sub": user.nombre, "user_id": user_id, "role": rol_nombre})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return AuthUtils.create_tokens(user_id, user.nombre, rol_nombre)
+
+# Registro y login corren enteros en el pool de bcrypt (ver PoolHash): no
+# ocupan hilos del threadpool de FastAPI y, si hay demasiados, responden 429
+@router.post("/register", status_code=201)
+async def crear_usuario(user: UserCreate):
+    await pool_hash.ejecutar(_crear_usuario, user)
+    return {"msg": "Usuario creado correctamente"}
+
+@router.post("/login", response_model=Token)
+async def login(user: UserLogin):
+    return await pool_hash.ejecutar(_login, user)
+
+@router.post("/refresh", response_model=Token)
+def refrescar_token(peticion: RefreshRequest, db: sqlite3.Connection = Depends(get_db_lectura)):
+    """
+    Cambia un refresh token válido por un par de tokens nuevos sin pasar por
+    bcrypt. El rol se vuelve a leer por si ha cambiado desde el login.
+    """
+    usuario = verificar_token(peticion.refresh_token, tipo="refresh")
+    cursor = db.cursor()
+    cursor.execute("SELECT nombre, rol_id FROM usuarios WHERE id = ?", (usuario.id,))
+    row = cursor.fetchone()
+    rol_nombre = MapaRoles.nombre(row[1]) if row else None
+    if not rol_nombre:
+        raise HTTPException(status_code=401, detail="El usuario ya no existe", headers={"WWW-Authenticate": "Bearer"})
+    return AuthUtils.create_tokens(usuario.id, row[0], rol_nombre)
 
 @router.get("/roles", response_model=List[RolResponse])
-def listar_roles(db: sqlite3.Connection = Depends(get_db)):
+def listar_roles(db: sqlite3.Connection = Depends(get_db_lectura)):
     cursor = db.cursor()
     cursor.execute("SELECT nombre FROM roles;")
     filas = cursor.fetchall()
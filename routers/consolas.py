@@ -1,42 +1,70 @@
-from fastapi import APIRouter, Depends
-from database.database import get_db
-from services.game_service import GameService
+from fastapi import APIRouter, Query, Request
+from services.serializacion import RespuestaJSON
+from services.game_service import GameService, AsyncGameService
+from services.cache_service import RespuestaCache
+from services.paginacion import decodificar_cursor, paginar, cabeceras_pagina, respuesta_ndjson
 from models.responses import ConsolaResponse, ConsolaConEmpresaResponse
-from typing import List
+from typing import List, Optional
 import sqlite3
 
 router = APIRouter(prefix="/consolas", tags=["consolas"])
 
 @router.get("/empresa/{empresa_id}", response_model=List[ConsolaResponse])
-def consolas_por_empresa(empresa_id: int, db: sqlite3.Connection = Depends(get_db)):
-    consolas = GameService.get_consolas_por_empresa(db, empresa_id)
-    return [{"consola_id": c[0], "nombre": c[1]} for c in consolas]
+async def consolas_por_empresa(empresa_id: int):
+    consolas = await AsyncGameService.get_consolas_por_empresa(empresa_id)
+    return RespuestaJSON([{"consola_id": c[0], "nombre": c[1]} for c in consolas])
+
+def _consolas_ndjson(db: sqlite3.Connection, despues: Optional[tuple]):
+    for c in GameService.get_todas_consolas(db, despues=despues, iterar=True):
+        yield {"consola_id": c[0], "consola_nombre": c[1], "empresa_nombre": c[2]}
 
 @router.get("/all", response_model=List[ConsolaConEmpresaResponse])
-def todas_las_consolas(db: sqlite3.Connection = Depends(get_db)):
-    """Obtiene todas las consolas sin filtrar por ruta en la nube."""
-    consolas = GameService.get_todas_consolas(db)
-    return [
-        {
-            "consola_id": c[0],
-            "consola_nombre": c[1],
-            "empresa_nombre": c[2]
-        } for c in consolas
-    ]
+async def todas_las_consolas(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamaño de página"),
+    after: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json o ndjson (una línea por consola, en streaming)")
+):
+    """
+    Obtiene todas las consolas sin filtrar por ruta en la nube.
+
+    Con `limit` se pagina por (empresa, consola, ID): la cabecera X-Next-Cursor
+    trae el valor de `after` para la página siguiente y X-Total-Count el total.
+    """
+    despues = decodificar_cursor(after, 3)
+    if format == "ndjson":
+        return respuesta_ndjson(_consolas_ndjson, despues)
+
+    def producir(db: sqlite3.Connection):
+        consolas = GameService.get_todas_consolas(db, limit + 1 if limit else None, despues)
+        consolas, siguiente = paginar(consolas, limit, lambda c: (c[2], c[1], c[0]))
+        return RespuestaJSON(
+            [
+                {
+                    "consola_id": c[0],
+                    "consola_nombre": c[1],
+                    "empresa_nombre": c[2]
+                } for c in consolas
+            ],
+            headers=cabeceras_pagina(siguiente, GameService.contar_todas_consolas(db))
+        )
+    return await RespuestaCache.responder(request, producir)
 
 @router.get("/all/empresa/{empresa_id}", response_model=List[ConsolaResponse])
-def todas_consolas_por_empresa(empresa_id: int, db: sqlite3.Connection = Depends(get_db)):
+async def todas_consolas_por_empresa(empresa_id: int):
     """Obtiene todas las consolas de una empresa sin filtrar por ruta en la nube."""
-    consolas = GameService.get_consolas_por_empresa_todas(db, empresa_id)
-    return [{"consola_id": c[0], "nombre": c[1]} for c in consolas]
+    consolas = await AsyncGameService.get_consolas_por_empresa_todas(empresa_id)
+    return RespuestaJSON([{"consola_id": c[0], "nombre": c[1]} for c in consolas])
 
 @router.get("/", response_model=List[ConsolaConEmpresaResponse])
-def todas_las_consolas_con_juegos(db: sqlite3.Connection = Depends(get_db)):
-    consolas = GameService.get_todas_consolas_con_juegos(db)
-    return [
-        {
-            "consola_id": c[0],
-            "consola_nombre": c[1],
-            "empresa_nombre": c[2]
-        } for c in consolas
-    ]
\ No newline at end of file
+async def todas_las_consolas_con_juegos(request: Request):
+    def producir(db: sqlite3.Connection):
+        consolas = GameService.get_todas_consolas_con_juegos(db)
+        return RespuestaJSON([
+            {
+                "consola_id": c[0],
+                "consola_nombre": c[1],
+                "empresa_nombre": c[2]
+            } for c in consolas
+        ])
+    return await RespuestaCache.responder(request, producir)
\ No newline at end of file
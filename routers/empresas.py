@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends
-from database.database import get_db
+from fastapi import APIRouter, Request
+from services.serializacion import RespuestaJSON
 from services.game_service import GameService
+from services.cache_service import RespuestaCache
 from models.responses import EmpresaResponse
 from typing import List
 import sqlite3
@@ -8,6 +9,8 @@ import sqlite3
 router = APIRouter(prefix="/empresas", tags=["empresas"])
 
 @router.get("/", response_model=List[EmpresaResponse])
-def empresas_con_juegos_con_route(db: sqlite3.Connection = Depends(get_db)):
-    empresas = GameService.get_empresas_con_juegos(db)
-    return [{"empresa_id": e[0], "empresa_nombre": e[1]} for e in empresas]
\ No newline at end of file
+async def empresas_con_juegos_con_route(request: Request):
+    def producir(db: sqlite3.Connection):
+        empresas = GameService.get_empresas_con_juegos(db)
+        return RespuestaJSON([{"empresa_id": e[0], "empresa_nombre": e[1]} for e in empresas])
+    return await RespuestaCache.responder(request, producir)
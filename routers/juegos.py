@@ -1,42 +1,140 @@
-from fastapi import APIRouter, Depends, Body
-from database.database import get_db
-from services.game_service import GameService
-from models.responses import JuegoResponse, RegistroJuegoResponse, ErrorResponse
-from typing import List, Union
+from fastapi import APIRouter, Depends, Body, Header, Query, Request
+from services.serializacion import RespuestaJSON, JSONCrudo
+from database.database import get_db_lectura
+from ext_class.seguridad import requiere_rol
+from services.game_service import GameService, AsyncGameService
+from services.cache_service import RespuestaCache
+from services.descarga_service import DescargaService
+from services.subida_service import SubidaService
+from services.contenido_service import ContenidoService
+from services.paginacion import decodificar_cursor, paginar, cabeceras_pagina, respuesta_ndjson
+from models.responses import JuegoResponse, RegistroJuegoResponse, ErrorResponse, SubidaResponse, MiembroZipResponse
+from typing import List, Optional, Union
 import sqlite3
 
 router = APIRouter(prefix="/juegos", tags=["juegos"])
 
 @router.get("/consola/{consola_id}", response_model=List[JuegoResponse])
-def juegos_por_consola(consola_id: int, db: sqlite3.Connection = Depends(get_db)):
-    juegos = GameService.get_juegos_por_consola(db, consola_id)
-    return [
-        {
-            "id": j[0],
-            "nombre": j[1],
-            "fecha_lanzamiento": j[2]
-        } for j in juegos
-    ]
+async def juegos_por_consola(consola_id: int, request: Request):
+    def producir(db: sqlite3.Connection):
+        return JSONCrudo(GameService.get_juegos_por_consola_json(db, consola_id))
+    return await RespuestaCache.responder(request, producir)
+
+def _juegos_ndjson(db: sqlite3.Connection, consola_id: int, despues: Optional[tuple]):
+    for j in GameService.get_todos_juegos_por_consola(db, consola_id, despues=despues, iterar=True):
+        yield {"id": j[0], "nombre": j[1], "fecha_lanzamiento": j[2]}
 
 @router.get("/all/consola/{consola_id}", response_model=List[JuegoResponse])
-def todos_juegos_por_consola(consola_id: int, db: sqlite3.Connection = Depends(get_db)):
-    """Obtiene todos los juegos de una consola sin filtrar por ruta en la nube."""
-    juegos = GameService.get_todos_juegos_por_consola(db, consola_id)
-    return [
-        {
-            "id": j[0],
-            "nombre": j[1],
-            "fecha_lanzamiento": j[2]
-        } for j in juegos
-    ]
-
-@router.post("/registrar", response_model=Union[RegistroJuegoResponse, ErrorResponse])
-def registrar_juego(
+async def todos_juegos_por_consola(
+    consola_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamaño de página"),
+    after: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json o ndjson (una línea por juego, en streaming)")
+):
+    """
+    Obtiene todos los juegos de una consola sin filtrar por ruta en la nube.
+
+    Con `limit` se pagina por (nombre, ID): la cabecera X-Next-Cursor trae el
+    valor de `after` para la página siguiente y X-Total-Count el total.
+    """
+    despues = decodificar_cursor(after, 2)
+    if format == "ndjson":
+        return respuesta_ndjson(_juegos_ndjson, consola_id, despues)
+    total = await AsyncGameService.contar_todos_juegos_por_consola(consola_id)
+    if not limit and not despues:
+        # Listado completo: el JSON lo construye SQLite de una vez
+        return JSONCrudo(
+            await AsyncGameService.get_todos_juegos_por_consola_json(consola_id),
+            headers=cabeceras_pagina(None, total)
+        )
+    juegos = await AsyncGameService.get_todos_juegos_por_consola(consola_id, limit + 1 if limit else None, despues)
+    juegos, siguiente = paginar(juegos, limit, lambda j: (j[1], j[0]))
+    return RespuestaJSON(
+        [
+            {
+                "id": j[0],
+                "nombre": j[1],
+                "fecha_lanzamiento": j[2]
+            } for j in juegos
+        ],
+        headers=cabeceras_pagina(siguiente, total)
+    )
+
+@router.post(
+    "/registrar",
+    response_model=Union[RegistroJuegoResponse, ErrorResponse],
+    dependencies=[Depends(requiere_rol("admin"))]
+)
+async def registrar_juego(
     juego_id: int = Body(...), 
-    consola_id: int = Body(...), 
-    db: sqlite3.Connection = Depends(get_db)
+    consola_id: int = Body(...)
 ):
-    ruta = GameService.registrar_juego(db, juego_id, consola_id)
+    ruta = await AsyncGameService.registrar_juego(juego_id, consola_id)
     if not ruta:
         return {"error": "No se encontró la combinación de juego y consola"}
-    return {"ruta": ruta}
\ No newline at end of file
+    return {"ruta": ruta}
+
+@router.api_route("/{juego_id}/consola/{consola_id}/download", methods=["GET", "HEAD"])
+def descargar_juego(juego_id: int, consola_id: int, db: sqlite3.Connection = Depends(get_db_lectura)):
+    """
+    Descarga el archivo registrado del juego. Admite cabeceras Range (e
+    If-Range) para reanudar o bajar por trozos en paralelo.
+    """
+    return DescargaService.responder(*GameService.get_archivo_juego(db, juego_id, consola_id))
+
+@router.get("/{juego_id}/consola/{consola_id}/contents", response_model=List[MiembroZipResponse])
+def contenido_juego(juego_id: int, consola_id: int, db: sqlite3.Connection = Depends(get_db_lectura)):
+    """Lista los ficheros del zip del juego (partidas, mods, parches) sin descargarlo."""
+    return ContenidoService.listar(*GameService.get_archivo_juego(db, juego_id, consola_id))
+
+@router.get("/{juego_id}/consola/{consola_id}/contents/{nombre:path}")
+def extraer_fichero(juego_id: int, consola_id: int, nombre: str, db: sqlite3.Connection = Depends(get_db_lectura)):
+    """Descarga un solo fichero del zip del juego, leyendo solo sus bytes."""
+    return ContenidoService.extraer(*GameService.get_archivo_juego(db, juego_id, consola_id), nombre)
+
+@router.post(
+    "/{juego_id}/consola/{consola_id}/uploads",
+    response_model=SubidaResponse,
+    status_code=201,
+    dependencies=[Depends(requiere_rol("admin"))]
+)
+def iniciar_subida(
+    juego_id: int,
+    consola_id: int,
+    size: int = Body(..., gt=0, description="Tamaño total del archivo en bytes"),
+    chunk_size: Optional[int] = Body(None, description="Tamaño de bloque en bytes (8 MiB por defecto)"),
+    sha256: Optional[str] = Body(None, description="SHA-256 del archivo completo, para comprobarlo al confirmar")
+):
+    """
+    Inicia una subida por bloques del archivo de un juego. Los bloques se
+    envían con PUT /juegos/uploads/{upload_id}/chunks/{n} y la subida se
+    confirma con POST /juegos/uploads/{upload_id}/commit.
+
+    Si el archivo con ese `sha256` ya está en el almacén, la subida queda
+    completada sin enviar bloques; en ese caso el hash declarado no se comprueba.
+    """
+    return SubidaService.iniciar(juego_id, consola_id, size, chunk_size, sha256)
+
+@router.get("/uploads/{upload_id}", response_model=SubidaResponse, dependencies=[Depends(requiere_rol("admin"))])
+def estado_subida(upload_id: str):
+    """Estado de una subida; `next_chunk` es el bloque desde el que reanudar."""
+    return SubidaService.estado(upload_id)
+
+@router.put("/uploads/{upload_id}/chunks/{indice}", response_model=SubidaResponse, dependencies=[Depends(requiere_rol("admin"))])
+async def subir_bloque(
+    upload_id: str,
+    indice: int,
+    request: Request,
+    x_chunk_sha256: str = Header(..., description="SHA-256 en hexadecimal del bloque")
+):
+    """Recibe un bloque en el cuerpo de la petición, tal cual (application/octet-stream)."""
+    return await SubidaService.recibir_bloque(upload_id, indice, x_chunk_sha256, request.stream())
+
+@router.post("/uploads/{upload_id}/commit", response_model=SubidaResponse, dependencies=[Depends(requiere_rol("admin"))])
+def confirmar_subida(upload_id: str):
+    """Comprueba la subida, mueve el archivo a su ruta y registra el juego."""
+    return SubidaService.finalizar(upload_id)
+
+@router.delete("/uploads/{upload_id}", status_code=204, dependencies=[Depends(requiere_rol("admin"))])
+def cancelar_subida(upload_id: str):
+    SubidaService.cancelar(upload_id)
@@ -1,36 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import Optional
-import sqlite3
 
-from services.database_service import DatabaseService
-from services.game_service import GameService
-from models.responses import SearchResponse
+from services.game_service import GameService, AsyncGameService
+from services.suggest_service import SuggestService
+from services.paginacion import decodificar_cursor, cabeceras_pagina, respuesta_ndjson, elementos_busqueda
+from models.responses import SearchResponse, SuggestResponse
 
 router = APIRouter(prefix="/search", tags=["search"])
 
 @router.get("/", response_model=SearchResponse)
 async def search(
+    response: Response,
     q: str = Query(..., description="Término de búsqueda"),
-    type: Optional[str] = Query("all", regex="^(games|companies|consoles|all)$", description="Filtro de tipo de búsqueda")
+    type: Optional[str] = Query("all", pattern="^(games|companies|consoles|all)$", description="Filtro de tipo de búsqueda"),
+    mode: str = Query("exact", pattern="^(exact|fuzzy)$", description="exact (texto completo) o fuzzy (tolerante a erratas)"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamaño de página de juegos"),
+    after: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json o ndjson (una línea por resultado, en streaming)")
 ):
     """
     Busca en empresas, consolas y juegos según el término proporcionado.
     
     - **q**: Término de búsqueda (obligatorio)
     - **type**: Filtro opcional (games, companies, consoles, all)
+    - **mode**: exact (por defecto) o fuzzy, que tolera acentos y erratas (mientras su índice
+      se construye al arrancar, se busca como exact)
+    - **limit** / **after**: paginación de los juegos; empresas y consolas van en la primera página
+    - **format**: json (por defecto) o ndjson en streaming
     
     Retorna un objeto con arrays de empresas, consolas y juegos que coinciden con la búsqueda.
     Solo incluye elementos que tienen juegos con ruta en la nube.
     """
+    despues = decodificar_cursor(after, 4)
+    if format == "ndjson":
+        return respuesta_ndjson(
+            lambda conn: elementos_busqueda(GameService.search_all(conn, q, type, mode == "fuzzy", despues=despues, iterar=True))
+        )
     try:
-        db = DatabaseService.get_db_connection()
-        results = GameService.search_all(db, q, type)
-        db.close()
-        
+        results = await AsyncGameService.search_all(q, type, fuzzy=mode == "fuzzy", limite=limit, despues=despues)
+        response.headers.update(cabeceras_pagina(results.get("siguiente"), results.get("total_games")))
         return SearchResponse(
             companies=results["companies"],
             consoles=results["consoles"],
             games=results["games"]
         )
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error en la búsqueda: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error en la búsqueda: {str(e)}")
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest(
+    q: str = Query(..., description="Texto escrito hasta el momento"),
+    limit: int = Query(8, ge=1, le=20, description="Número máximo de sugerencias por tipo")
+):
+    """
+    Autocompletado para la caja de búsqueda. Se sirve desde un índice de
+    prefijos en memoria, sin consultar la base de datos.
+    """
+    return SuggestService.sugerir(q, limit)
\ No newline at end of file
@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, Query
-from database.database import get_db
-from services.game_service import GameService
+from fastapi import APIRouter, Query, Response
+from services.game_service import GameService, AsyncGameService
+from services.paginacion import decodificar_cursor, cabeceras_pagina, respuesta_ndjson, elementos_busqueda
 from models.responses import SearchCompanyResponse, SearchConsoleResponse, SearchGameResponse
-from typing import List
-import sqlite3
+from typing import List, Optional
 
 router = APIRouter(prefix="/search-general", tags=["search-general"])
 
 @router.get("/all")
-def search_all_general(
+async def search_all_general(
+    response: Response,
     q: str = Query(..., description="Término de búsqueda"),
     type: str = Query("all", description="Tipo de búsqueda: all, companies, consoles, games"),
-    db: sqlite3.Connection = Depends(get_db)
+    mode: str = Query("exact", pattern="^(exact|fuzzy)$", description="exact (texto completo) o fuzzy (tolerante a erratas)"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamaño de página de juegos"),
+    after: Optional[str] = Query(None, description="Cursor de la cabecera X-Next-Cursor de la página anterior"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json o ndjson (una línea por resultado, en streaming)")
 ):
     """Busca en empresas, consolas y juegos sin filtrar por ruta en la nube."""
-    return GameService.search_all_general(db, q, type)
\ No newline at end of file
+    despues = decodificar_cursor(after, 4)
+    if format == "ndjson":
+        return respuesta_ndjson(
+            lambda conn: elementos_busqueda(GameService.search_all_general(conn, q, type, mode == "fuzzy", despues=despues, iterar=True))
+        )
+    results = await AsyncGameService.search_all_general(q, type, fuzzy=mode == "fuzzy", limite=limit, despues=despues)
+    response.headers.update(cabeceras_pagina(results.pop("siguiente", None), results.pop("total_games", None)))
+    return results
\ No newline at end of file
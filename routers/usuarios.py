@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
-from database.database import get_db
+from database.database import get_pool, get_db_lectura
+from ext_class.auth_utils import CambioRol
+from ext_class.seguridad import requiere_rol
 from models.responses import UsuarioResponse
 from typing import List
 import sqlite3
 
-router = APIRouter(prefix="/usuarios", tags=["usuarios"])
+router = APIRouter(prefix="/usuarios", tags=["usuarios"], dependencies=[Depends(requiere_rol("admin"))])
 
 @router.get("/rol/{rol}", response_model=List[UsuarioResponse])
-def usuarios_por_rol(rol: str, db: sqlite3.Connection = Depends(get_db)):
+def usuarios_por_rol(rol: str, db: sqlite3.Connection = Depends(get_db_lectura)):
     cursor = db.cursor()
     rol = rol.upper()
     cursor.execute("SELECT id FROM roles WHERE nombre = ?", (rol,))
@@ -21,4 +23,25 @@ def usuarios_por_rol(rol: str, db: sqlite3.Connection = Depends(get_db)):
         (rol_id,)
     )
     usuarios = cursor.fetchall()
-    return [{"id": u[0], "nombre": u[1]} for u in usuarios]
\ No newline at end of file
+    return [{"id": u[0], "nombre": u[1]} for u in usuarios]
+
+@router.put("/{usuario_id}/rol", response_model=UsuarioResponse)
+def cambiar_rol(usuario_id: int, cambio: CambioRol):
+    """
+    Asigna un rol a un usuario. El registro público siempre crea usuarios
+    con el rol USER; es la única forma de dar otro rol. El nuevo rol se
+    aplica en el siguiente login o refresh.
+    """
+    with get_pool().escritor() as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT id FROM roles WHERE nombre = ?", (cambio.rol.upper(),))
+        rol_row = cursor.fetchone()
+        if not rol_row:
+            raise HTTPException(status_code=404, detail="Rol no encontrado")
+        cursor.execute("UPDATE usuarios SET rol_id = ? WHERE id = ?", (rol_row[0], usuario_id))
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        db.commit()
+        cursor.execute("SELECT id, nombre FROM usuarios WHERE id = ?", (usuario_id,))
+        usuario = cursor.fetchone()
+    return {"id": usuario[0], "nombre": usuario[1]}
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import uuid
+from typing import Optional
+
+from database.database import get_pool
+from services.game_service import GameService
+from services.descarga_service import DescargaService, ruta_blob
+from services.contenido_service import ContenidoService
+
+TAMANO_LECTURA = 1024 * 1024
+
+
+def sha256_fichero(path: str) -> str:
+    """SHA-256 de un fichero leído por bloques."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(TAMANO_LECTURA), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+class BlobService:
+    """
+    Almacén de archivos direccionado por contenido. Un mismo archivo subido
+    para varias consolas o varias veces ocupa disco una sola vez; la ruta
+    legible de RUTA_NUBE se mantiene como enlace duro al blob cuando el
+    sistema de ficheros lo permite.
+
+    Las operaciones que crean o borran blobs se hacen con la conexión de
+    escritura prestada, que serializa el alta de un blob con su recolección.
+    """
+
+    @staticmethod
+    def ruta(sha256: str) -> str:
+        return ruta_blob(sha256)
+
+    @staticmethod
+    def existe(db: sqlite3.Connection, sha256: str) -> bool:
+        fila = db.execute("SELECT 1 FROM BLOBS WHERE SHA256 = ?", (sha256,)).fetchone()
+        return fila is not None and os.path.isfile(BlobService.ruta(sha256))
+
+    @staticmethod
+    def guardar(db: sqlite3.Connection, origen: str, sha256: Optional[str] = None) -> str:
+        """
+        Mueve `origen` al almacén y devuelve su hash. Si ya había un blob con
+        el mismo contenido, `origen` se borra y se reutiliza el existente.
+        """
+        sha256 = sha256 or sha256_fichero(origen)
+        destino = BlobService.ruta(sha256)
+        if os.path.isfile(destino):
+            os.remove(origen)
+        else:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.move(origen, destino)
+        db.execute(
+            "INSERT OR IGNORE INTO BLOBS (SHA256, TAMANO) VALUES (?, ?)",
+            (sha256, os.path.getsize(destino))
+        )
+        return sha256
+
+    @staticmethod
+    def enlazar(db: sqlite3.Connection, sha256: str, ruta_nube: str):
+        """
+        Deja en la ruta legible un enlace duro al blob (sin copiar datos) y lo
+        apunta en BLOBS_ENLACES para que `recolectar` lo borre con el blob. Si
+        el sistema de ficheros no admite enlaces, la ruta se queda sin archivo
+        y las descargas se sirven directamente del blob.
+        """
+        destino = DescargaService.ruta_local(ruta_nube)
+        if destino is None:
+            return
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporal = f"{destino}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(BlobService.ruta(sha256), temporal)
+            os.replace(temporal, destino)
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return
+        db.execute("INSERT OR IGNORE INTO BLOBS_ENLACES (SHA256, RUTA) VALUES (?, ?)", (sha256, ruta_nube))
+        db.commit()
+
+    @staticmethod
+    def asignar(db: sqlite3.Connection, juego_id: int, consola_id: int, sha256: str) -> Optional[str]:
+        """
+        Apunta el juego en la consola al blob y lo registra como hace
+        `registrar_juego`. Devuelve la ruta legible o None si no existe esa
+        combinación.
+        """
+        db.execute(
+            "UPDATE JUEGOS_CONSOLAS SET BLOB_SHA256 = ? WHERE JUEGO_ID = ? AND CONSOLA_ID = ?",
+            (sha256, juego_id, consola_id)
+        )
+        ruta = GameService.registrar_juego(db, juego_id, consola_id)
+        if ruta:
+            BlobService.enlazar(db, sha256, ruta)
+            BlobService.recolectar(db)
+        return ruta
+
+    @staticmethod
+    def recolectar(db: Optional[sqlite3.Connection] = None) -> dict:
+        """
+        Borra los blobs sin referencias, sus enlaces legibles y el índice de su
+        contenido, y devuelve cuántos blobs y cuántos bytes. Un enlace solo se
+        borra si sigue siendo el mismo fichero que el blob y ningún juego usa
+        ya esa ruta: si no, el disco seguiría ocupado aunque el blob no esté.
+        """
+        if db is None:
+            with get_pool().escritor() as conn:
+                return BlobService.recolectar(conn)
+        huerfanos = db.execute("SELECT SHA256, TAMANO FROM BLOBS WHERE REFERENCIAS <= 0").fetchall()
+        if not huerfanos:
+            return {"blobs": 0, "bytes": 0}
+        hashes = [(h,) for h, _ in huerfanos]
+        enlaces = db.execute("""
+            SELECT e.SHA256, e.RUTA FROM BLOBS_ENLACES e
+            JOIN BLOBS b ON b.SHA256 = e.SHA256
+            WHERE b.REFERENCIAS <= 0
+              AND NOT EXISTS (SELECT 1 FROM JUEGOS_CONSOLAS jc WHERE jc.RUTA_NUBE = e.RUTA)
+        """).fetchall()
+        db.executemany("DELETE FROM BLOBS WHERE SHA256 = ?", hashes)
+        db.executemany("DELETE FROM BLOBS_ENLACES WHERE SHA256 = ?", hashes)
+        ContenidoService.olvidar(db, [h for h, _ in huerfanos])
+        db.commit()
+        for sha256, ruta_nube in enlaces:
+            path = DescargaService.ruta_local(ruta_nube)
+            try:
+                if path is not None and os.path.samefile(path, BlobService.ruta(sha256)):
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+        for sha256, _ in huerfanos:
+            try:
+                os.remove(BlobService.ruta(sha256))
+            except FileNotFoundError:
+                pass
+        return {"blobs": len(huerfanos), "bytes": sum(t for _, t in huerfanos)}
+
+    @staticmethod
+    def estadisticas(db: sqlite3.Connection) -> dict:
+        """Espacio ocupado por los blobs frente al que ocuparían sin deduplicar."""
+        blobs, fisico = db.execute("SELECT COUNT(*), IFNULL(SUM(TAMANO), 0) FROM BLOBS").fetchone()
+        referencias, logico = db.execute(
+            "SELECT COUNT(*), IFNULL(SUM(TAMANO), 0) FROM JUEGOS_ARCHIVOS WHERE BLOB_SHA256 IS NOT NULL"
+        ).fetchone()
+        return {
+            "blobs": blobs,
+            "referencias": referencias,
+            "bytes_en_disco": fisico,
+            "bytes_referenciados": logico,
+            "bytes_ahorrados": logico - fisico,
+        }
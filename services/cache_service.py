@@ -0,0 +1,188 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from fastapi import Request, Response
+
+from database.asincrono import lectura
+from database.database import get_pool
+
+# Límite de memoria de la caché de respuestas (bytes de cuerpo)
+CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024)))
+# Respuestas más grandes que esto no se cachean para no vaciar la caché de golpe
+CACHE_MAX_RESPUESTA = CACHE_MAX_BYTES // 8
+# Segundos entre consultas a CATALOGO_VERSION para ver los cambios hechos desde
+# otro proceso (0 = no comprobarlo)
+SONDEO_CATALOGO = float(os.getenv("CATALOGO_SONDEO_SEGUNDOS", "5"))
+
+
+class CatalogoVersion:
+    """
+    Contador de versión del catálogo. Toda ruta que escribe en EMPRESAS,
+    CONSOLAS, JUEGOS o JUEGOS_CONSOLAS llama a `cambio()`, que incrementa la
+    versión y avisa a los suscriptores (cachés e índices en memoria).
+
+    Los procesos aparte del servidor no pueden avisarle así: llaman a
+    `publicar()`, que sube la fila de CATALOGO_VERSION, y el servidor la
+    vigila desde un hilo con `vigilar_en_segundo_plano()`.
+    """
+
+    _lock = threading.Lock()
+    _version = 0
+    _suscriptores: List[Callable[[], None]] = []
+    _externa: Optional[int] = None
+    _parar: Optional[threading.Event] = None
+
+    @staticmethod
+    def actual() -> int:
+        return CatalogoVersion._version
+
+    @staticmethod
+    def suscribir(callback: Callable[[], None]):
+        CatalogoVersion._suscriptores.append(callback)
+
+    @staticmethod
+    def cambio():
+        with CatalogoVersion._lock:
+            CatalogoVersion._version += 1
+        for callback in list(CatalogoVersion._suscriptores):
+            callback()
+
+    @staticmethod
+    def publicar():
+        """Apunta en la base de datos un cambio del catálogo hecho fuera del servidor."""
+        with get_pool().escritor() as conn:
+            conn.execute("UPDATE CATALOGO_VERSION SET VERSION = VERSION + 1")
+            conn.commit()
+
+    @staticmethod
+    def _sondear():
+        with get_pool().lector() as conn:
+            version = conn.execute("SELECT VERSION FROM CATALOGO_VERSION").fetchone()[0]
+        previa, CatalogoVersion._externa = CatalogoVersion._externa, version
+        if previa is not None and version != previa:
+            print("El catálogo ha cambiado desde otro proceso: se invalidan las cachés")
+            CatalogoVersion.cambio()
+
+    @staticmethod
+    def vigilar_en_segundo_plano():
+        """Consulta CATALOGO_VERSION cada SONDEO_CATALOGO segundos hasta `parar()`."""
+        if SONDEO_CATALOGO <= 0:
+            return
+        CatalogoVersion.parar()
+        parar = CatalogoVersion._parar = threading.Event()
+        CatalogoVersion._externa = None
+
+        def bucle():
+            while True:
+                try:
+                    CatalogoVersion._sondear()
+                except Exception as e:
+                    print(f"Error al consultar CATALOGO_VERSION: {e}")
+                if parar.wait(SONDEO_CATALOGO):
+                    return
+
+        threading.Thread(target=bucle, name="catalogo-version", daemon=True).start()
+
+    @staticmethod
+    def parar():
+        if CatalogoVersion._parar is not None:
+            CatalogoVersion._parar.set()
+
+
+class RespuestaCache:
+    """
+    Caché LRU en proceso de respuestas JSON de solo lectura, indexada por
+    (ruta, parámetros, versión del catálogo) y acotada por tamaño total.
+    """
+
+    _lock = threading.Lock()
+    _entradas: "OrderedDict[tuple, tuple]" = OrderedDict()
+    _bytes = 0
+    _stats = {"aciertos": 0, "fallos": 0, "no_modificados": 0, "expulsiones": 0}
+
+    @staticmethod
+    def _guardar(clave: tuple, cuerpo: bytes, cabeceras: dict):
+        if len(cuerpo) > CACHE_MAX_RESPUESTA:
+            return
+        with RespuestaCache._lock:
+            if clave in RespuestaCache._entradas:
+                return
+            RespuestaCache._entradas[clave] = (cuerpo, cabeceras)
+            RespuestaCache._bytes += len(cuerpo)
+            while RespuestaCache._bytes > CACHE_MAX_BYTES:
+                _, (viejo, _) = RespuestaCache._entradas.popitem(last=False)
+                RespuestaCache._bytes -= len(viejo)
+                RespuestaCache._stats["expulsiones"] += 1
+
+    @staticmethod
+    def _buscar(clave: tuple):
+        with RespuestaCache._lock:
+            entrada = RespuestaCache._entradas.get(clave)
+            if entrada is not None:
+                RespuestaCache._entradas.move_to_end(clave)
+                RespuestaCache._stats["aciertos"] += 1
+            else:
+                RespuestaCache._stats["fallos"] += 1
+            return entrada
+
+    @staticmethod
+    def _generar(db: sqlite3.Connection, clave: tuple, version: int, producir: Callable[..., Response]) -> tuple:
+        respuesta = producir(db)
+        cuerpo = bytes(respuesta.body)
+        etag = f'"{version}-{hashlib.blake2b(cuerpo, digest_size=12).hexdigest()}"'
+        cabeceras = {
+            k: v for k, v in respuesta.headers.items()
+            if k not in ("content-length", "content-type")
+        }
+        cabeceras.update({"ETag": etag, "Cache-Control": "no-cache"})
+        RespuestaCache._guardar(clave, cuerpo, cabeceras)
+        return cuerpo, cabeceras
+
+    @staticmethod
+    async def responder(request: Request, producir: Callable[..., Response]) -> Response:
+        """
+        Devuelve la respuesta cacheada para la petición o la genera con
+        `producir(db)`, que corre en un hilo de la base de datos junto con
+        la serialización y el ETag. Añade un ETag fuerte y responde 304 si
+        coincide con If-None-Match.
+        """
+        version = CatalogoVersion.actual()
+        clave = (request.url.path, str(request.query_params), version)
+        entrada = RespuestaCache._buscar(clave)
+        if entrada is None:
+            entrada = await lectura.ejecutar(RespuestaCache._generar, clave, version, producir)
+        cuerpo, cabeceras = entrada
+
+        # Comparación débil: tras comprimir, el cliente recibe el ETag como W/"..."
+        if_none_match = request.headers.get("if-none-match", "")
+        etiquetas = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+        if cabeceras["ETag"] in etiquetas or if_none_match.strip() == "*":
+            with RespuestaCache._lock:
+                RespuestaCache._stats["no_modificados"] += 1
+            return Response(status_code=304, headers=cabeceras)
+        return Response(content=cuerpo, media_type="application/json", headers=cabeceras)
+
+    @staticmethod
+    def invalidar():
+        with RespuestaCache._lock:
+            RespuestaCache._entradas.clear()
+            RespuestaCache._bytes = 0
+
+    @staticmethod
+    def estadisticas() -> dict:
+        with RespuestaCache._lock:
+            return {
+                **RespuestaCache._stats,
+                "entradas": len(RespuestaCache._entradas),
+                "bytes": RespuestaCache._bytes,
+                "version_catalogo": CatalogoVersion.actual(),
+            }
+
+
+# Las entradas de versiones anteriores ya no se pueden pedir: liberar la memoria
+CatalogoVersion.suscribir(RespuestaCache.invalidar)
+
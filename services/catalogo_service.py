@@ -0,0 +1,300 @@
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Tuple
+
+from database.database import get_pool
+from services.cache_service import CatalogoVersion
+from services.serializacion import dumps
+
+# Segundos de espera antes de reconstruir, para agrupar varios cambios seguidos
+RETARDO_RECONSTRUCCION = 2.0
+
+
+def _orden(valor) -> tuple:
+    # Como ORDER BY en SQLite: NULL, números y texto por punto de código (igual
+    # que la colación BINARY sobre UTF-8). Los cursores pueden traer cualquier
+    # valor de JSON y se comparan igual que los compararía SQLite
+    if valor is None:
+        return (0, 0)
+    if isinstance(valor, (int, float)):
+        return (1, valor)
+    if isinstance(valor, str):
+        return (2, valor)
+    return (3, repr(valor))
+
+
+def _orden_nombre(valor) -> tuple:
+    # Los nombres se ordenan y se comparan con el cursor como IFNULL(NOMBRE, '')
+    return _orden("" if valor is None else valor)
+
+
+def _orden_cursor(valor) -> tuple:
+    # Para los IDs del cursor: en SQLite (a, b) > (a, NULL) nunca es cierto, así
+    # que un NULL se trata como mayor que cualquier fila con el mismo nombre
+    return (4, 0) if valor is None else _orden(valor)
+
+
+class InstantaneaCatalogo:
+    """
+    Copia inmutable en memoria de la jerarquía que se navega (empresas,
+    consolas y juegos con ruta en la nube), guardada por columnas.
+
+    Los IDs van en arrays compactos; los nombres y fechas repetidos se
+    comparten como un único str. Los juegos de cada consola están en
+    formato CSR: las posiciones `_inicio[c]` a `_inicio[c + 1]` de
+    `_adyacencia` son los índices de sus juegos, ya en orden
+    (IFNULL(nombre, ''), ID).
+    Así se lee una página con un bisect y un slice, sin ordenar nada.
+    """
+
+    def __init__(self, db: sqlite3.Connection, version: int):
+        self.version = version
+        inicio_carga = time.perf_counter()
+        comunes = {}
+
+        def internar(texto: Optional[str]) -> Optional[str]:
+            return texto if texto is None else comunes.setdefault(texto, texto)
+
+        cursor = db.cursor()
+        self._empresa_ids = array("q")
+        self._empresa_nombres: List[Optional[str]] = []
+        for empresa_id, nombre in cursor.execute("SELECT ID, NOMBRE FROM EMPRESAS ORDER BY ID"):
+            self._empresa_ids.append(empresa_id)
+            self._empresa_nombres.append(internar(nombre))
+        nombre_empresa = dict(zip(self._empresa_ids, self._empresa_nombres))
+
+        self._consola_ids = array("q")
+        self._consola_empresas = array("q")
+        self._consola_nombres: List[Optional[str]] = []
+        for consola_id, nombre, empresa_id in cursor.execute("SELECT ID, NOMBRE, EMPRESA_ID FROM CONSOLAS ORDER BY ID"):
+            self._consola_ids.append(consola_id)
+            self._consola_empresas.append(empresa_id if empresa_id is not None else -1)
+            self._consola_nombres.append(internar(nombre))
+        self._posicion_consola = {consola_id: i for i, consola_id in enumerate(self._consola_ids)}
+
+        # Juegos con ruta por consola; cada juego se guarda una vez aunque
+        # esté en varias consolas
+        self._juego_ids = array("q")
+        self._juego_nombres: List[Optional[str]] = []
+        self._juego_fechas: List[Optional[str]] = []
+        self._inicio = array("q", [0]) * (len(self._consola_ids) + 1)
+        self._adyacencia = array("q")
+        indice_juego = {}
+        cursor.execute("""
+            SELECT jc.CONSOLA_ID, j.ID, j.NOMBRE, j.FECHA_LANZAMIENTO
+            FROM JUEGOS_CONSOLAS jc
+            JOIN JUEGOS j ON j.ID = jc.JUEGO_ID
+            WHERE jc.RUTA_NUBE <> ''
+            ORDER BY jc.CONSOLA_ID, IFNULL(j.NOMBRE, ''), j.ID
+        """)
+        for consola_id, juego_id, nombre, fecha in cursor:
+            posicion = self._posicion_consola.get(consola_id)
+            if posicion is None:
+                continue
+            indice = indice_juego.get(juego_id)
+            if indice is None:
+                indice = indice_juego[juego_id] = len(self._juego_ids)
+                self._juego_ids.append(juego_id)
+                self._juego_nombres.append(internar(nombre))
+                self._juego_fechas.append(internar(fecha))
+            self._adyacencia.append(indice)
+            self._inicio[posicion + 1] += 1
+        for posicion in range(len(self._consola_ids)):
+            self._inicio[posicion + 1] += self._inicio[posicion]
+
+        # Consolas cuya empresa existe (el JOIN de los listados) en el orden
+        # (empresa, consola, ID) de get_todas_consolas
+        self._orden_consolas = array("q", sorted(
+            (i for i in range(len(self._consola_ids)) if self._consola_empresas[i] in nombre_empresa),
+            key=lambda i: self._clave_consola(i, nombre_empresa)
+        ))
+        self._nombre_empresa = nombre_empresa
+        self.segundos_carga = round(time.perf_counter() - inicio_carga, 3)
+
+    def _clave_consola(self, posicion: int, nombre_empresa: dict) -> tuple:
+        return (
+            _orden_nombre(nombre_empresa[self._consola_empresas[posicion]]),
+            _orden_nombre(self._consola_nombres[posicion]),
+            (1, self._consola_ids[posicion]),
+        )
+
+    def _clave_juego(self, indice: int) -> tuple:
+        return (_orden_nombre(self._juego_nombres[indice]), (1, self._juego_ids[indice]))
+
+    def _num_juegos(self, posicion: int) -> int:
+        return self._inicio[posicion + 1] - self._inicio[posicion]
+
+    def _juegos(self, consola_id: int, despues: Optional[tuple] = None, limite: Optional[int] = None) -> Iterator[tuple]:
+        posicion = self._posicion_consola.get(consola_id)
+        if posicion is None:
+            return iter(())
+        inicio, fin = self._inicio[posicion], self._inicio[posicion + 1]
+        if despues:
+            clave = (_orden_nombre(despues[0]), _orden_cursor(despues[1]))
+            inicio = bisect_right(self._adyacencia, clave, inicio, fin, key=self._clave_juego)
+        if limite:
+            fin = min(fin, inicio + limite)
+        return (
+            (self._juego_ids[j], self._juego_nombres[j], self._juego_fechas[j])
+            for j in self._adyacencia[inicio:fin]
+        )
+
+    def empresas_con_juegos(self) -> List[Tuple[int, str]]:
+        disponibles = {self._consola_empresas[i] for i in range(len(self._consola_ids)) if self._num_juegos(i)}
+        return [
+            (empresa_id, nombre)
+            for empresa_id, nombre in zip(self._empresa_ids, self._empresa_nombres)
+            if empresa_id in disponibles
+        ]
+
+    def consolas_por_empresa(self, empresa_id: int, solo_con_juegos: bool) -> List[Tuple[int, str]]:
+        consolas = [
+            i for i in range(len(self._consola_ids))
+            if self._consola_empresas[i] == empresa_id and (self._num_juegos(i) or not solo_con_juegos)
+        ]
+        if not solo_con_juegos:
+            consolas.sort(key=lambda i: (_orden(self._consola_nombres[i]), (1, self._consola_ids[i])))
+        return [(self._consola_ids[i], self._consola_nombres[i]) for i in consolas]
+
+    def todas_consolas(
+        self,
+        solo_con_juegos: bool,
+        limite: Optional[int] = None,
+        despues: Optional[tuple] = None
+    ) -> List[Tuple[int, str, str]]:
+        orden = self._orden_consolas
+        inicio = 0
+        if despues:
+            clave = (_orden_nombre(despues[0]), _orden_nombre(despues[1]), _orden_cursor(despues[2]))
+            inicio = bisect_right(orden, clave, key=lambda i: self._clave_consola(i, self._nombre_empresa))
+        filas = []
+        for i in orden[inicio:]:
+            if solo_con_juegos and not self._num_juegos(i):
+                continue
+            filas.append((self._consola_ids[i], self._consola_nombres[i], self._nombre_empresa[self._consola_empresas[i]]))
+            if limite and len(filas) >= limite:
+                break
+        return filas
+
+    def contar_consolas(self) -> int:
+        return len(self._orden_consolas)
+
+    def juegos_por_consola(
+        self,
+        consola_id: int,
+        limite: Optional[int] = None,
+        despues: Optional[tuple] = None,
+        iterar: bool = False
+    ):
+        filas = self._juegos(consola_id, despues, limite)
+        return filas if iterar else list(filas)
+
+    def juegos_por_consola_json(self, consola_id: int) -> str:
+        return dumps([
+            {"id": juego_id, "nombre": nombre, "fecha_lanzamiento": fecha}
+            for juego_id, nombre, fecha in self._juegos(consola_id)
+        ]).decode("utf-8")
+
+    def contar_juegos(self, consola_id: int) -> int:
+        posicion = self._posicion_consola.get(consola_id)
+        return 0 if posicion is None else self._num_juegos(posicion)
+
+    def estadisticas(self) -> dict:
+        arrays = (self._empresa_ids, self._consola_ids, self._consola_empresas, self._inicio,
+                  self._adyacencia, self._juego_ids, self._orden_consolas)
+        return {
+            "version": self.version,
+            "empresas": len(self._empresa_ids),
+            "consolas": len(self._consola_ids),
+            "juegos": len(self._juego_ids),
+            "relaciones": len(self._adyacencia),
+            "bytes_arrays": sum(a.itemsize * len(a) for a in arrays),
+            "segundos_carga": self.segundos_carga,
+        }
+
+
+class CatalogoService:
+    """
+    Instantánea del catálogo navegable servida desde memoria. Solo se usa
+    mientras su versión coincide con la del catálogo: tras un cambio,
+    GameService vuelve a SQLite hasta que la nueva está lista y se sustituye
+    de forma atómica.
+    """
+
+    _lock = threading.Lock()
+    _temporizador: Optional[threading.Timer] = None
+    _instantanea: Optional[InstantaneaCatalogo] = None
+
+    @staticmethod
+    def cargar(db: Optional[sqlite3.Connection] = None):
+        """Construye la instantánea con la versión actual del catálogo y la sustituye."""
+        if db is None:
+            with get_pool().lector() as conn:
+                return CatalogoService.cargar(conn)
+        # La versión se lee antes que los datos: si cambian mientras tanto,
+        # la instantánea nace vieja y no se usa
+        version = CatalogoVersion.actual()
+        # Empresas, consolas y juegos en una sola transacción de lectura para
+        # que las tres consultas vean el mismo estado de la base de datos
+        propia = not db.in_transaction
+        if propia:
+            db.execute("BEGIN")
+        try:
+            instantanea = InstantaneaCatalogo(db, version)
+        finally:
+            if propia:
+                db.execute("COMMIT")
+        with CatalogoService._lock:
+            actual = CatalogoService._instantanea
+            if actual is None or actual.version <= instantanea.version:
+                CatalogoService._instantanea = instantanea
+
+    @staticmethod
+    def _recargar():
+        # En un hilo propio: un fallo se registra y se sigue sirviendo desde
+        # SQLite hasta el próximo cambio
+        try:
+            CatalogoService.cargar()
+        except Exception as e:
+            print(f"Error al construir el catálogo en memoria: {e}")
+
+    @staticmethod
+    def cargar_en_segundo_plano():
+        """Construye la instantánea en un hilo aparte para no retrasar el arranque."""
+        threading.Thread(target=CatalogoService._recargar, name="catalogo-memoria", daemon=True).start()
+
+    @staticmethod
+    def invalidar():
+        """Programa una reconstrucción tras un cambio en el catálogo."""
+        with CatalogoService._lock:
+            if CatalogoService._temporizador is not None:
+                CatalogoService._temporizador.cancel()
+            temporizador = threading.Timer(RETARDO_RECONSTRUCCION, CatalogoService._recargar)
+            temporizador.daemon = True
+            temporizador.start()
+            CatalogoService._temporizador = temporizador
+
+    @staticmethod
+    def instantanea() -> Optional[InstantaneaCatalogo]:
+        """La instantánea si está al día con el catálogo, o None para consultar SQLite."""
+        instantanea = CatalogoService._instantanea
+        if instantanea is None or instantanea.version != CatalogoVersion.actual():
+            return None
+        return instantanea
+
+    @staticmethod
+    def estadisticas() -> dict:
+        instantanea = CatalogoService._instantanea
+        if instantanea is None:
+            return {"cargada": False, "al_dia": False}
+        return {
+            "cargada": True,
+            "al_dia": instantanea.version == CatalogoVersion.actual(),
+            **instantanea.estadisticas(),
+        }
+
+
+CatalogoVersion.suscribir(CatalogoService.invalidar)
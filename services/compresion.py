@@ -0,0 +1,260 @@
+import gzip
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from services.cache_service import CatalogoVersion
+
+# brotli y zstandard son opcionales; sin ellos solo se ofrece gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Orden de preferencia cuando el cliente acepta varias con la misma q
+ALGORITMOS = [
+    a.strip() for a in os.getenv("COMPRESION_ALGORITMOS", "zstd,br,gzip").split(",")
+    if (a.strip() == "gzip" or (a.strip() == "br" and brotli is not None)
+        or (a.strip() == "zstd" and zstandard is not None))
+]
+# Por debajo de este tamaño la compresión no compensa las cabeceras y la CPU
+COMPRESION_MINIMO = int(os.getenv("COMPRESION_MINIMO", "1024"))
+NIVELES = {
+    "gzip": int(os.getenv("COMPRESION_NIVEL_GZIP", "6")),
+    "br": int(os.getenv("COMPRESION_NIVEL_BR", "5")),
+    "zstd": int(os.getenv("COMPRESION_NIVEL_ZSTD", "3")),
+}
+# Cuerpos a partir de este tamaño se comprimen en el threadpool para no
+# parar el bucle de eventos
+COMPRESION_EN_HILO = 256 * 1024
+# Memoria para cuerpos ya comprimidos de respuestas con ETag
+COMPRESION_CACHE_BYTES = int(os.getenv("COMPRESION_CACHE_BYTES", str(16 * 1024 * 1024)))
+
+# Los .zip de las descargas (application/zip, octet-stream) ya van comprimidos
+TIPOS_COMPRIMIBLES = ("application/json", "application/x-ndjson", "application/javascript", "image/svg+xml")
+
+
+def comprimible(tipo: str) -> bool:
+    tipo = tipo.split(";")[0].strip().lower()
+    return tipo.startswith("text/") or tipo.endswith("+json") or tipo in TIPOS_COMPRIMIBLES
+
+
+def elegir_codificacion(accept_encoding: str) -> Optional[str]:
+    """Algoritmo con mayor q de Accept-Encoding entre los disponibles, o None."""
+    pesos = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        if nombre:
+            pesos[nombre.strip()] = q
+    comodin = pesos.get("*", 0.0)
+    candidatos = [(pesos.get(a, comodin), -i, a) for i, a in enumerate(ALGORITMOS)]
+    candidatos = [c for c in candidatos if c[0] > 0]
+    return max(candidatos)[2] if candidatos else None
+
+
+def comprimir(codificacion: str, datos: bytes) -> bytes:
+    nivel = NIVELES[codificacion]
+    if codificacion == "gzip":
+        return gzip.compress(datos, compresslevel=nivel, mtime=0)
+    if codificacion == "br":
+        return brotli.compress(datos, quality=nivel)
+    return zstandard.ZstdCompressor(level=nivel).compress(datos)
+
+
+class Compresor:
+    """Compresión por trozos para respuestas en streaming (NDJSON)."""
+
+    def __init__(self, codificacion: str):
+        self.codificacion = codificacion
+        nivel = NIVELES[codificacion]
+        if codificacion == "gzip":
+            self._obj = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+        elif codificacion == "br":
+            self._obj = brotli.Compressor(quality=nivel)
+        else:
+            self._obj = zstandard.ZstdCompressor(level=nivel).compressobj()
+
+    def comprimir(self, datos: bytes) -> bytes:
+        """Comprime y vacía el bloque para que el cliente reciba cada trozo sin esperar."""
+        if self.codificacion == "gzip":
+            return self._obj.compress(datos) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.codificacion == "br":
+            return self._obj.process(datos) + self._obj.flush()
+        return self._obj.compress(datos) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def terminar(self) -> bytes:
+        if self.codificacion == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+class CacheComprimidos:
+    """
+    Cuerpos ya comprimidos indexados por (ETag, codificación). El ETag de la
+    caché de respuestas incluye la versión del catálogo, así que cada versión
+    se comprime una sola vez; al cambiar de versión se vacía.
+    """
+
+    _lock = threading.Lock()
+    _entradas: "OrderedDict[tuple, bytes]" = OrderedDict()
+    _bytes = 0
+    _stats = {"aciertos": 0, "fallos": 0, "bytes_originales": 0, "bytes_comprimidos": 0}
+
+    @staticmethod
+    def obtener(etag: str, codificacion: str, cuerpo: bytes) -> bytes:
+        clave = (etag, codificacion)
+        with CacheComprimidos._lock:
+            comprimido = CacheComprimidos._entradas.get(clave)
+            if comprimido is not None:
+                CacheComprimidos._entradas.move_to_end(clave)
+                CacheComprimidos._stats["aciertos"] += 1
+                return comprimido
+            CacheComprimidos._stats["fallos"] += 1
+        comprimido = comprimir(codificacion, cuerpo)
+        if len(comprimido) > COMPRESION_CACHE_BYTES // 8:
+            return comprimido
+        with CacheComprimidos._lock:
+            if clave not in CacheComprimidos._entradas:
+                CacheComprimidos._entradas[clave] = comprimido
+                CacheComprimidos._bytes += len(comprimido)
+            while CacheComprimidos._bytes > COMPRESION_CACHE_BYTES:
+                _, viejo = CacheComprimidos._entradas.popitem(last=False)
+                CacheComprimidos._bytes -= len(viejo)
+        return comprimido
+
+    @staticmethod
+    def contar(original: int, comprimido: int):
+        with CacheComprimidos._lock:
+            CacheComprimidos._stats["bytes_originales"] += original
+            CacheComprimidos._stats["bytes_comprimidos"] += comprimido
+
+    @staticmethod
+    def invalidar():
+        with CacheComprimidos._lock:
+            CacheComprimidos._entradas.clear()
+            CacheComprimidos._bytes = 0
+
+    @staticmethod
+    def estadisticas() -> dict:
+        with CacheComprimidos._lock:
+            stats = dict(CacheComprimidos._stats)
+            stats.update(entradas=len(CacheComprimidos._entradas), bytes=CacheComprimidos._bytes)
+        stats["algoritmos"] = ALGORITMOS
+        stats["minimo"] = COMPRESION_MINIMO
+        if stats["bytes_originales"]:
+            stats["ratio"] = round(stats["bytes_comprimidos"] / stats["bytes_originales"], 3)
+        return stats
+
+
+CatalogoVersion.suscribir(CacheComprimidos.invalidar)
+
+
+def _debilitar(cabeceras: MutableHeaders):
+    # El cuerpo comprimido no es idéntico byte a byte: el ETag pasa a ser débil
+    etag = cabeceras.get("etag")
+    if etag and not etag.startswith("W/"):
+        cabeceras["etag"] = "W/" + etag
+
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI que comprime con zstd, brotli o gzip según Accept-Encoding.
+    Las respuestas completas por debajo de COMPRESION_MINIMO, las que ya traen
+    Content-Encoding, las parciales (206) y los tipos no comprimibles (las
+    descargas .zip) pasan tal cual. Las respuestas en streaming se comprimen
+    trozo a trozo.
+    """
+
+    def __init__(self, app, minimo: int = COMPRESION_MINIMO):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        compresor: Optional[Compresor] = None
+        directo = False
+
+        async def enviar(mensaje):
+            nonlocal inicio, compresor, directo
+            if mensaje["type"] == "http.response.start":
+                cabeceras = MutableHeaders(raw=mensaje["headers"])
+                if mensaje["status"] == 304:
+                    _debilitar(cabeceras)
+                    cabeceras.add_vary_header("Accept-Encoding")
+                    directo = True
+                elif (mensaje["status"] in (204, 206) or "content-encoding" in cabeceras
+                      or not comprimible(cabeceras.get("content-type", ""))):
+                    directo = True
+                if directo:
+                    await send(mensaje)
+                else:
+                    inicio = mensaje
+                return
+            if mensaje["type"] != "http.response.body" or directo:
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get("body", b"")
+            mas = mensaje.get("more_body", False)
+            if inicio is not None:
+                mensaje_inicio, inicio = inicio, None
+                cabeceras = MutableHeaders(raw=mensaje_inicio["headers"])
+                cabeceras.add_vary_header("Accept-Encoding")
+                if not mas and len(cuerpo) < self.minimo:
+                    directo = True
+                    await send(mensaje_inicio)
+                    await send(mensaje)
+                    return
+                cabeceras["content-encoding"] = codificacion
+                if not mas:
+                    etag = cabeceras.get("etag")
+                    if etag:
+                        args = (CacheComprimidos.obtener, etag, codificacion, cuerpo)
+                    else:
+                        args = (comprimir, codificacion, cuerpo)
+                    if len(cuerpo) >= COMPRESION_EN_HILO:
+                        comprimido = await run_in_threadpool(*args)
+                    else:
+                        comprimido = args[0](*args[1:])
+                    CacheComprimidos.contar(len(cuerpo), len(comprimido))
+                    _debilitar(cabeceras)
+                    cabeceras["content-length"] = str(len(comprimido))
+                    await send(mensaje_inicio)
+                    await send({"type": "http.response.body", "body": comprimido})
+                    return
+                compresor = Compresor(codificacion)
+                del cabeceras["content-length"]
+                _debilitar(cabeceras)
+                await send(mensaje_inicio)
+
+            datos = compresor.comprimir(cuerpo) if cuerpo else b""
+            if not mas:
+                datos += compresor.terminar()
+            CacheComprimidos.contar(len(cuerpo), len(datos))
+            await send({"type": "http.response.body", "body": datos, "more_body": mas})
+
+        await self.app(scope, receive, enviar)
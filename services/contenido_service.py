@@ -0,0 +1,221 @@
+import mimetypes
+import os
+import sqlite3
+import struct
+import zipfile
+import zlib
+from datetime import datetime
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from database.database import get_pool
+from services.descarga_service import DescargaService, TAMANO_BLOQUE, ruta_blob
+
+# Cabecera local de un miembro: firma, versión, flags, método, hora, fecha,
+# CRC, tamaños y longitudes del nombre y del campo extra (30 bytes)
+CABECERA_LOCAL = struct.Struct("<4s5H3L2H")
+FIRMA_CABECERA_LOCAL = b"PK\x03\x04"
+# Métodos que se pueden extraer en streaming: sin compresión y deflate
+METODOS_SOPORTADOS = (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+
+
+class MiembroResponse(StreamingResponse):
+    """Envío de un miembro del zip que libera su hueco de descarga y cierra el fichero al terminar."""
+
+    def __init__(self, fichero: BinaryIO, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fichero = fichero
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._fichero.close()
+            DescargaService.liberar()
+
+
+def _fecha_zip(date_time: tuple) -> Optional[str]:
+    try:
+        return datetime(*date_time).isoformat()
+    except ValueError:
+        return None
+
+
+def _nombre_descarga(nombre: str) -> str:
+    """Nombre del miembro sin carpetas, codificado para Content-Disposition."""
+    return quote(os.path.basename(nombre))
+
+
+def _emitir(fichero: BinaryIO, tamano_comprimido: int, tamano: int, metodo: int, crc_esperado: int) -> Iterator[bytes]:
+    """
+    Lee solo los bytes comprimidos del miembro y los descomprime por bloques,
+    sin pasar nunca de TAMANO_BLOQUE en memoria aunque el ratio sea enorme.
+    Si el CRC no cuadra se corta la conexión: el cliente no da por buena una
+    copia corrupta.
+    """
+    descompresor = zlib.decompressobj(-zlib.MAX_WBITS) if metodo == zipfile.ZIP_DEFLATED else None
+    restante, emitidos, crc = tamano_comprimido, 0, 0
+    while restante > 0 or (descompresor is not None and descompresor.unconsumed_tail):
+        if descompresor is not None and descompresor.unconsumed_tail:
+            datos = descompresor.decompress(descompresor.unconsumed_tail, TAMANO_BLOQUE)
+        else:
+            bloque = fichero.read(min(TAMANO_BLOQUE, restante))
+            if not bloque:
+                break
+            restante -= len(bloque)
+            datos = descompresor.decompress(bloque, TAMANO_BLOQUE) if descompresor is not None else bloque
+        if emitidos + len(datos) > tamano:
+            raise RuntimeError("El miembro del zip ocupa más de lo que indica el índice")
+        if datos:
+            emitidos += len(datos)
+            crc = zlib.crc32(datos, crc)
+            yield datos
+    if descompresor is not None:
+        resto = descompresor.flush()
+        if resto:
+            emitidos += len(resto)
+            crc = zlib.crc32(resto, crc)
+            yield resto
+    if emitidos != tamano or crc != crc_esperado:
+        raise RuntimeError("El miembro del zip está corrupto (tamaño o CRC no coinciden)")
+
+
+class ContenidoService:
+    """
+    Índice del contenido de los zips de juegos (partidas, mods y parches) y
+    extracción de un solo miembro leyendo desde su offset.
+
+    El índice de un archivo servido desde el almacén de blobs se guarda con
+    la clave "blob:<sha256>" en ZIP_ARCHIVOS.RUTA: lo comparten todas las
+    rutas que apuntan al mismo blob y no se pierde si la ruta cambia.
+    """
+
+    @staticmethod
+    def _clave_blob(sha256: str) -> str:
+        return f"blob:{sha256}"
+
+    @staticmethod
+    def _archivo(ruta_nube: Optional[str], blob_sha256: Optional[str]) -> Tuple[str, int]:
+        """Fichero local del archivo de un juego y el ID de su índice."""
+        path, _ = DescargaService.fichero(ruta_nube, blob_sha256)
+        clave = ContenidoService._clave_blob(blob_sha256) if blob_sha256 and path == ruta_blob(blob_sha256) else ruta_nube
+        return path, ContenidoService._indexar(clave, path)
+
+    @staticmethod
+    def olvidar(db: sqlite3.Connection, hashes: Iterable[str]):
+        """Borra el índice de los blobs dados (sin confirmar la transacción)."""
+        claves = [(ContenidoService._clave_blob(sha256),) for sha256 in hashes]
+        db.executemany(
+            "DELETE FROM ZIP_MIEMBROS WHERE ARCHIVO_ID IN (SELECT ID FROM ZIP_ARCHIVOS WHERE RUTA = ?)", claves
+        )
+        db.executemany("DELETE FROM ZIP_ARCHIVOS WHERE RUTA = ?", claves)
+
+    @staticmethod
+    def _indexar(clave: str, path: str) -> int:
+        """
+        Devuelve el ID del índice del archivo y lo rehace si el fichero ha
+        cambiado desde la última vez. Leer el directorio central solo cuesta
+        lo que ocupa, no lo que ocupa el zip.
+        """
+        stat = os.stat(path)
+        with get_pool().lector() as db:
+            fila = db.execute(
+                "SELECT ID, TAMANO, MTIME_NS FROM ZIP_ARCHIVOS WHERE RUTA = ?", (clave,)
+            ).fetchone()
+        if fila is not None and fila[1:] == (stat.st_size, stat.st_mtime_ns):
+            return fila[0]
+
+        try:
+            with zipfile.ZipFile(path) as zf:
+                miembros = zf.infolist()
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=422, detail="El archivo del juego no es un zip válido")
+
+        with get_pool().escritor() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO ZIP_ARCHIVOS (RUTA, TAMANO, MTIME_NS) VALUES (?, ?, ?)
+                ON CONFLICT (RUTA) DO UPDATE SET
+                    TAMANO = excluded.TAMANO, MTIME_NS = excluded.MTIME_NS, FECHA = CURRENT_TIMESTAMP
+            """, (clave, stat.st_size, stat.st_mtime_ns))
+            archivo_id = cursor.execute("SELECT ID FROM ZIP_ARCHIVOS WHERE RUTA = ?", (clave,)).fetchone()[0]
+            cursor.execute("DELETE FROM ZIP_MIEMBROS WHERE ARCHIVO_ID = ?", (archivo_id,))
+            cursor.executemany("""
+                INSERT INTO ZIP_MIEMBROS (ARCHIVO_ID, INDICE, NOMBRE, TAMANO, TAMANO_COMPRIMIDO,
+                                          CRC32, METODO, FLAGS, OFFSET, FECHA_MOD)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (archivo_id, indice, m.filename, m.file_size, m.compress_size, m.CRC,
+                 m.compress_type, m.flag_bits, m.header_offset, _fecha_zip(m.date_time))
+                for indice, m in enumerate(miembros)
+            ])
+            conn.commit()
+        return archivo_id
+
+    @staticmethod
+    def listar(ruta_nube: Optional[str], blob_sha256: Optional[str] = None) -> List[dict]:
+        """Miembros del zip de un juego, en el orden del directorio central."""
+        _, archivo_id = ContenidoService._archivo(ruta_nube, blob_sha256)
+        with get_pool().lector() as db:
+            filas = db.execute("""
+                SELECT NOMBRE, TAMANO, TAMANO_COMPRIMIDO, CRC32, FECHA_MOD
+                FROM ZIP_MIEMBROS WHERE ARCHIVO_ID = ? ORDER BY INDICE
+            """, (archivo_id,)).fetchall()
+        return [{
+            "nombre": f[0],
+            "tamano": f[1],
+            "tamano_comprimido": f[2],
+            "crc32": f"{f[3]:08x}",
+            "fecha": f[4]
+        } for f in filas]
+
+    @staticmethod
+    def extraer(ruta_nube: Optional[str], blob_sha256: Optional[str], nombre: str) -> MiembroResponse:
+        """
+        Envía un solo miembro del zip saltando a su cabecera local con el
+        offset del índice. Ocupa un hueco de descarga como una descarga normal.
+        """
+        path, archivo_id = ContenidoService._archivo(ruta_nube, blob_sha256)
+        with get_pool().lector() as db:
+            # Con nombres repetidos manda el último, como en zipfile
+            fila = db.execute("""
+                SELECT TAMANO, TAMANO_COMPRIMIDO, CRC32, METODO, FLAGS, OFFSET
+                FROM ZIP_MIEMBROS WHERE ARCHIVO_ID = ? AND NOMBRE = ?
+                ORDER BY INDICE DESC LIMIT 1
+            """, (archivo_id, nombre)).fetchone()
+        if fila is None or nombre.endswith("/"):
+            raise HTTPException(status_code=404, detail="El archivo no contiene ese fichero")
+        tamano, tamano_comprimido, crc, metodo, flags, offset = fila
+        if flags & 0x1:
+            raise HTTPException(status_code=415, detail="El fichero está cifrado dentro del zip")
+        if metodo not in METODOS_SOPORTADOS:
+            raise HTTPException(status_code=415, detail="Método de compresión no soportado")
+
+        DescargaService.ocupar()
+        fichero = None
+        try:
+            fichero = open(path, "rb")
+            fichero.seek(offset)
+            cabecera = fichero.read(CABECERA_LOCAL.size)
+            if len(cabecera) != CABECERA_LOCAL.size or cabecera[:4] != FIRMA_CABECERA_LOCAL:
+                raise HTTPException(status_code=422, detail="El índice del zip no coincide con el archivo")
+            longitud_nombre, longitud_extra = CABECERA_LOCAL.unpack(cabecera)[-2:]
+            fichero.seek(longitud_nombre + longitud_extra, os.SEEK_CUR)
+            tipo = mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+            return MiembroResponse(
+                fichero,
+                _emitir(fichero, tamano_comprimido, tamano, metodo, crc),
+                media_type=tipo,
+                headers={
+                    "Content-Length": str(tamano),
+                    "Content-Disposition": f"attachment; filename*=UTF-8''{_nombre_descarga(nombre)}"
+                }
+            )
+        except BaseException:
+            if fichero is not None:
+                fichero.close()
+            DescargaService.liberar()
+            raise
@@ -1,41 +1,264 @@
-import sqlite3
+import hashlib
 import os
+import sqlite3
+import threading
+import time
 from typing import List, Optional, Tuple
+from urllib.request import pathname2url
+
+from database.database import get_pool, recalcular_disponibles, FTS_TABLAS
+from database.pool import LIMITE_ANALISIS
+from services.fuzzy_service import FuzzyService
+from services.cache_service import CatalogoVersion
+
+JUEGOS_DB_PATH = os.path.join("database", "juegos.db")
+# Tablas que se copian, en orden de dependencias
+TABLAS_IMPORTADAS = ("EMPRESAS", "CONSOLAS", "JUEGOS", "JUEGOS_CONSOLAS")
+# Columnas que el crawler actualiza en filas ya existentes (clave primaria y
+# columnas); en el resto de tablas las filas ya importadas no se tocan
+ACTUALIZABLES = {
+    "JUEGOS": ("ID", ("NOMBRE", "FECHA_LANZAMIENTO", "DESCRIPCION", "PUBLISHERS")),
+}
+# Rango de rowids copiado por transacción; entre lotes se suelta el escritor
+# para que registrar_juego no espere a que acabe toda la importación
+LOTE_IMPORTACION = int(os.getenv("IMPORT_LOTE", "50000"))
+# Juegos nuevos o renombrados a partir de los cuales, en vez de reindexarlos
+# uno a uno, se reconstruye el índice difuso entero
+REINDEXADO_MAXIMO = int(os.getenv("IMPORT_REINDEXADO_MAXIMO", "20000"))
+# Cada cuántos segundos, durante una importación larga, se avisa del cambio
+# del catálogo para que las cachés no sirvan solo lo de antes hasta el final
+AVISO_IMPORTACION = float(os.getenv("IMPORT_AVISO_SEGUNDOS", "60"))
 
 class DatabaseService:
+    _lock = threading.Lock()
+    _hilo: Optional[threading.Thread] = None
+    _progreso = {
+        "estado": "inactivo",
+        "tabla": None,
+        "filas_procesadas": 0,
+        "filas_totales": 0,
+        "filas_insertadas": 0,
+        "inicio": None,
+        "fin": None,
+        "error": None,
+    }
+
     @staticmethod
-    def merge_juegos_db():
-        """Fusiona la base de datos de juegos con la principal."""
-        db_path = os.path.join("database", "database.db")
-        juegos_db_path = os.path.join("database", "juegos.db")
-        
+    def merge_juegos_db() -> bool:
+        """
+        Fusiona la base de datos de juegos con la principal: copia las filas
+        nuevas y pone al día los juegos que el crawler ha cambiado. Devuelve
+        True si ha entrado o cambiado alguna fila.
+        """
+        juegos_db_path = JUEGOS_DB_PATH
+
         if not os.path.exists(juegos_db_path):
             print(f"juegos.db not found at {juegos_db_path}")
-            return
-        
-        conn_main = sqlite3.connect(db_path)
-        conn_juegos = sqlite3.connect(juegos_db_path)
-        
+            return False
+
+        DatabaseService._actualizar_progreso(
+            estado="en_curso", tabla=None, filas_procesadas=0, filas_totales=0,
+            filas_insertadas=0, inicio=time.time(), fin=None, error=None
+        )
         try:
-            main_cur = conn_main.cursor()
-            juegos_cur = conn_juegos.cursor()
-            
-            def merge_table(table: str):
-                main_cur.execute(f"PRAGMA table_info({table})")
-                main_cols = [col[1] for col in main_cur.fetchall()]
-                juegos_cur.execute(f"PRAGMA table_info({table})")
-                juegos_cols = [col[1] for col in juegos_cur.fetchall()]
-                common_cols = [col for col in juegos_cols if col in main_cols]
-                col_str = ", ".join(common_cols)
-                placeholders = ", ".join(["?" for _ in common_cols])
-                rows = juegos_cur.execute(f"SELECT {col_str} FROM {table}").fetchall()
-                for row in rows:
-                    main_cur.execute(f"INSERT OR IGNORE INTO {table} ({col_str}) VALUES ({placeholders})", row)
-            
-            for table in ["EMPRESAS", "CONSOLAS", "JUEGOS", "JUEGOS_CONSOLAS"]:
-                merge_table(table)
-            
-            conn_main.commit()
+            try:
+                resultado = DatabaseService._merge(juegos_db_path)
+            except Exception as e:
+                DatabaseService._actualizar_progreso(estado="error", fin=time.time(), error=str(e))
+                raise
+            DatabaseService._actualizar_progreso(
+                estado="completado" if resultado is not None else "sin_cambios", tabla=None, fin=time.time()
+            )
+            if resultado is None or not resultado[0]:
+                return False
+
+            reindexar = resultado[1]
+            if reindexar is None:
+                FuzzyService.cargar()
+            else:
+                with get_pool().escritor() as conn_main:
+                    FuzzyService.refrescar(conn_main, reindexar)
+            return True
         finally:
-            conn_main.close()
-            conn_juegos.close()
\ No newline at end of file
+            # Cada lote se confirma por separado: aunque la importación falle a
+            # medias, lo ya copiado está en la base y las cachés deben verlo
+            with DatabaseService._lock:
+                insertadas = DatabaseService._progreso["filas_insertadas"]
+            if insertadas:
+                CatalogoVersion.cambio()
+
+    @staticmethod
+    def merge_en_segundo_plano():
+        """Lanza la importación en un hilo aparte para no retrasar el arranque."""
+        with DatabaseService._lock:
+            if DatabaseService._hilo is not None and DatabaseService._hilo.is_alive():
+                return
+            DatabaseService._hilo = threading.Thread(
+                target=DatabaseService.merge_juegos_db, name="merge-juegos", daemon=True
+            )
+            DatabaseService._hilo.start()
+
+    @staticmethod
+    def estado_importacion() -> dict:
+        """Progreso de la última importación, con filas por segundo."""
+        with DatabaseService._lock:
+            progreso = dict(DatabaseService._progreso)
+        if progreso["inicio"] is not None:
+            duracion = (progreso["fin"] or time.time()) - progreso["inicio"]
+            progreso["segundos"] = round(duracion, 2)
+            progreso["filas_por_segundo"] = round(progreso["filas_procesadas"] / duracion) if duracion > 0 else 0
+        return progreso
+
+    @staticmethod
+    def _actualizar_progreso(**valores):
+        with DatabaseService._lock:
+            DatabaseService._progreso.update(valores)
+
+    @staticmethod
+    def _huella(path: str) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(bloque)
+        return h.hexdigest()
+
+    @staticmethod
+    def _adjuntar(conn: sqlite3.Connection, juegos_db_path: str):
+        uri = f"file:{pathname2url(os.path.abspath(juegos_db_path))}?mode=ro"
+        conn.execute("ATTACH DATABASE ? AS fuente", (uri,))
+
+    @staticmethod
+    def _columnas_comunes(conn: sqlite3.Connection, table: str) -> List[str]:
+        main_cols = [col[1] for col in conn.execute(f"PRAGMA main.table_info({table})")]
+        juegos_cols = [col[1] for col in conn.execute(f"PRAGMA fuente.table_info({table})")]
+        return [col for col in juegos_cols if col in main_cols]
+
+    @staticmethod
+    def _merge(juegos_db_path: str) -> Optional[Tuple[int, Optional[List[int]]]]:
+        """
+        Copia con INSERT ... SELECT sobre juegos.db adjuntada, por lotes de
+        rowid a partir de la marca de agua de cada tabla. La marca solo sirve
+        para reanudar una importación del mismo fichero: si la huella es otra,
+        la tabla se recorre entera, porque un fichero distinto puede tener
+        filas nuevas por debajo de la marca y el crawler también cambia juegos
+        ya importados. Devuelve las filas insertadas o actualizadas junto con
+        los IDs de juegos nuevos o renombrados que hay que reindexar (None si
+        son tantos que conviene reconstruir el índice), o None si el fichero
+        no ha cambiado desde la última vez.
+        """
+        origen = os.path.abspath(juegos_db_path)
+        stat = os.stat(juegos_db_path)
+        with get_pool().escritor() as conn:
+            previa = conn.execute(
+                "SELECT TAMANO, MTIME_NS, HUELLA FROM IMPORTACIONES WHERE ORIGEN = ?", (origen,)
+            ).fetchone()
+        if previa is not None and previa[:2] == (stat.st_size, stat.st_mtime_ns):
+            print("juegos.db sin cambios desde la última importación")
+            return None
+        huella = DatabaseService._huella(juegos_db_path)
+        if previa is not None and previa[2] == huella:
+            with get_pool().escritor() as conn:
+                conn.execute(
+                    "UPDATE IMPORTACIONES SET TAMANO = ?, MTIME_NS = ? WHERE ORIGEN = ?",
+                    (stat.st_size, stat.st_mtime_ns, origen)
+                )
+                conn.commit()
+            print("juegos.db sin cambios desde la última importación")
+            return None
+
+        # Rango pendiente de cada tabla: (tabla, columnas, desde, hasta)
+        pendientes: List[Tuple[str, List[str], int, int]] = []
+        with get_pool().escritor() as conn:
+            DatabaseService._adjuntar(conn, juegos_db_path)
+            try:
+                for table in TABLAS_IMPORTADAS:
+                    columnas = DatabaseService._columnas_comunes(conn, table)
+                    if not columnas:
+                        continue
+                    maximo = conn.execute(f"SELECT IFNULL(MAX(rowid), 0) FROM fuente.{table}").fetchone()[0]
+                    fila = conn.execute(
+                        "SELECT ULTIMO_ROWID, HUELLA FROM IMPORTACIONES_TABLAS WHERE ORIGEN = ? AND TABLA = ?",
+                        (origen, table)
+                    ).fetchone()
+                    desde = fila[0] if fila and fila[1] == huella else 0
+                    if desde < maximo:
+                        pendientes.append((table, columnas, desde, maximo))
+            finally:
+                conn.execute("DETACH DATABASE fuente")
+        DatabaseService._actualizar_progreso(filas_totales=sum(h - d for _, _, d, h in pendientes))
+
+        insertadas = avisadas = 0
+        ultimo_aviso = time.time()
+        reindexar: Optional[List[int]] = []
+        for table, columnas, desde, maximo in pendientes:
+            DatabaseService._actualizar_progreso(tabla=table)
+            col_str = ", ".join(columnas)
+            seleccion = f"SELECT {col_str} FROM fuente.{table} WHERE rowid > ? AND rowid <= ? ORDER BY rowid"
+            clave, actualizables = ACTUALIZABLES.get(table, (None, ()))
+            actualizables = [col for col in actualizables if col in columnas]
+            if clave in columnas and actualizables:
+                # Las filas que ya estaban solo se reescriben (y cuentan) si han cambiado
+                sql = (
+                    f"INSERT INTO main.{table} ({col_str}) {seleccion} "
+                    f"ON CONFLICT ({clave}) DO UPDATE SET "
+                    + ", ".join(f"{col} = excluded.{col}" for col in actualizables)
+                    + " WHERE " + " OR ".join(f"{table}.{col} IS NOT excluded.{col}" for col in actualizables)
+                )
+            else:
+                sql = f"INSERT OR IGNORE INTO main.{table} ({col_str}) {seleccion}"
+            # Juegos que el índice difuso no tiene o tiene con otro nombre; se
+            # consulta antes del upsert, en la misma transacción
+            cambiados = None
+            if table == "JUEGOS" and "NOMBRE" in columnas:
+                cambiados = """
+                    SELECT f.ID FROM fuente.JUEGOS f LEFT JOIN main.JUEGOS m ON m.ID = f.ID
+                    WHERE f.rowid > ? AND f.rowid <= ? AND (m.ID IS NULL OR m.NOMBRE IS NOT f.NOMBRE)
+                """
+            inicio_tabla, filas_tabla = time.time(), maximo - desde
+            while desde < maximo:
+                hasta = min(desde + LOTE_IMPORTACION, maximo)
+                with get_pool().escritor() as conn:
+                    DatabaseService._adjuntar(conn, juegos_db_path)
+                    try:
+                        if cambiados and reindexar is not None:
+                            reindexar.extend(fila[0] for fila in conn.execute(cambiados, (desde, hasta)))
+                            if len(reindexar) > REINDEXADO_MAXIMO:
+                                reindexar = None
+                        cursor = conn.execute(sql, (desde, hasta))
+                        insertadas += max(cursor.rowcount, 0)
+                        conn.execute("""
+                            INSERT INTO IMPORTACIONES_TABLAS (ORIGEN, TABLA, ULTIMO_ROWID, HUELLA) VALUES (?, ?, ?, ?)
+                            ON CONFLICT (ORIGEN, TABLA) DO UPDATE SET
+                                ULTIMO_ROWID = excluded.ULTIMO_ROWID, HUELLA = excluded.HUELLA
+                        """, (origen, table, hasta, huella))
+                        conn.commit()
+                    finally:
+                        conn.execute("DETACH DATABASE fuente")
+                with DatabaseService._lock:
+                    DatabaseService._progreso["filas_procesadas"] += hasta - desde
+                    DatabaseService._progreso["filas_insertadas"] = insertadas
+                if insertadas > avisadas and time.time() - ultimo_aviso >= AVISO_IMPORTACION:
+                    CatalogoVersion.cambio()
+                    avisadas, ultimo_aviso = insertadas, time.time()
+                desde = hasta
+            duracion = max(time.time() - inicio_tabla, 1e-6)
+            print(f"{table}: importado hasta rowid {maximo} ({filas_tabla / duracion:.0f} filas/s)")
+
+        with get_pool().escritor() as conn:
+            # Los triggers ya han indexado las filas nuevas; compactar los índices FTS
+            # y recontar el catálogo disponible por si juegos.db trae rutas
+            if insertadas:
+                for fts in FTS_TABLAS:
+                    conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+                recalcular_disponibles(conn)
+                # Estadísticas nuevas para el planificador tras cambiar tanto el tamaño de las tablas
+                conn.execute(f"PRAGMA analysis_limit={LIMITE_ANALISIS}")
+                conn.execute("ANALYZE")
+            conn.execute("""
+                INSERT INTO IMPORTACIONES (ORIGEN, TAMANO, MTIME_NS, HUELLA) VALUES (?, ?, ?, ?)
+                ON CONFLICT (ORIGEN) DO UPDATE SET
+                    TAMANO = excluded.TAMANO, MTIME_NS = excluded.MTIME_NS,
+                    HUELLA = excluded.HUELLA, FECHA = CURRENT_TIMESTAMP
+            """, (origen, stat.st_size, stat.st_mtime_ns, huella))
+            conn.commit()
+        return insertadas, reindexar
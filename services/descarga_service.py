@@ -0,0 +1,137 @@
+import os
+import threading
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import FileResponse
+
+from services.game_service import PRINCIPIO_RUTA
+
+# Carpeta local donde están los ficheros a los que apunta RUTA_NUBE; por
+# defecto, el propio PRINCIPIO_RUTA (ruta montada en la Raspberry)
+DIRECTORIO_JUEGOS = os.getenv("DIRECTORIO_JUEGOS", PRINCIPIO_RUTA)
+# Almacén de blobs por contenido (ver BlobService), repartidos en subcarpetas
+# por los primeros caracteres del hash
+DIRECTORIO_BLOBS = os.getenv("DIRECTORIO_BLOBS", os.path.join(DIRECTORIO_JUEGOS or ".", ".blobs"))
+# Transferencias simultáneas; el resto recibe 503 con Retry-After
+MAX_DESCARGAS = int(os.getenv("MAX_DESCARGAS", "8"))
+REINTENTAR_EN = 5
+# Bloques grandes: menos saltos al hilo de lectura por cada GB enviado
+TAMANO_BLOQUE = 1024 * 1024
+
+_lock = threading.Lock()
+_en_curso = 0
+
+
+def ruta_blob(sha256: str) -> str:
+    """Fichero de un blob dentro del almacén."""
+    return os.path.join(DIRECTORIO_BLOBS, sha256[:2], sha256[2:4], sha256)
+
+
+def _ocupar() -> bool:
+    global _en_curso
+    with _lock:
+        if _en_curso >= MAX_DESCARGAS:
+            return False
+        _en_curso += 1
+        return True
+
+
+def _liberar():
+    global _en_curso
+    with _lock:
+        _en_curso -= 1
+
+
+class ArchivoResponse(FileResponse):
+    """
+    FileResponse (Range, Content-Length, ETag y Last-Modified incluidos) que
+    libera su hueco de descarga al terminar el envío, aunque el cliente corte.
+    Si el servidor ASGI admite la extensión pathsend, el envío lo hace él.
+    """
+
+    chunk_size = TAMANO_BLOQUE
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _liberar()
+
+
+class DescargaService:
+    @staticmethod
+    def ruta_local(ruta_nube: str) -> Optional[str]:
+        """
+        Traduce una RUTA_NUBE a su fichero dentro de DIRECTORIO_JUEGOS, o None
+        si la ruta se saldría de esa carpeta.
+        """
+        relativa = ruta_nube
+        if PRINCIPIO_RUTA and relativa.startswith(PRINCIPIO_RUTA):
+            relativa = relativa[len(PRINCIPIO_RUTA):]
+        raiz = os.path.realpath(DIRECTORIO_JUEGOS or ".")
+        path = os.path.realpath(os.path.join(raiz, relativa.lstrip("/\\")))
+        if os.path.commonpath([raiz, path]) != raiz:
+            return None
+        return path
+
+    @staticmethod
+    def resolver(ruta_nube: str) -> str:
+        """Fichero local de una RUTA_NUBE; responde 404 si no existe."""
+        path = DescargaService.ruta_local(ruta_nube)
+        if path is None or not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail="El archivo del juego no está disponible")
+        return path
+
+    @staticmethod
+    def fichero(ruta_nube: Optional[str], blob_sha256: Optional[str] = None) -> Tuple[str, dict]:
+        """
+        Fichero local que sirve el archivo de un juego: el blob si está en el
+        almacén o, si no, la ruta legible. Devuelve también las cabeceras
+        propias del fichero (ETag del blob).
+        """
+        if not ruta_nube:
+            raise HTTPException(status_code=404, detail="El juego no está registrado en esa consola")
+        path = ruta_blob(blob_sha256) if blob_sha256 else None
+        if path is not None and os.path.isfile(path):
+            # El contenido de un blob no cambia nunca: su hash es el mejor ETag
+            return path, {"etag": f'"{blob_sha256}"'}
+        return DescargaService.resolver(ruta_nube), {}
+
+    @staticmethod
+    def ocupar():
+        """Ocupa un hueco de descarga; 503 con Retry-After si no queda ninguno."""
+        if not _ocupar():
+            raise HTTPException(
+                status_code=503,
+                detail="Demasiadas descargas en curso",
+                headers={"Retry-After": str(REINTENTAR_EN)}
+            )
+
+    @staticmethod
+    def liberar():
+        _liberar()
+
+    @staticmethod
+    def responder(ruta_nube: Optional[str], blob_sha256: Optional[str] = None) -> ArchivoResponse:
+        """
+        Prepara la respuesta de descarga ocupando un hueco; 503 si no queda
+        ninguno. Si el archivo está en el almacén de blobs se sirve desde ahí,
+        con el nombre de la ruta legible.
+        """
+        path, cabeceras = DescargaService.fichero(ruta_nube, blob_sha256)
+        DescargaService.ocupar()
+        try:
+            return ArchivoResponse(
+                path,
+                headers=cabeceras,
+                filename=os.path.basename(ruta_nube),
+                stat_result=os.stat(path)
+            )
+        except BaseException:
+            _liberar()
+            raise
+
+    @staticmethod
+    def estadisticas() -> dict:
+        return {"maximo": MAX_DESCARGAS, "en_curso": _en_curso}
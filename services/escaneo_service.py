@@ -0,0 +1,273 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from database.database import get_pool
+from services.cache_service import CatalogoVersion
+from services.descarga_service import DIRECTORIO_JUEGOS, DescargaService, ruta_blob
+from services.fuzzy_service import normalizar
+from services.game_service import PRINCIPIO_RUTA
+
+# Carpetas listadas a la vez; en una tarjeta SD o un disco de red el tiempo se
+# va esperando a cada listado, no en CPU
+HILOS_ESCANEO = int(os.getenv("ESCANEO_HILOS", "8"))
+
+# (ruta relativa, tamaño, mtime_ns) de un fichero de la carpeta de juegos
+Archivo = Tuple[str, int, int]
+
+
+def _subcarpetas(path: str) -> List[str]:
+    """Carpetas visibles dentro de `path`; las ocultas (.blobs, .subidas) se saltan."""
+    with os.scandir(path) as entradas:
+        return sorted(e.name for e in entradas if not e.name.startswith(".") and e.is_dir())
+
+
+def _listar_consola(raiz: str, relativa: str, mtime_previo: Optional[int]) -> Tuple[str, int, Optional[List[Archivo]]]:
+    """
+    Lista los ficheros de una carpeta de consola. Si su mtime es el del último
+    escaneo no se lista (devuelve None): añadir, borrar o renombrar un fichero
+    cambia el mtime de la carpeta.
+    """
+    path = os.path.join(raiz, relativa)
+    mtime = os.stat(path).st_mtime_ns
+    if mtime == mtime_previo:
+        return relativa, mtime, None
+    archivos = []
+    with os.scandir(path) as entradas:
+        for entrada in entradas:
+            # Los temporales de los enlaces a blobs acaban en .tmp
+            if entrada.name.startswith(".") or entrada.name.endswith(".tmp") or not entrada.is_file():
+                continue
+            stat = entrada.stat()
+            archivos.append((f"{relativa}/{entrada.name}", stat.st_size, stat.st_mtime_ns))
+    return relativa, mtime, archivos
+
+
+class IndiceNombres:
+    """
+    Empresas, consolas y juegos por nombre normalizado, para casar las carpetas
+    `{empresa}/{consola}/{juego}.zip` con el catálogo sin una consulta por fichero.
+    """
+
+    def __init__(self, db):
+        cursor = db.cursor()
+        self._empresas: Dict[str, int] = {
+            normalizar(nombre): empresa_id
+            for empresa_id, nombre in cursor.execute("SELECT ID, NOMBRE FROM EMPRESAS")
+        }
+        self._consolas: Dict[Tuple[Optional[int], str], List[int]] = {}
+        self._consolas_por_nombre: Dict[str, List[int]] = {}
+        for consola_id, nombre, empresa_id in cursor.execute("SELECT ID, NOMBRE, EMPRESA_ID FROM CONSOLAS"):
+            normalizado = normalizar(nombre)
+            self._consolas.setdefault((empresa_id, normalizado), []).append(consola_id)
+            self._consolas_por_nombre.setdefault(normalizado, []).append(consola_id)
+        self._juegos: Dict[int, Dict[str, List[int]]] = {}
+        self._db = db
+
+    def consola(self, carpeta_empresa: str, carpeta_consola: str) -> Optional[int]:
+        """ID de la consola de una carpeta, o None si no hay una única candidata."""
+        normalizado = normalizar(carpeta_consola)
+        empresa_id = self._empresas.get(normalizar(carpeta_empresa))
+        candidatas = self._consolas.get((empresa_id, normalizado))
+        # Si la carpeta de la empresa no coincide, vale el nombre de consola si es único
+        if not candidatas:
+            candidatas = self._consolas_por_nombre.get(normalizado, [])
+        return candidatas[0] if len(candidatas) == 1 else None
+
+    def cargar_juegos(self, consola_ids: List[int]):
+        """Carga de una vez los nombres de juegos de las consolas encontradas en disco."""
+        pendientes = [c for c in set(consola_ids) if c not in self._juegos]
+        if not pendientes:
+            return
+        for consola_id in pendientes:
+            self._juegos[consola_id] = {}
+        placeholders = ", ".join("?" for _ in pendientes)
+        cursor = self._db.execute(f"""
+            SELECT jc.CONSOLA_ID, jc.JUEGO_ID, j.NOMBRE
+            FROM JUEGOS_CONSOLAS jc
+            JOIN JUEGOS j ON j.ID = jc.JUEGO_ID
+            WHERE jc.CONSOLA_ID IN ({placeholders})
+        """, pendientes)
+        for consola_id, juego_id, nombre in cursor:
+            self._juegos[consola_id].setdefault(normalizar(nombre), []).append(juego_id)
+
+    def juegos(self, consola_id: int, nombre_fichero: str) -> List[int]:
+        """IDs de los juegos de la consola cuyo nombre coincide con el fichero (sin extensión)."""
+        return self._juegos.get(consola_id, {}).get(normalizar(os.path.splitext(nombre_fichero)[0]), [])
+
+
+class EscaneoService:
+    """
+    Registro masivo de los archivos que ya están en la carpeta de juegos:
+    recorre el árbol, casa cada fichero con su juego y consola y asigna todas
+    las RUTA_NUBE en una sola transacción.
+    """
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def escanear(limpiar_colgadas: bool = False) -> dict:
+        """
+        Escanea DIRECTORIO_JUEGOS y registra los juegos encontrados. Devuelve un
+        informe con los ficheros sin coincidencia y las rutas colgadas (que
+        apuntan a un archivo que ya no existe); con `limpiar_colgadas` esas
+        rutas se vacían. Solo se permite un escaneo a la vez (409).
+        """
+        if not EscaneoService._lock.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail="Ya hay un escaneo en curso")
+        try:
+            return EscaneoService._escanear(limpiar_colgadas)
+        finally:
+            EscaneoService._lock.release()
+
+    @staticmethod
+    def _escanear(limpiar_colgadas: bool) -> dict:
+        inicio = time.time()
+        raiz = DIRECTORIO_JUEGOS or "."
+        if not os.path.isdir(raiz):
+            raise HTTPException(status_code=404, detail="La carpeta de juegos no existe")
+
+        with get_pool().lector() as db:
+            mtimes_previos = dict(db.execute("SELECT RUTA, MTIME_NS FROM ESCANEO_DIRECTORIOS"))
+
+        # Dos niveles de carpetas ({empresa}/{consola}), listadas en paralelo
+        with ThreadPoolExecutor(max_workers=HILOS_ESCANEO, thread_name_prefix="escaneo") as pool:
+            empresas = _subcarpetas(raiz)
+            carpetas = [
+                f"{empresa}/{consola}"
+                for empresa, consolas in zip(empresas, pool.map(lambda e: _subcarpetas(os.path.join(raiz, e)), empresas))
+                for consola in consolas
+            ]
+            listados = list(pool.map(
+                lambda c: _listar_consola(raiz, c, mtimes_previos.get(c)), carpetas
+            ))
+
+        archivos: List[Archivo] = []
+        relistadas = [(carpeta, mtime, lista) for carpeta, mtime, lista in listados if lista is not None]
+        sin_cambios = {carpeta for carpeta, _, lista in listados if lista is None}
+        for _, _, lista in relistadas:
+            archivos.extend(lista)
+
+        with get_pool().lector() as db:
+            if sin_cambios:
+                for ruta, directorio, tamano, mtime in db.execute(
+                    "SELECT RUTA, DIRECTORIO, TAMANO, MTIME_NS FROM ESCANEO_ARCHIVOS"
+                ):
+                    if directorio in sin_cambios:
+                        archivos.append((ruta, tamano, mtime))
+            archivos.sort()
+
+            # El casado se repite entero en cada escaneo (es en memoria): un
+            # fichero sin coincidencia puede tenerla tras importar más juegos
+            indice = IndiceNombres(db)
+            consolas = {carpeta: indice.consola(*carpeta.split("/")) for carpeta, _, _ in listados}
+            indice.cargar_juegos([c for c in consolas.values() if c is not None])
+            rutas_actuales = {
+                (juego_id, consola_id): (ruta, sha256)
+                for juego_id, consola_id, ruta, sha256 in db.execute(
+                    "SELECT JUEGO_ID, CONSOLA_ID, RUTA_NUBE, BLOB_SHA256 FROM JUEGOS_ARCHIVOS"
+                )
+            }
+
+        rutas_en_disco = {f"{PRINCIPIO_RUTA}/{ruta}" for ruta, _, _ in archivos}
+
+        def existe(ruta: str, sha256: Optional[str]) -> bool:
+            if ruta in rutas_en_disco or (sha256 and os.path.isfile(ruta_blob(sha256))):
+                return True
+            path = DescargaService.ruta_local(ruta)
+            return path is not None and os.path.isfile(path)
+
+        asignaciones: Dict[Tuple[int, int], str] = {}
+        sin_coincidencia, ya_registrados, conservados = [], 0, 0
+        for ruta, _, _ in archivos:
+            carpeta, nombre = ruta.rsplit("/", 1)
+            consola_id = consolas.get(carpeta)
+            if consola_id is None:
+                sin_coincidencia.append({"ruta": ruta, "motivo": "consola"})
+                continue
+            juego_ids = indice.juegos(consola_id, nombre)
+            if len(juego_ids) != 1:
+                sin_coincidencia.append({"ruta": ruta, "motivo": "ambiguo" if juego_ids else "juego"})
+                continue
+            clave = (juego_ids[0], consola_id)
+            if clave in asignaciones:
+                sin_coincidencia.append({"ruta": ruta, "motivo": "duplicado"})
+                continue
+            ruta_nube = f"{PRINCIPIO_RUTA}/{ruta}"
+            actual, sha256 = rutas_actuales.get(clave, (None, None))
+            if actual == ruta_nube:
+                ya_registrados += 1
+            elif actual and existe(actual, sha256):
+                # Ya apunta a otro archivo que sigue existiendo: no se pisa
+                conservados += 1
+            else:
+                asignaciones[clave] = ruta_nube
+
+        colgadas = [
+            {"juego_id": juego_id, "consola_id": consola_id, "ruta": ruta}
+            for (juego_id, consola_id), (ruta, sha256) in rutas_actuales.items()
+            if (juego_id, consola_id) not in asignaciones and not existe(ruta, sha256)
+        ]
+
+        presentes = {carpeta for carpeta, _, _ in listados}
+        with get_pool().escritor() as conn:
+            cursor = conn.cursor()
+            desaparecidas = [(c,) for c in mtimes_previos if c not in presentes]
+            relistadas_ids = [(c,) for c, _, _ in relistadas]
+            cursor.executemany("DELETE FROM ESCANEO_DIRECTORIOS WHERE RUTA = ?", desaparecidas)
+            cursor.executemany("DELETE FROM ESCANEO_ARCHIVOS WHERE DIRECTORIO = ?", desaparecidas + relistadas_ids)
+            cursor.executemany(
+                "INSERT INTO ESCANEO_ARCHIVOS (RUTA, DIRECTORIO, TAMANO, MTIME_NS) VALUES (?, ?, ?, ?)",
+                [(ruta, carpeta, tamano, mtime) for carpeta, _, lista in relistadas for ruta, tamano, mtime in lista]
+            )
+            cursor.executemany("""
+                INSERT INTO ESCANEO_DIRECTORIOS (RUTA, MTIME_NS) VALUES (?, ?)
+                ON CONFLICT (RUTA) DO UPDATE SET MTIME_NS = excluded.MTIME_NS, FECHA = CURRENT_TIMESTAMP
+            """, [(carpeta, mtime) for carpeta, mtime, _ in relistadas])
+            cursor.executemany(
+                "UPDATE JUEGOS_CONSOLAS SET RUTA_NUBE = ? WHERE JUEGO_ID = ? AND CONSOLA_ID = ?",
+                [(ruta, juego_id, consola_id) for (juego_id, consola_id), ruta in asignaciones.items()]
+            )
+            if limpiar_colgadas:
+                cursor.executemany(
+                    "UPDATE JUEGOS_CONSOLAS SET RUTA_NUBE = '' WHERE JUEGO_ID = ? AND CONSOLA_ID = ? AND RUTA_NUBE = ?",
+                    [(c["juego_id"], c["consola_id"], c["ruta"]) for c in colgadas]
+                )
+            conn.commit()
+        if asignaciones or (limpiar_colgadas and colgadas):
+            CatalogoVersion.cambio()
+
+        return {
+            "carpetas": len(listados),
+            "carpetas_sin_cambios": len(sin_cambios),
+            "archivos": len(archivos),
+            "asignados": len(asignaciones),
+            "ya_registrados": ya_registrados,
+            "conservados": conservados,
+            "sin_coincidencia": sin_coincidencia,
+            "rutas_colgadas": colgadas,
+            "colgadas_limpiadas": len(colgadas) if limpiar_colgadas else 0,
+            "segundos": round(time.time() - inicio, 2),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from database.database import init_db
+
+    parser = argparse.ArgumentParser(description="Registra los archivos de la carpeta de juegos")
+    parser.add_argument("--limpiar-colgadas", action="store_true",
+                        help="vacía las RUTA_NUBE cuyo archivo ya no existe")
+    args = parser.parse_args()
+    init_db()
+    resultado = EscaneoService.escanear(args.limpiar_colgadas)
+    if resultado["asignados"] or resultado["colgadas_limpiadas"]:
+        # El servidor, si está en marcha, no ve el cambio en memoria de este proceso
+        CatalogoVersion.publicar()
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
@@ -0,0 +1,307 @@
+import heapq
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from database.database import get_pool
+
+# Máximo de entradas de posting que se recorren por consulta; los trigramas
+# más frecuentes (" th", "the"...) se descartan primero cuando se supera
+PRESUPUESTO_POSTINGS = 40000
+# Candidatos por nº de trigramas compartidos que se puntúan con Dice
+MAX_PREFILTRO = 2000
+# Candidatos que pasan a la fase de re-ranking por distancia de edición
+MAX_CANDIDATOS = 60
+# Puntuación mínima (0-1) para devolver un resultado
+SIMILITUD_MINIMA = 0.55
+# Segundos que se sugiere esperar (Retry-After) si el índice aún se está construyendo
+REINTENTAR_EN = 5
+# IDs por consulta al refrescar juegos concretos (límite de variables de SQLite)
+LOTE_REFRESCO = 500
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+
+
+def normalizar(texto: str) -> str:
+    """Pasa a minúsculas, quita acentos y deja solo letras y números separados por espacios."""
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_acentos = "".join(ch for ch in descompuesto if not unicodedata.combining(ch))
+    return _NO_ALFANUMERICO.sub(" ", sin_acentos.lower()).strip()
+
+
+def trigramas(normalizado: str) -> set:
+    """Trigramas de cada palabra, con relleno al estilo de pg_trgm ("  ab", "abc", "bc ")."""
+    grams = set()
+    for palabra in normalizado.split():
+        relleno = f"  {palabra} "
+        for i in range(len(relleno) - 2):
+            grams.add(relleno[i:i + 3])
+    return grams
+
+
+def distancia_edicion(a: str, b: str) -> int:
+    """Distancia de Levenshtein entre dos cadenas."""
+    if len(a) < len(b):
+        a, b = b, a
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(
+                anterior[j] + 1,
+                actual[j - 1] + 1,
+                anterior[j - 1] + (ca != cb),
+            ))
+        anterior = actual
+    return anterior[-1]
+
+
+@lru_cache(maxsize=65536)
+def _similitud_palabra(consulta: str, palabra: str) -> float:
+    if palabra.startswith(consulta):
+        return 1.0
+    # Se compara con el prefijo para premiar lo que el usuario va escribiendo;
+    # la palabra completa solo importa si no es más larga que la consulta
+    distancia = distancia_edicion(consulta, palabra[:len(consulta)])
+    if len(palabra) <= len(consulta) + 1:
+        distancia = min(distancia, distancia_edicion(consulta, palabra))
+    return 1.0 - distancia / max(len(consulta), 1)
+
+
+def similitud(consulta: str, nombre: str) -> float:
+    """
+    Puntuación 0-1 entre una consulta y un nombre ya normalizados: media de la
+    mejor coincidencia de cada palabra de la consulta dentro del nombre.
+    """
+    palabras_consulta = consulta.split()
+    palabras_nombre = nombre.split()
+    if not palabras_consulta or not palabras_nombre:
+        return 0.0
+    total = 0.0
+    for pc in palabras_consulta:
+        total += max(0.0, max(_similitud_palabra(pc, pn) for pn in palabras_nombre))
+    return total / len(palabras_consulta)
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido de trigramas sobre nombres normalizados.
+
+    Las listas de posting son arrays de enteros (posiciones internas), mucho
+    más compactas que sets de Python para cientos de miles de nombres.
+    """
+
+    def __init__(self, filas: Iterable[Tuple[int, str]] = ()):
+        self._lock = threading.Lock()
+        self._ids = array("q")
+        self._nombres: List[str] = []
+        self._num_grams = array("H")
+        self._posicion: Dict[int, int] = {}
+        self._postings: Dict[str, array] = {}
+        self.actualizar(filas)
+
+    def __len__(self) -> int:
+        return len(self._posicion)
+
+    @property
+    def max_id(self) -> int:
+        return max(self._posicion, default=0)
+
+    def actualizar(self, filas: Iterable[Tuple[int, str]]):
+        """Añade o renombra entradas; las posiciones antiguas quedan huérfanas y se ignoran."""
+        with self._lock:
+            for item_id, nombre in filas:
+                normalizado = normalizar(nombre)
+                pos = self._posicion.get(item_id)
+                if pos is not None and self._nombres[pos] == normalizado:
+                    continue
+                pos = len(self._nombres)
+                self._ids.append(item_id)
+                self._nombres.append(normalizado)
+                self._posicion[item_id] = pos
+                grams = trigramas(normalizado)
+                self._num_grams.append(min(len(grams), 0xFFFF))
+                for gram in grams:
+                    posting = self._postings.get(gram)
+                    if posting is None:
+                        posting = self._postings[gram] = array("i")
+                    posting.append(pos)
+
+    def buscar(self, texto: str, limite: int = 20) -> List[Tuple[int, float]]:
+        """Devuelve (id, puntuación) de los nombres más parecidos, de mejor a peor."""
+        consulta = normalizar(texto)
+        grams = trigramas(consulta)
+        if not grams:
+            return []
+
+        postings = sorted(
+            (self._postings[g] for g in grams if g in self._postings),
+            key=len
+        )
+        conteo = Counter()
+        recorridas = 0
+        for posting in postings:
+            if recorridas and recorridas + len(posting) > PRESUPUESTO_POSTINGS:
+                break
+            conteo.update(posting)
+            recorridas += len(posting)
+
+        # Prefiltro barato por coeficiente de Dice antes de la distancia de edición
+        num_grams = self._num_grams
+        total = len(grams)
+        candidatos = heapq.nlargest(
+            max(MAX_CANDIDATOS, limite),
+            conteo.most_common(MAX_PREFILTRO),
+            key=lambda c: 2 * c[1] / (total + num_grams[c[0]])
+        )
+
+        resultados = []
+        vistos = set()
+        for pos, _ in candidatos:
+            item_id = self._ids[pos]
+            # Posición huérfana tras un renombrado
+            if self._posicion.get(item_id) != pos or item_id in vistos:
+                continue
+            vistos.add(item_id)
+            puntuacion = similitud(consulta, self._nombres[pos])
+            if puntuacion >= SIMILITUD_MINIMA:
+                resultados.append((item_id, puntuacion))
+
+        resultados.sort(key=lambda r: -r[1])
+        return resultados[:limite]
+
+
+class FuzzyService:
+    """Búsqueda tolerante a erratas sobre empresas, consolas y juegos."""
+
+    _lock = threading.Lock()
+    _empresas: Optional[IndiceTrigramas] = None
+    _consolas: Optional[IndiceTrigramas] = None
+    _juegos: Optional[IndiceTrigramas] = None
+
+    @staticmethod
+    def cargar_en_segundo_plano():
+        """Construye los índices en un hilo aparte para no retrasar el arranque."""
+        threading.Thread(target=FuzzyService.cargar, name="fuzzy-index", daemon=True).start()
+
+    @staticmethod
+    def cargar(db: Optional[sqlite3.Connection] = None):
+        """Construye los índices desde cero y los sustituye de forma atómica."""
+        if db is None:
+            with get_pool().lector() as conn:
+                return FuzzyService.cargar(conn)
+        with FuzzyService._lock:
+            FuzzyService._cargar(db)
+
+    @staticmethod
+    def _cargar(db: sqlite3.Connection):
+        cursor = db.cursor()
+        empresas = IndiceTrigramas(cursor.execute("SELECT ID, NOMBRE FROM EMPRESAS"))
+        consolas = IndiceTrigramas(cursor.execute("SELECT ID, NOMBRE FROM CONSOLAS"))
+        juegos = IndiceTrigramas(cursor.execute("SELECT ID, NOMBRE FROM JUEGOS"))
+        FuzzyService._empresas, FuzzyService._consolas, FuzzyService._juegos = empresas, consolas, juegos
+
+    @staticmethod
+    def refrescar(db: sqlite3.Connection, juego_ids: Optional[List[int]] = None):
+        """
+        Actualiza los índices de forma incremental. Sin `juego_ids` añade los
+        juegos con ID mayor que el último indexado; con ellos reindexa esos
+        juegos, nuevos o renombrados.
+        """
+        # Si la carga inicial está en curso se espera a que termine, para no
+        # perder lo que una importación en segundo plano añada mientras tanto
+        with FuzzyService._lock:
+            if FuzzyService._juegos is None:
+                return
+            cursor = db.cursor()
+            FuzzyService._empresas.actualizar(cursor.execute("SELECT ID, NOMBRE FROM EMPRESAS").fetchall())
+            FuzzyService._consolas.actualizar(cursor.execute("SELECT ID, NOMBRE FROM CONSOLAS").fetchall())
+            if juego_ids is None:
+                cursor.execute("SELECT ID, NOMBRE FROM JUEGOS WHERE ID > ?", (FuzzyService._juegos.max_id,))
+                FuzzyService._juegos.actualizar(cursor.fetchall())
+                return
+            for i in range(0, len(juego_ids), LOTE_REFRESCO):
+                lote = juego_ids[i:i + LOTE_REFRESCO]
+                placeholders = ", ".join("?" for _ in lote)
+                cursor.execute(f"SELECT ID, NOMBRE FROM JUEGOS WHERE ID IN ({placeholders})", lote)
+                FuzzyService._juegos.actualizar(cursor.fetchall())
+
+    @staticmethod
+    def listo() -> bool:
+        """Indica si los índices ya están construidos."""
+        return FuzzyService._juegos is not None
+
+    @staticmethod
+    def buscar(db: sqlite3.Connection, query: str, search_type: str, solo_con_ruta: bool, limite: int = 20) -> dict:
+        """
+        Busca por similitud y completa los resultados con una consulta por ID.
+        Mientras la carga de arranque sigue en curso responde 503: construir
+        el índice aquí dejaría la petición y un hilo de lectura esperando.
+        """
+        if not FuzzyService.listo():
+            raise HTTPException(
+                status_code=503,
+                detail="El índice de búsqueda aproximada se está construyendo",
+                headers={"Retry-After": str(REINTENTAR_EN)}
+            )
+        cursor = db.cursor()
+        result = {
+            "companies": [],
+            "consoles": [],
+            "games": []
+        }
+        # Con el filtro de ruta se descartan muchos candidatos: pedir más
+        margen = limite * 3 if solo_con_ruta else limite
+
+        def por_ids(sql: str, candidatos: List[Tuple[int, float]]):
+            if not candidatos:
+                return []
+            puntuaciones = dict(candidatos)
+            placeholders = ", ".join("?" for _ in candidatos)
+            cursor.execute(sql.format(ids=placeholders), list(puntuaciones))
+            filas = cursor.fetchall()
+            filas.sort(key=lambda f: (-puntuaciones[f[0]], f[1]))
+            return filas[:limite]
+
+        if search_type in ["companies", "all"]:
+            filtro_ruta = "AND e.ID IN (SELECT EMPRESA_ID FROM EMPRESAS_DISPONIBLES)" if solo_con_ruta else ""
+            filas = por_ids(
+                f"SELECT e.ID, e.NOMBRE FROM EMPRESAS e WHERE e.ID IN ({{ids}}) {filtro_ruta}",
+                FuzzyService._empresas.buscar(query, margen)
+            )
+            result["companies"] = [{"id": row[0], "name": row[1]} for row in filas]
+
+        if search_type in ["consoles", "all"]:
+            filtro_ruta = "AND c.ID IN (SELECT CONSOLA_ID FROM CONSOLAS_DISPONIBLES)" if solo_con_ruta else ""
+            filas = por_ids(
+                f"SELECT c.ID, c.NOMBRE, c.EMPRESA_ID FROM CONSOLAS c WHERE c.ID IN ({{ids}}) {filtro_ruta}",
+                FuzzyService._consolas.buscar(query, margen)
+            )
+            result["consoles"] = [{"id": row[0], "name": row[1], "company_id": row[2]} for row in filas]
+
+        if search_type in ["games", "all"]:
+            filtro_ruta = "AND jc.RUTA_NUBE <> ''" if solo_con_ruta else ""
+            filas = por_ids(
+                f"""
+                SELECT j.ID, j.NOMBRE, jc.CONSOLA_ID, j.FECHA_LANZAMIENTO
+                FROM JUEGOS j
+                JOIN JUEGOS_CONSOLAS jc ON j.ID = jc.JUEGO_ID
+                WHERE j.ID IN ({{ids}}) {filtro_ruta}
+                """,
+                FuzzyService._juegos.buscar(query, margen)
+            )
+            result["games"] = [{
+                "id": row[0],
+                "title": row[1],
+                "console_id": row[2],
+                "release_date": row[3]
+            } for row in filas]
+
+        return result
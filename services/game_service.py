@@ -1,22 +1,36 @@
 import sqlite3
 import os
-from typing import List, Tuple, Optional
+import re
+from typing import Iterable, List, Tuple, Optional
 from dotenv import load_dotenv
 
+from database.asincrono import lectura, escritura
+from services.catalogo_service import CatalogoService
+from services.fuzzy_service import FuzzyService
+from services.cache_service import CatalogoVersion
+from services.paginacion import ContadorCache, paginar
+
 load_dotenv()
 PRINCIPIO_RUTA = os.getenv("PRINCIPIO_RUTA", "")
+# Campos de JuegoResponse para json_object, en el orden del modelo
+_JSON_JUEGO = "'id', ID, 'nombre', NOMBRE, 'fecha_lanzamiento', FECHA_LANZAMIENTO"
+# Consolas con al menos esta fracción de los juegos con ruta se paginan
+# recorriendo IDX_JUEGOS_NOMBRE: llenar una página cuesta ~limite/fracción
+# filas, mientras que ordenar la consola cuesta todos sus juegos
+FRACCION_RECORRIDO_NOMBRE = 0.025
 
 class GameService:
     @staticmethod
     def get_empresas_con_juegos(db: sqlite3.Connection) -> List[Tuple[int, str]]:
         """Obtiene empresas que tienen juegos con ruta en la nube."""
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.empresas_con_juegos()
         cursor = db.cursor()
         query = """
-            SELECT DISTINCT e.ID, e.NOMBRE
-            FROM EMPRESAS e
-            JOIN CONSOLAS c ON e.ID = c.EMPRESA_ID
-            JOIN JUEGOS_CONSOLAS jc ON c.ID = jc.CONSOLA_ID
-            WHERE IFNULL(jc.RUTA_NUBE, '') != ''
+            SELECT e.ID, e.NOMBRE
+            FROM EMPRESAS_DISPONIBLES d
+            JOIN EMPRESAS e ON e.ID = d.EMPRESA_ID
         """
         cursor.execute(query)
         return cursor.fetchall()
@@ -24,13 +38,15 @@ class GameService:
     @staticmethod
     def get_consolas_por_empresa(db: sqlite3.Connection, empresa_id: int) -> List[Tuple[int, str]]:
         """Obtiene consolas de una empresa que tienen juegos con ruta en la nube."""
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.consolas_por_empresa(empresa_id, solo_con_juegos=True)
         cursor = db.cursor()
         query = """
-            SELECT DISTINCT c.ID, c.NOMBRE
-            FROM CONSOLAS c
-            JOIN JUEGOS_CONSOLAS jc ON c.ID = jc.CONSOLA_ID
-            JOIN JUEGOS j ON jc.JUEGO_ID = j.ID
-            WHERE c.EMPRESA_ID = ? AND IFNULL(jc.RUTA_NUBE, '') != ''
+            SELECT c.ID, c.NOMBRE
+            FROM CONSOLAS_DISPONIBLES d
+            JOIN CONSOLAS c ON c.ID = d.CONSOLA_ID
+            WHERE d.EMPRESA_ID = ?
         """
         cursor.execute(query, (empresa_id,))
         return cursor.fetchall()
@@ -38,13 +54,15 @@ class GameService:
     @staticmethod
     def get_todas_consolas_con_juegos(db: sqlite3.Connection) -> List[Tuple[int, str, str]]:
         """Obtiene todas las consolas que tienen juegos con ruta en la nube."""
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.todas_consolas(solo_con_juegos=True)
         cursor = db.cursor()
         query = """
-            SELECT DISTINCT c.ID, c.NOMBRE, e.NOMBRE as EMPRESA_NOMBRE
-            FROM CONSOLAS c
+            SELECT c.ID, c.NOMBRE, e.NOMBRE as EMPRESA_NOMBRE
+            FROM CONSOLAS_DISPONIBLES d
+            JOIN CONSOLAS c ON c.ID = d.CONSOLA_ID
             JOIN EMPRESAS e ON c.EMPRESA_ID = e.ID
-            JOIN JUEGOS_CONSOLAS jc ON c.ID = jc.CONSOLA_ID
-            WHERE IFNULL(jc.RUTA_NUBE, '') != ''
             ORDER BY e.NOMBRE, c.NOMBRE
         """
         cursor.execute(query)
@@ -53,19 +71,44 @@ class GameService:
     @staticmethod
     def get_juegos_por_consola(db: sqlite3.Connection, consola_id: int) -> List[Tuple[int, str, Optional[str]]]:
         """Obtiene juegos de una consola que tienen ruta en la nube."""
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.juegos_por_consola(consola_id)
         cursor = db.cursor()
         query = """
             SELECT j.ID, j.NOMBRE, j.FECHA_LANZAMIENTO
             FROM JUEGOS j
             JOIN JUEGOS_CONSOLAS jc ON j.ID = jc.JUEGO_ID
-            WHERE jc.CONSOLA_ID = ? AND IFNULL(jc.RUTA_NUBE, '') != ''
+            WHERE jc.CONSOLA_ID = ? AND jc.RUTA_NUBE <> ''
         """
         cursor.execute(query, (consola_id,))
         return cursor.fetchall()
     
     @staticmethod
-    def registrar_juego(db: sqlite3.Connection, juego_id: int, consola_id: int) -> Optional[str]:
-        """Registra un juego asignando una ruta predeterminada."""
+    def get_juegos_por_consola_json(db: sqlite3.Connection, consola_id: int) -> str:
+        """
+        El listado de `get_juegos_por_consola` ya serializado como array JSON,
+        desde la instantánea en memoria o por SQLite sin pasar cada fila por Python.
+        """
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.juegos_por_consola_json(consola_id)
+        cursor = db.cursor()
+        query = f"""
+            SELECT json_group_array(json_object({_JSON_JUEGO}))
+            FROM (
+                SELECT j.ID, j.NOMBRE, j.FECHA_LANZAMIENTO
+                FROM JUEGOS j
+                JOIN JUEGOS_CONSOLAS jc ON j.ID = jc.JUEGO_ID
+                WHERE jc.CONSOLA_ID = ? AND jc.RUTA_NUBE <> ''
+            )
+        """
+        cursor.execute(query, (consola_id,))
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def calcular_ruta(db: sqlite3.Connection, juego_id: int, consola_id: int) -> Optional[str]:
+        """Ruta predeterminada del archivo de un juego, o None si no existe esa combinación."""
         cursor = db.cursor()
         cursor.execute(
             "SELECT e.NOMBRE, c.NOMBRE, j.NOMBRE FROM JUEGOS j "
@@ -81,87 +124,104 @@ class GameService:
         
         nombre_empresa, nombre_consola, nombre_juego = row
         nombre_juego = nombre_juego.strip()
-        ruta = f"{PRINCIPIO_RUTA}/{nombre_empresa}/{nombre_consola}/{nombre_juego}.zip"
-        
+        return f"{PRINCIPIO_RUTA}/{nombre_empresa}/{nombre_consola}/{nombre_juego}.zip"
+
+    @staticmethod
+    def registrar_juego(db: sqlite3.Connection, juego_id: int, consola_id: int) -> Optional[str]:
+        """Registra un juego asignando una ruta predeterminada."""
+        ruta = GameService.calcular_ruta(db, juego_id, consola_id)
+        if not ruta:
+            return None
+
+        cursor = db.cursor()
         cursor.execute(
             "UPDATE JUEGOS_CONSOLAS SET RUTA_NUBE = ? WHERE JUEGO_ID = ? AND CONSOLA_ID = ?",
             (ruta, juego_id, consola_id)
         )
         db.commit()
+        FuzzyService.refrescar(db, [juego_id])
+        CatalogoVersion.cambio()
         return ruta
     
     @staticmethod
-    def search_all(db: sqlite3.Connection, query: str, search_type: str = "all") -> dict:
-        """Busca en empresas, consolas y juegos según el término de búsqueda."""
+    def get_archivo_juego(db: sqlite3.Connection, juego_id: int, consola_id: int) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Devuelve (ruta en la nube, SHA-256 del blob) de un juego en una consola,
+        o (None, None) si no está registrado.
+        """
         cursor = db.cursor()
-        search_term = f"%{query.lower()}%"
-        
-        result = {
-            "companies": [],
-            "consoles": [],
-            "games": []
-        }
-        
-        # Buscar empresas
-        if search_type in ["companies", "all"]:
-            companies_query = """
-                SELECT DISTINCT e.ID, e.NOMBRE
-                FROM EMPRESAS e
-                JOIN CONSOLAS c ON e.ID = c.EMPRESA_ID
-                JOIN JUEGOS_CONSOLAS jc ON c.ID = jc.CONSOLA_ID
-                WHERE LOWER(e.NOMBRE) LIKE ? AND IFNULL(jc.RUTA_NUBE, '') != ''
-                ORDER BY e.NOMBRE
-            """
-            cursor.execute(companies_query, (search_term,))
-            result["companies"] = [{"id": row[0], "name": row[1]} for row in cursor.fetchall()]
-        
-        # Buscar consolas
-        if search_type in ["consoles", "all"]:
-            consoles_query = """
-                SELECT DISTINCT c.ID, c.NOMBRE, c.EMPRESA_ID
-                FROM CONSOLAS c
-                JOIN JUEGOS_CONSOLAS jc ON c.ID = jc.CONSOLA_ID
-                WHERE LOWER(c.NOMBRE) LIKE ? AND IFNULL(jc.RUTA_NUBE, '') != ''
-                ORDER BY c.NOMBRE
-            """
-            cursor.execute(consoles_query, (search_term,))
-            result["consoles"] = [{"id": row[0], "name": row[1], "company_id": row[2]} for row in cursor.fetchall()]
-        
-        # Buscar juegos
-        if search_type in ["games", "all"]:
-            games_query = """
-                SELECT DISTINCT j.ID, j.NOMBRE, jc.CONSOLA_ID, j.FECHA_LANZAMIENTO
-                FROM JUEGOS j
-                JOIN JUEGOS_CONSOLAS jc ON j.ID = jc.JUEGO_ID
-                WHERE LOWER(j.NOMBRE) LIKE ? AND IFNULL(jc.RUTA_NUBE, '') != ''
-                ORDER BY j.NOMBRE
-            """
-            cursor.execute(games_query, (search_term,))
-            result["games"] = [{
-                "id": row[0], 
-                "title": row[1], 
-                "console_id": row[2], 
-                "release_date": row[3]
-            } for row in cursor.fetchall()]
-        
-        return result
+        cursor.execute(
+            "SELECT RUTA_NUBE, BLOB_SHA256 FROM JUEGOS_ARCHIVOS WHERE JUEGO_ID = ? AND CONSOLA_ID = ?",
+            (juego_id, consola_id)
+        )
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    @staticmethod
+    def search_all(
+        db: sqlite3.Connection,
+        query: str,
+        search_type: str = "all",
+        fuzzy: bool = False,
+        limite: Optional[int] = None,
+        despues: Optional[tuple] = None,
+        iterar: bool = False
+    ) -> dict:
+        """Busca en empresas, consolas y juegos según el término de búsqueda."""
+        # Hasta que el índice difuso esté listo se busca por texto completo
+        if fuzzy and FuzzyService.listo():
+            return FuzzyService.buscar(db, query, search_type, solo_con_ruta=True, limite=limite or 20)
+        return GameService._buscar(db, query, search_type, True, limite, despues, iterar)
     
     @staticmethod
-    def get_todas_consolas(db: sqlite3.Connection) -> List[Tuple[int, str, str]]:
-        """Obtiene todas las consolas sin filtrar por ruta en la nube."""
+    def get_todas_consolas(
+        db: sqlite3.Connection,
+        limite: Optional[int] = None,
+        despues: Optional[tuple] = None,
+        iterar: bool = False
+    ) -> Iterable[Tuple[int, str, str]]:
+        """
+        Obtiene todas las consolas sin filtrar por ruta en la nube. Con `despues`
+        continúa tras la clave (empresa, consola, ID) de la página anterior; con
+        `iterar` devuelve el cursor para leer las filas sin cargarlas todas.
+        """
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.todas_consolas(False, limite, despues)
         cursor = db.cursor()
-        query = """
+        # Los nombres NULL cuentan como '' para que un cursor con NULL siga siendo comparable
+        filtro_cursor = (
+            "WHERE (IFNULL(e.NOMBRE, ''), IFNULL(c.NOMBRE, ''), c.ID) > (IFNULL(?, ''), IFNULL(?, ''), ?)"
+            if despues else ""
+        )
+        query = f"""
             SELECT c.ID, c.NOMBRE, e.NOMBRE as EMPRESA_NOMBRE
             FROM CONSOLAS c
             JOIN EMPRESAS e ON c.EMPRESA_ID = e.ID
-            ORDER BY e.NOMBRE, c.NOMBRE
+            {filtro_cursor}
+            ORDER BY IFNULL(e.NOMBRE, ''), IFNULL(c.NOMBRE, ''), c.ID
+            {"LIMIT ?" if limite else ""}
         """
-        cursor.execute(query)
-        return cursor.fetchall()
+        cursor.execute(query, [*(despues or ()), *([limite] if limite else [])])
+        return cursor if iterar else cursor.fetchall()
+    
+    @staticmethod
+    def contar_todas_consolas(db: sqlite3.Connection) -> int:
+        """Número total de consolas, cacheado hasta el próximo cambio del catálogo."""
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.contar_consolas()
+        return ContadorCache.obtener(
+            ("consolas",),
+            lambda: db.execute("SELECT COUNT(*) FROM CONSOLAS c JOIN EMPRESAS e ON c.EMPRESA_ID = e.ID").fetchone()[0]
+        )
     
     @staticmethod
     def get_consolas_por_empresa_todas(db: sqlite3.Connection, empresa_id: int) -> List[Tuple[int, str]]:
         """Obtiene todas las consolas de una empresa sin filtrar por ruta en la nube."""
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.consolas_por_empresa(empresa_id, solo_con_juegos=False)
         cursor = db.cursor()
         query = """
             SELECT c.ID, c.NOMBRE
@@ -173,68 +233,267 @@ class GameService:
         return cursor.fetchall()
     
     @staticmethod
-    def get_todos_juegos_por_consola(db: sqlite3.Connection, consola_id: int) -> List[Tuple[int, str, Optional[str]]]:
-        """Obtiene todos los juegos de una consola que tienen ruta en la nube."""
+    def get_todos_juegos_por_consola(
+        db: sqlite3.Connection,
+        consola_id: int,
+        limite: Optional[int] = None,
+        despues: Optional[tuple] = None,
+        iterar: bool = False
+    ) -> Iterable[Tuple[int, str, Optional[str]]]:
+        """
+        Obtiene todos los juegos de una consola que tienen ruta en la nube. Con
+        `despues` continúa tras la clave (nombre, ID) de la página anterior; con
+        `iterar` devuelve el cursor para leer las filas sin cargarlas todas.
+        El orden es (IFNULL(nombre, ''), ID), el del índice IDX_JUEGOS_NOMBRE,
+        para que los juegos sin nombre no corten la paginación.
+        """
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.juegos_por_consola(consola_id, limite, despues, iterar)
         cursor = db.cursor()
-        query = """
+        # La primera condición es la que permite a SQLite saltar en el índice
+        # de la expresión; la comparación de filas sola no lo usa
+        filtro_cursor = (
+            "AND IFNULL(j.NOMBRE, '') >= IFNULL(?, '') AND (IFNULL(j.NOMBRE, ''), j.ID) > (IFNULL(?, ''), ?)"
+            if despues else ""
+        )
+        # CROSS JOIN fija el orden de las tablas: JUEGOS por nombre primero
+        union = "CROSS JOIN" if limite and GameService._recorrer_por_nombre(db, consola_id) else "JOIN"
+        query = f"""
             SELECT j.ID, j.NOMBRE, j.FECHA_LANZAMIENTO
             FROM JUEGOS j
-            JOIN JUEGOS_CONSOLAS jc ON j.ID = jc.JUEGO_ID
-            WHERE jc.CONSOLA_ID = ? AND IFNULL(jc.RUTA_NUBE, '') != ''
-            ORDER BY j.NOMBRE
+            {union} JUEGOS_CONSOLAS jc ON j.ID = jc.JUEGO_ID
+            WHERE jc.CONSOLA_ID = ? AND jc.RUTA_NUBE <> '' {filtro_cursor}
+            ORDER BY IFNULL(j.NOMBRE, ''), j.ID
+            {"LIMIT ?" if limite else ""}
+        """
+        cursor.execute(query, [consola_id, *((despues[0], *despues) if despues else ()), *([limite] if limite else [])])
+        return cursor if iterar else cursor.fetchall()
+    
+    @staticmethod
+    def get_todos_juegos_por_consola_json(db: sqlite3.Connection, consola_id: int) -> str:
+        """
+        `get_todos_juegos_por_consola` sin paginar, serializado como array JSON
+        (desde la instantánea en memoria o, si no está al día, por SQLite).
+        """
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.juegos_por_consola_json(consola_id)
+        cursor = db.cursor()
+        query = f"""
+            SELECT json_group_array(json_object({_JSON_JUEGO}))
+            FROM (
+                SELECT j.ID, j.NOMBRE, j.FECHA_LANZAMIENTO
+                FROM JUEGOS j
+                JOIN JUEGOS_CONSOLAS jc ON j.ID = jc.JUEGO_ID
+                WHERE jc.CONSOLA_ID = ? AND jc.RUTA_NUBE <> ''
+                ORDER BY IFNULL(j.NOMBRE, ''), j.ID
+            )
         """
         cursor.execute(query, (consola_id,))
-        return cursor.fetchall()
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def _recorrer_por_nombre(db: sqlite3.Connection, consola_id: int) -> bool:
+        """Si la consola tiene tantos juegos que compensa paginarla en el orden del índice de nombres."""
+        return bool(ContadorCache.obtener(
+            ("recorrido_nombre", consola_id),
+            lambda: db.execute(
+                """
+                SELECT IFNULL(MAX(NUM_JUEGOS) FILTER (WHERE CONSOLA_ID = ?), 0) >= ? * SUM(NUM_JUEGOS)
+                FROM CONSOLAS_DISPONIBLES
+                """,
+                (consola_id, FRACCION_RECORRIDO_NOMBRE)
+            ).fetchone()[0] or 0
+        ))
+
+    @staticmethod
+    def contar_todos_juegos_por_consola(db: sqlite3.Connection, consola_id: int) -> int:
+        """Número de juegos del listado anterior, leído del catálogo disponible materializado."""
+        catalogo = CatalogoService.instantanea()
+        if catalogo is not None:
+            return catalogo.contar_juegos(consola_id)
+        fila = db.execute(
+            "SELECT NUM_JUEGOS FROM CONSOLAS_DISPONIBLES WHERE CONSOLA_ID = ?",
+            (consola_id,)
+        ).fetchone()
+        return fila[0] if fila else 0
     
     @staticmethod
-    def search_all_general(db: sqlite3.Connection, query: str, search_type: str = "all") -> dict:
+    def search_all_general(
+        db: sqlite3.Connection,
+        query: str,
+        search_type: str = "all",
+        fuzzy: bool = False,
+        limite: Optional[int] = None,
+        despues: Optional[tuple] = None,
+        iterar: bool = False
+    ) -> dict:
         """Busca en empresas, consolas y juegos sin filtrar por ruta en la nube."""
+        # Hasta que el índice difuso esté listo se busca por texto completo
+        if fuzzy and FuzzyService.listo():
+            return FuzzyService.buscar(db, query, search_type, solo_con_ruta=False, limite=limite or 20)
+        return GameService._buscar(db, query, search_type, False, limite, despues, iterar)
+    
+    @staticmethod
+    def _consulta_fts(query: str) -> str:
+        """Convierte el texto del usuario en una consulta FTS5 de prefijos."""
+        tokens = re.findall(r"\w+", query)
+        return " ".join(f'"{token}"*' for token in tokens)
+    
+    @staticmethod
+    def _buscar(
+        db: sqlite3.Connection,
+        query: str,
+        search_type: str,
+        solo_con_ruta: bool,
+        limite: Optional[int] = None,
+        despues: Optional[tuple] = None,
+        iterar: bool = False
+    ) -> dict:
+        """
+        Busca en los índices FTS5 ordenando por relevancia (bm25) y nombre.
+
+        Solo los juegos se paginan: `limite` y `despues` (clave bm25, nombre, ID,
+        consola) actúan sobre ellos, y empresas y consolas van completas en la
+        primera página. El resultado incluye "siguiente" con la clave de la
+        última fila si quedan más juegos y "total_games" con el total cacheado.
+        Con `iterar`, "games" es un generador en lugar de una lista.
+        """
         cursor = db.cursor()
-        search_term = f"%{query.lower()}%"
+        consulta = GameService._consulta_fts(query)
         
         result = {
             "companies": [],
             "consoles": [],
             "games": []
         }
+        if not consulta:
+            return result
         
         # Buscar empresas
-        if search_type in ["companies", "all"]:
-            companies_query = """
-                SELECT DISTINCT e.ID, e.NOMBRE
-                FROM EMPRESAS e
-                WHERE LOWER(e.NOMBRE) LIKE ?
-                ORDER BY e.NOMBRE
+        if search_type in ["companies", "all"] and not despues:
+            filtro_ruta = "AND e.ID IN (SELECT EMPRESA_ID FROM EMPRESAS_DISPONIBLES)" if solo_con_ruta else ""
+            companies_query = f"""
+                SELECT e.ID, e.NOMBRE
+                FROM EMPRESAS_FTS
+                JOIN EMPRESAS e ON e.ID = EMPRESAS_FTS.rowid
+                WHERE EMPRESAS_FTS MATCH ? {filtro_ruta}
+                ORDER BY bm25(EMPRESAS_FTS), e.NOMBRE
             """
-            cursor.execute(companies_query, (search_term,))
+            cursor.execute(companies_query, (consulta,))
             result["companies"] = [{"id": row[0], "name": row[1]} for row in cursor.fetchall()]
         
         # Buscar consolas
-        if search_type in ["consoles", "all"]:
-            consoles_query = """
-                SELECT DISTINCT c.ID, c.NOMBRE, c.EMPRESA_ID
-                FROM CONSOLAS c
-                WHERE LOWER(c.NOMBRE) LIKE ?
-                ORDER BY c.NOMBRE
+        if search_type in ["consoles", "all"] and not despues:
+            filtro_ruta = "AND c.ID IN (SELECT CONSOLA_ID FROM CONSOLAS_DISPONIBLES)" if solo_con_ruta else ""
+            consoles_query = f"""
+                SELECT c.ID, c.NOMBRE, c.EMPRESA_ID
+                FROM CONSOLAS_FTS
+                JOIN CONSOLAS c ON c.ID = CONSOLAS_FTS.rowid
+                WHERE CONSOLAS_FTS MATCH ? {filtro_ruta}
+                ORDER BY bm25(CONSOLAS_FTS), c.NOMBRE
             """
-            cursor.execute(consoles_query, (search_term,))
+            cursor.execute(consoles_query, (consulta,))
             result["consoles"] = [{"id": row[0], "name": row[1], "company_id": row[2]} for row in cursor.fetchall()]
         
         # Buscar juegos
         if search_type in ["games", "all"]:
-            games_query = """
-                SELECT DISTINCT j.ID, j.NOMBRE, jc.CONSOLA_ID, j.FECHA_LANZAMIENTO
-                FROM JUEGOS j
+            filtro_ruta = "AND jc.RUTA_NUBE <> ''" if solo_con_ruta else ""
+            # Los nombres NULL cuentan como '' para que un cursor con NULL siga siendo comparable
+            filtro_cursor = (
+                "AND (bm25(JUEGOS_FTS), IFNULL(j.NOMBRE, ''), j.ID, jc.CONSOLA_ID) > (?, IFNULL(?, ''), ?, ?)"
+                if despues else ""
+            )
+            games_query = f"""
+                SELECT j.ID, j.NOMBRE, jc.CONSOLA_ID, j.FECHA_LANZAMIENTO, bm25(JUEGOS_FTS)
+                FROM JUEGOS_FTS
+                JOIN JUEGOS j ON j.ID = JUEGOS_FTS.rowid
                 JOIN JUEGOS_CONSOLAS jc ON j.ID = jc.JUEGO_ID
-                WHERE LOWER(j.NOMBRE) LIKE ?
-                ORDER BY j.NOMBRE
+                WHERE JUEGOS_FTS MATCH ? {filtro_ruta} {filtro_cursor}
+                ORDER BY bm25(JUEGOS_FTS), IFNULL(j.NOMBRE, ''), j.ID, jc.CONSOLA_ID
+                {"LIMIT ?" if limite else ""}
             """
-            cursor.execute(games_query, (search_term,))
-            result["games"] = [{
+            cursor.execute(games_query, [consulta, *(despues or ()), *([limite + 1] if limite else [])])
+            if iterar:
+                filas = cursor
+            else:
+                filas, result["siguiente"] = paginar(cursor.fetchall(), limite, lambda f: (f[4], f[1], f[0], f[2]))
+            result["games"] = ({
                 "id": row[0], 
                 "title": row[1], 
                 "console_id": row[2], 
                 "release_date": row[3]
-            } for row in cursor.fetchall()]
+            } for row in filas)
+            if not iterar:
+                result["games"] = list(result["games"])
+            if limite:
+                result["total_games"] = ContadorCache.obtener(
+                    ("busqueda", consulta, solo_con_ruta),
+                    lambda: db.execute(
+                        f"""
+                        SELECT COUNT(*)
+                        FROM JUEGOS_FTS
+                        JOIN JUEGOS_CONSOLAS jc ON jc.JUEGO_ID = JUEGOS_FTS.rowid
+                        WHERE JUEGOS_FTS MATCH ? {filtro_ruta}
+                        """,
+                        (consulta,)
+                    ).fetchone()[0]
+                )
         
-        return result
\ No newline at end of file
+        return result
+
+
+class AsyncGameService:
+    """
+    Variantes async de GameService para los endpoints async: cada llamada se
+    ejecuta en los hilos de database.asincrono con una conexión del pool.
+    """
+
+    @staticmethod
+    async def get_consolas_por_empresa(empresa_id: int) -> List[Tuple[int, str]]:
+        return await lectura.ejecutar(GameService.get_consolas_por_empresa, empresa_id)
+
+    @staticmethod
+    async def get_consolas_por_empresa_todas(empresa_id: int) -> List[Tuple[int, str]]:
+        return await lectura.ejecutar(GameService.get_consolas_por_empresa_todas, empresa_id)
+
+    @staticmethod
+    async def get_todos_juegos_por_consola(
+        consola_id: int,
+        limite: Optional[int] = None,
+        despues: Optional[tuple] = None
+    ) -> List[Tuple[int, str, Optional[str]]]:
+        return await lectura.ejecutar(GameService.get_todos_juegos_por_consola, consola_id, limite, despues)
+
+    @staticmethod
+    async def get_todos_juegos_por_consola_json(consola_id: int) -> str:
+        return await lectura.ejecutar(GameService.get_todos_juegos_por_consola_json, consola_id)
+
+    @staticmethod
+    async def contar_todos_juegos_por_consola(consola_id: int) -> int:
+        return await lectura.ejecutar(GameService.contar_todos_juegos_por_consola, consola_id)
+
+    @staticmethod
+    async def registrar_juego(juego_id: int, consola_id: int) -> Optional[str]:
+        return await escritura.ejecutar(GameService.registrar_juego, juego_id, consola_id)
+
+    @staticmethod
+    async def search_all(
+        query: str,
+        search_type: str = "all",
+        fuzzy: bool = False,
+        limite: Optional[int] = None,
+        despues: Optional[tuple] = None
+    ) -> dict:
+        return await lectura.ejecutar(GameService.search_all, query, search_type, fuzzy, limite, despues)
+
+    @staticmethod
+    async def search_all_general(
+        query: str,
+        search_type: str = "all",
+        fuzzy: bool = False,
+        limite: Optional[int] = None,
+        despues: Optional[tuple] = None
+    ) -> dict:
+        return await lectura.ejecutar(GameService.search_all_general, query, search_type, fuzzy, limite, despues)
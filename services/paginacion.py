@@ -0,0 +1,113 @@
+import base64
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from database.database import get_pool
+from services.cache_service import CatalogoVersion
+from services.serializacion import dumps
+
+# Filas leídas de SQLite por bloque al emitir NDJSON
+TAMANO_BLOQUE = 500
+
+
+def codificar_cursor(*valores) -> str:
+    """Codifica la clave de la última fila de una página como cursor opaco."""
+    crudo = json.dumps(valores, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: Optional[str], num_valores: int) -> Optional[tuple]:
+    """Decodifica un cursor de `codificar_cursor`; responde 400 si no es válido."""
+    if not cursor:
+        return None
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación no válido")
+    if not isinstance(valores, list) or len(valores) != num_valores:
+        raise HTTPException(status_code=400, detail="Cursor de paginación no válido")
+    return tuple(valores)
+
+
+def paginar(filas: list, limite: Optional[int], clave: Callable[[tuple], tuple]):
+    """
+    Recorta las filas pedidas con `limite + 1` y devuelve (filas, clave de la
+    última fila) o (filas, None) si no hay más páginas.
+    """
+    if not limite or len(filas) <= limite:
+        return filas, None
+    filas = filas[:limite]
+    return filas, clave(filas[-1])
+
+
+def cabeceras_pagina(siguiente: Optional[tuple], total: Optional[int]) -> dict:
+    """Cabeceras con el cursor de la página siguiente y el total de elementos."""
+    cabeceras = {}
+    if siguiente is not None:
+        cabeceras["X-Next-Cursor"] = codificar_cursor(*siguiente)
+    if total is not None:
+        cabeceras["X-Total-Count"] = str(total)
+    return cabeceras
+
+
+def elementos_busqueda(result: dict) -> Iterable[dict]:
+    """Aplana el resultado de una búsqueda en elementos con su tipo, para NDJSON."""
+    for tipo, clave in (("company", "companies"), ("console", "consoles"), ("game", "games")):
+        for item in result[clave]:
+            yield {"type": tipo, **item}
+
+
+def respuesta_ndjson(productor: Callable[..., Iterable[dict]], *args) -> StreamingResponse:
+    """
+    Emite los elementos de `productor(db, *args)` como NDJSON. La conexión se
+    toma del pool dentro del generador porque la de la dependencia se devuelve
+    antes de que termine el envío.
+    """
+    def generar():
+        with get_pool().lector() as db:
+            for item in productor(db, *args):
+                yield dumps(item) + b"\n"
+
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
+
+
+class ContadorCache:
+    """
+    Totales de los listados calculados una vez y reutilizados hasta que el
+    catálogo cambia, para no lanzar un COUNT(*) en cada página. La clave
+    lleva la versión del catálogo leída antes de contar: un total calculado
+    mientras el catálogo cambiaba queda guardado con la versión vieja y no
+    se vuelve a servir.
+    """
+
+    MAX_ENTRADAS = 1024
+    _lock = threading.Lock()
+    _valores: "OrderedDict[Hashable, int]" = OrderedDict()
+
+    @staticmethod
+    def obtener(clave: Hashable, calcular: Callable[[], int]) -> int:
+        clave = (CatalogoVersion.actual(), clave)
+        with ContadorCache._lock:
+            if clave in ContadorCache._valores:
+                ContadorCache._valores.move_to_end(clave)
+                return ContadorCache._valores[clave]
+        valor = calcular()
+        with ContadorCache._lock:
+            ContadorCache._valores[clave] = valor
+            while len(ContadorCache._valores) > ContadorCache.MAX_ENTRADAS:
+                ContadorCache._valores.popitem(last=False)
+        return valor
+
+    @staticmethod
+    def invalidar():
+        with ContadorCache._lock:
+            ContadorCache._valores.clear()
+
+
+CatalogoVersion.suscribir(ContadorCache.invalidar)
@@ -0,0 +1,36 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+# orjson es opcional: serializa listas grandes varias veces más rápido que el
+# json de la biblioteca estándar, pero la API funciona igual sin él
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(contenido: Any) -> bytes:
+    """JSON compacto en UTF-8, con orjson si está instalado."""
+    if orjson is not None:
+        return orjson.dumps(contenido)
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class RespuestaJSON(JSONResponse):
+    """
+    JSONResponse que serializa con `dumps`. Los listados la devuelven
+    directamente con filas de la base de datos, que ya tienen la forma del
+    modelo de respuesta: FastAPI no valida cada elemento si recibe una Response.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class JSONCrudo(JSONResponse):
+    """Respuesta con un cuerpo que ya es JSON (por ejemplo, de json_group_array en SQLite)."""
+
+    def render(self, content: Any) -> bytes:
+        return content.encode("utf-8") if isinstance(content, str) else bytes(content)
@@ -0,0 +1,380 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from database.database import get_pool
+from services.game_service import GameService
+from services.descarga_service import DIRECTORIO_JUEGOS
+from services.blob_service import BlobService, sha256_fichero
+
+# Ficheros parciales de las subidas en curso; mejor en el mismo disco que los
+# juegos para que el paso final sea un simple rename
+DIRECTORIO_SUBIDAS = os.getenv("DIRECTORIO_SUBIDAS", os.path.join(DIRECTORIO_JUEGOS or ".", ".subidas"))
+TAMANO_BLOQUE = int(os.getenv("SUBIDA_TAMANO_BLOQUE", str(8 * 1024 * 1024)))
+TAMANO_BLOQUE_MINIMO = 64 * 1024
+TAMANO_BLOQUE_MAXIMO = 64 * 1024 * 1024
+# Bytes acumulados del cuerpo antes de pasar la escritura a un hilo
+TAMANO_ESCRITURA = 1024 * 1024
+# Las subidas sin recibir bloques durante este tiempo se dan por abandonadas
+# y se borran con su fichero parcial (0 = nunca)
+CADUCIDAD_SUBIDAS = float(os.getenv("SUBIDA_CADUCIDAD_HORAS", "24")) * 3600
+
+
+def _escribir(f, h, datos: bytes):
+    h.update(datos)
+    f.write(datos)
+
+
+def _sincronizar(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+# Mapa de bloques recibidos de una subida: un bit por bloque (columna RECIBIDOS)
+def _mapa_vacio(total: int) -> bytes:
+    return bytes(-(-total // 8))
+
+
+def _recibido(mapa: bytes, indice: int) -> bool:
+    return bool(mapa[indice >> 3] >> (indice & 7) & 1)
+
+
+def _con_bloque(mapa: bytes, indice: int, recibido: bool) -> bytes:
+    mapa = bytearray(mapa)
+    if recibido:
+        mapa[indice >> 3] |= 1 << (indice & 7)
+    else:
+        mapa[indice >> 3] &= ~(1 << (indice & 7)) & 0xFF
+    return bytes(mapa)
+
+
+def _primer_pendiente(mapa: bytes, total: int) -> int:
+    """Primer bloque sin recibir, o `total` si han llegado todos."""
+    for byte, valor in enumerate(mapa):
+        if valor != 0xFF:
+            indice = byte * 8 + ((~valor & (valor + 1)).bit_length() - 1)
+            return min(indice, total)
+    return total
+
+
+class SubidaService:
+    """
+    Subidas por bloques reanudables: iniciar, enviar bloques en orden con su
+    SHA-256 y confirmar. Cada bloque recibido se apunta por separado, así
+    que reenviar uno no invalida los demás. Cada bloque se escribe en disco según llega, sin
+    guardar el fichero en memoria. Toma sus propias conexiones del pool para no
+    retener la de escritura mientras llegan los datos.
+    """
+
+    # Subidas con un bloque escribiéndose; solo se admite uno a la vez
+    _lock = threading.Lock()
+    _escribiendo: set = set()
+
+    @staticmethod
+    def _temporal(upload_id: str) -> str:
+        return os.path.join(DIRECTORIO_SUBIDAS, f"{upload_id}.part")
+
+    @staticmethod
+    def _leer(upload_id: str) -> tuple:
+        with get_pool().lector() as db:
+            fila = db.execute(
+                "SELECT ID, JUEGO_ID, CONSOLA_ID, TAMANO, TAMANO_BLOQUE, SHA256, BLOQUES, ESTADO, RECIBIDOS "
+                "FROM SUBIDAS WHERE ID = ?",
+                (upload_id,)
+            ).fetchone()
+        if not fila:
+            raise HTTPException(status_code=404, detail="Subida no encontrada")
+        return fila
+
+    @staticmethod
+    def _estado(fila: tuple) -> dict:
+        upload_id, juego_id, consola_id, tamano, tamano_bloque, sha256, bloques, estado, recibidos = fila
+        total = -(-tamano // tamano_bloque)
+        recibidos_bytes = bloques * tamano_bloque
+        if _recibido(recibidos, total - 1):
+            # El último bloque puede ser más corto
+            recibidos_bytes -= total * tamano_bloque - tamano
+        return {
+            "upload_id": upload_id,
+            "juego_id": juego_id,
+            "consola_id": consola_id,
+            "size": tamano,
+            "chunk_size": tamano_bloque,
+            "chunks": total,
+            "next_chunk": _primer_pendiente(recibidos, total),
+            "received_bytes": recibidos_bytes,
+            "status": estado,
+        }
+
+    @staticmethod
+    def iniciar(juego_id: int, consola_id: int, tamano: int,
+                tamano_bloque: Optional[int] = None, sha256: Optional[str] = None) -> dict:
+        """
+        Reserva el fichero parcial y registra la subida. Si se indica el
+        SHA-256 y ese archivo ya está en el almacén, la subida termina aquí
+        sin enviar datos: el hash que declara el cliente no se puede
+        comprobar y se da por bueno, igual que la ruta de registrar_juego,
+        porque solo los administradores pueden subir.
+        """
+        tamano_bloque = tamano_bloque or TAMANO_BLOQUE
+        if not TAMANO_BLOQUE_MINIMO <= tamano_bloque <= TAMANO_BLOQUE_MAXIMO:
+            raise HTTPException(
+                status_code=400,
+                detail=f"chunk_size debe estar entre {TAMANO_BLOQUE_MINIMO} y {TAMANO_BLOQUE_MAXIMO} bytes"
+            )
+        with get_pool().lector() as db:
+            if GameService.calcular_ruta(db, juego_id, consola_id) is None:
+                raise HTTPException(status_code=404, detail="No se encontró la combinación de juego y consola")
+        sha256 = sha256.lower() if sha256 else None
+
+        upload_id = uuid.uuid4().hex
+        total = -(-tamano // tamano_bloque)
+        if sha256:
+            with get_pool().escritor() as db:
+                # El archivo ya está en el almacén: la subida termina sin enviar
+                # datos, confiando en el SHA-256 declarado (no hay nada que comprobar)
+                if BlobService.existe(db, sha256) and os.path.getsize(BlobService.ruta(sha256)) == tamano:
+                    db.execute(
+                        "INSERT INTO SUBIDAS (ID, JUEGO_ID, CONSOLA_ID, TAMANO, TAMANO_BLOQUE, SHA256, BLOQUES, ESTADO, RECIBIDOS) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, 'completada', ?)",
+                        (upload_id, juego_id, consola_id, tamano, tamano_bloque, sha256, total,
+                         b"\xff" * len(_mapa_vacio(total)))
+                    )
+                    ruta = BlobService.asignar(db, juego_id, consola_id, sha256)
+                    return {**SubidaService._estado(SubidaService._leer(upload_id)), "ruta": ruta}
+
+        os.makedirs(DIRECTORIO_SUBIDAS, exist_ok=True)
+        if shutil.disk_usage(DIRECTORIO_SUBIDAS).free < tamano:
+            raise HTTPException(status_code=507, detail="No hay espacio suficiente para la subida")
+
+        with open(SubidaService._temporal(upload_id), "wb") as f:
+            f.truncate(tamano)
+        with get_pool().escritor() as db:
+            db.execute(
+                "INSERT INTO SUBIDAS (ID, JUEGO_ID, CONSOLA_ID, TAMANO, TAMANO_BLOQUE, SHA256, RECIBIDOS) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (upload_id, juego_id, consola_id, tamano, tamano_bloque, sha256, _mapa_vacio(total))
+            )
+            db.commit()
+        return SubidaService._estado(SubidaService._leer(upload_id))
+
+    @staticmethod
+    def estado(upload_id: str) -> dict:
+        return SubidaService._estado(SubidaService._leer(upload_id))
+
+    @staticmethod
+    def _apuntar(upload_id: str, indice: int, recibido: bool) -> bool:
+        """
+        Marca el bloque `indice` como recibido o no y mantiene BLOQUES como el
+        número de recibidos. Devuelve False si la subida ya no está en curso.
+        """
+        with get_pool().escritor() as db:
+            fila = db.execute(
+                "SELECT RECIBIDOS FROM SUBIDAS WHERE ID = ? AND ESTADO = 'en_curso'", (upload_id,)
+            ).fetchone()
+            if not fila:
+                return False
+            mapa = fila[0]
+            cambio = (1 if recibido else -1) if _recibido(mapa, indice) != recibido else 0
+            # FECHA es la última actividad de la subida, para limpiar_caducadas
+            db.execute(
+                "UPDATE SUBIDAS SET RECIBIDOS = ?, BLOQUES = BLOQUES + ?, FECHA = CURRENT_TIMESTAMP WHERE ID = ?",
+                (_con_bloque(mapa, indice, recibido), cambio, upload_id)
+            )
+            db.commit()
+            return True
+
+    @staticmethod
+    async def recibir_bloque(upload_id: str, indice: int, sha256: str, cuerpo: AsyncIterator[bytes]) -> dict:
+        """
+        Escribe el bloque `indice` en su posición del fichero parcial según llega
+        y lo da por recibido si el tamaño y el SHA-256 coinciden. Se puede
+        reenviar cualquier bloque ya recibido o el siguiente pendiente.
+
+        Mientras se escribe, el bloque cuenta como no recibido, y solo se marca
+        de nuevo tras el fsync. Los demás bloques no se tocan: si el reenvío
+        de uno ya recibido falla, basta con volver a enviar ese.
+        """
+        with SubidaService._lock:
+            if upload_id in SubidaService._escribiendo:
+                raise HTTPException(status_code=409, detail="Ya se está enviando un bloque de esta subida")
+            SubidaService._escribiendo.add(upload_id)
+        try:
+            return await SubidaService._recibir_bloque(upload_id, indice, sha256, cuerpo)
+        finally:
+            with SubidaService._lock:
+                SubidaService._escribiendo.discard(upload_id)
+
+    @staticmethod
+    async def _recibir_bloque(upload_id: str, indice: int, sha256: str, cuerpo: AsyncIterator[bytes]) -> dict:
+        fila = await run_in_threadpool(SubidaService._leer, upload_id)
+        estado = SubidaService._estado(fila)
+        if estado["status"] != "en_curso":
+            raise HTTPException(status_code=409, detail="La subida ya está cerrada")
+        if not 0 <= indice < estado["chunks"]:
+            raise HTTPException(status_code=400, detail="Índice de bloque fuera de rango")
+        if indice > estado["next_chunk"]:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Se esperaba el bloque {estado['next_chunk']}",
+                headers={"X-Next-Chunk": str(estado["next_chunk"])}
+            )
+        if not await run_in_threadpool(SubidaService._apuntar, upload_id, indice, False):
+            raise HTTPException(status_code=409, detail="La subida ya está cerrada")
+
+        tamano_bloque = estado["chunk_size"]
+        esperado = min(tamano_bloque, estado["size"] - indice * tamano_bloque)
+        h = hashlib.sha256()
+        recibidos = 0
+        pendiente = bytearray()
+        f = await run_in_threadpool(open, SubidaService._temporal(upload_id), "r+b")
+        try:
+            f.seek(indice * tamano_bloque)
+            async for trozo in cuerpo:
+                recibidos += len(trozo)
+                if recibidos > esperado:
+                    raise HTTPException(status_code=413, detail=f"El bloque debe medir {esperado} bytes")
+                pendiente += trozo
+                if len(pendiente) >= TAMANO_ESCRITURA:
+                    await run_in_threadpool(_escribir, f, h, bytes(pendiente))
+                    pendiente.clear()
+            if pendiente:
+                await run_in_threadpool(_escribir, f, h, bytes(pendiente))
+            if recibidos != esperado:
+                raise HTTPException(status_code=400, detail=f"Bloque incompleto: {recibidos} de {esperado} bytes")
+            if h.hexdigest() != sha256.strip().lower():
+                raise HTTPException(status_code=422, detail="El SHA-256 del bloque no coincide")
+            await run_in_threadpool(_sincronizar, f)
+        finally:
+            await run_in_threadpool(f.close)
+
+        await run_in_threadpool(SubidaService._apuntar, upload_id, indice, True)
+        return await run_in_threadpool(SubidaService.estado, upload_id)
+
+    @staticmethod
+    def _faltan_bloques(estado: dict) -> HTTPException:
+        return HTTPException(
+            status_code=409,
+            detail=f"Faltan bloques: el siguiente es el {estado['next_chunk']}",
+            headers={"X-Next-Chunk": str(estado["next_chunk"])}
+        )
+
+    @staticmethod
+    def _cambiar_estado(upload_id: str, de: str, a: str, bloques: int = 0) -> bool:
+        """Cambia el estado solo si sigue siendo `de`; dice si lo ha cambiado."""
+        with get_pool().escritor() as db:
+            cursor = db.execute(
+                "UPDATE SUBIDAS SET ESTADO = ?, FECHA = CURRENT_TIMESTAMP WHERE ID = ? AND ESTADO = ? AND BLOQUES >= ?",
+                (a, upload_id, de, bloques)
+            )
+            db.commit()
+            return cursor.rowcount == 1
+
+    @staticmethod
+    def finalizar(upload_id: str) -> dict:
+        """
+        Comprueba que han llegado todos los bloques (y el SHA-256 completo si
+        se indicó), guarda el fichero en el almacén de blobs y registra el
+        juego como hace `registrar_juego`. Si llegan dos confirmaciones a la
+        vez, solo sigue la que pasa la subida a 'confirmando'; la otra recibe 409.
+        """
+        fila = SubidaService._leer(upload_id)
+        estado = SubidaService._estado(fila)
+        juego_id, consola_id, sha256 = fila[1], fila[2], fila[5]
+        if estado["status"] == "completada":
+            return estado
+        if estado["next_chunk"] < estado["chunks"]:
+            raise SubidaService._faltan_bloques(estado)
+        if not SubidaService._cambiar_estado(upload_id, "en_curso", "confirmando", estado["chunks"]):
+            estado = SubidaService.estado(upload_id)
+            if estado["status"] == "completada":
+                return estado
+            if estado["status"] == "en_curso":
+                raise SubidaService._faltan_bloques(estado)
+            raise HTTPException(status_code=409, detail="La subida ya se está confirmando")
+
+        temporal = SubidaService._temporal(upload_id)
+        try:
+            # El hash se calcula fuera de la conexión de escritura
+            calculado = sha256_fichero(temporal)
+            if sha256 and calculado != sha256:
+                raise HTTPException(status_code=422, detail="El SHA-256 del archivo completo no coincide")
+        except BaseException:
+            # El fichero parcial sigue ahí: se pueden reenviar bloques y volver a confirmar
+            SubidaService._cambiar_estado(upload_id, "confirmando", "en_curso")
+            raise
+
+        with get_pool().escritor() as db:
+            BlobService.guardar(db, temporal, calculado)
+            db.execute("UPDATE SUBIDAS SET ESTADO = 'completada', SHA256 = ? WHERE ID = ?", (calculado, upload_id))
+            ruta = BlobService.asignar(db, juego_id, consola_id, calculado)
+        return {**estado, "status": "completada", "ruta": ruta}
+
+    @staticmethod
+    def cancelar(upload_id: str):
+        """Descarta una subida en curso y su fichero parcial."""
+        fila = SubidaService._leer(upload_id)
+        if fila[7] == "confirmando":
+            raise HTTPException(status_code=409, detail="La subida se está confirmando")
+        if fila[7] == "en_curso":
+            try:
+                os.remove(SubidaService._temporal(upload_id))
+            except FileNotFoundError:
+                pass
+        with get_pool().escritor() as db:
+            db.execute("DELETE FROM SUBIDAS WHERE ID = ?", (upload_id,))
+            db.commit()
+
+    @staticmethod
+    def limpiar_caducadas() -> dict:
+        """
+        Borra las subidas sin terminar que llevan más de CADUCIDAD_SUBIDAS sin
+        actividad, con sus ficheros parciales, y los .part que no son de
+        ninguna subida abierta. Devuelve cuántas subidas y ficheros ha borrado.
+        """
+        if CADUCIDAD_SUBIDAS <= 0:
+            return {"subidas": 0, "ficheros": 0}
+        with get_pool().escritor() as db:
+            # Con el escritor tomado ningún bloque puede empezar a escribirse
+            with SubidaService._lock:
+                escribiendo = set(SubidaService._escribiendo)
+            caducadas = [
+                upload_id for (upload_id,) in db.execute(
+                    "SELECT ID FROM SUBIDAS WHERE ESTADO <> 'completada' AND FECHA < datetime('now', ?)",
+                    (f"-{int(CADUCIDAD_SUBIDAS)} seconds",)
+                )
+                if upload_id not in escribiendo
+            ]
+            db.executemany("DELETE FROM SUBIDAS WHERE ID = ?", [(upload_id,) for upload_id in caducadas])
+            db.commit()
+            abiertas = {upload_id for (upload_id,) in db.execute("SELECT ID FROM SUBIDAS WHERE ESTADO <> 'completada'")}
+
+        try:
+            nombres = os.listdir(DIRECTORIO_SUBIDAS)
+        except FileNotFoundError:
+            nombres = []
+        borrados = 0
+        caducadas = set(caducadas)
+        antiguo = time.time() - CADUCIDAD_SUBIDAS
+        for nombre in nombres:
+            upload_id, extension = os.path.splitext(nombre)
+            if extension != ".part" or upload_id in abiertas:
+                continue
+            ruta = os.path.join(DIRECTORIO_SUBIDAS, nombre)
+            try:
+                # Un .part reciente sin fila puede ser de una subida que se está creando
+                if upload_id in caducadas or os.path.getmtime(ruta) < antiguo:
+                    os.remove(ruta)
+                    borrados += 1
+            except FileNotFoundError:
+                pass
+        if caducadas or borrados:
+            print(f"Subidas caducadas: {len(caducadas)} borradas, {borrados} ficheros parciales")
+        return {"subidas": len(caducadas), "ficheros": borrados}
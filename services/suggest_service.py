@@ -0,0 +1,196 @@
+import heapq
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Tuple
+
+from database.database import get_pool
+from services.fuzzy_service import normalizar
+from services.cache_service import CatalogoVersion
+
+# Longitud máxima de prefijo con el top-N precalculado; los prefijos cortos
+# abarcan rangos enormes ("s", "su"...) que no se pueden recorrer por petición
+PREFIJO_PRECALCULADO = 4
+# Tamaño del top-N guardado por prefijo
+TOP_PRECALCULADO = 20
+# Entradas por bloque con peso máximo precalculado; para prefijos más largos
+# que PREFIJO_PRECALCULADO solo se abren los bloques que pueden entrar en el top
+BLOQUE_PESOS = 64
+# Segundos de espera antes de reconstruir, para agrupar varios cambios seguidos
+RETARDO_RECONSTRUCCION = 2.0
+
+
+class IndicePrefijos:
+    """
+    Array ordenado de claves para autocompletado con bisect.
+
+    Cada nombre aparece una vez por cada palabra en la que empieza, de modo que
+    "zel" encuentra "The Legend of Zelda". Las entradas se guardan codificadas
+    como (índice del nombre << 8 | desplazamiento) en un array compacto.
+    """
+
+    def __init__(self, filas: Iterable[Tuple[int, str, int]]):
+        self._ids = array("q")
+        self._pesos = array("q")
+        self._nombres: List[str] = []
+        self._normalizados: List[str] = []
+        entradas = []
+        for item_id, nombre, peso in filas:
+            idx = len(self._nombres)
+            normalizado = normalizar(nombre)
+            self._ids.append(item_id)
+            self._pesos.append(peso)
+            self._nombres.append(nombre)
+            self._normalizados.append(normalizado)
+            inicio = 0
+            for palabra in normalizado.split(" "):
+                if palabra and inicio < 256:
+                    entradas.append(idx << 8 | inicio)
+                inicio += len(palabra) + 1
+        entradas.sort(key=self._clave)
+        self._entradas = array("Q", entradas)
+        self._maximos = array("q", (
+            max(self._pesos[e >> 8] for e in self._entradas[i:i + BLOQUE_PESOS])
+            for i in range(0, len(self._entradas), BLOQUE_PESOS)
+        ))
+        self._top = self._precalcular()
+
+    def _clave(self, entrada: int) -> str:
+        return self._normalizados[entrada >> 8][entrada & 0xFF:]
+
+    def _precalcular(self) -> dict:
+        top = {}
+        orden = sorted(self._entradas, key=lambda e: -self._pesos[e >> 8])
+        for entrada in orden:
+            idx = entrada >> 8
+            clave = self._clave(entrada)
+            for longitud in range(1, min(len(clave), PREFIJO_PRECALCULADO) + 1):
+                lista = top.setdefault(clave[:longitud], [])
+                if len(lista) < TOP_PRECALCULADO and idx not in lista:
+                    lista.append(idx)
+        return top
+
+    def _mejores(self, inicio: int, fin: int, limite: int) -> List[int]:
+        """
+        Top por peso de las entradas [inicio, fin), de mayor a menor. Los
+        bloques completos entran en el heap con su peso máximo y solo se abren
+        al llegar a la cabeza, así que un rango enorme no se recorre entero.
+        """
+        pesos = self._pesos
+        primero = -(-inicio // BLOQUE_PESOS)
+        ultimo = fin // BLOQUE_PESOS
+        # (-peso, posición, tipo): 0 es un bloque por abrir, 1 una entrada
+        pendientes = []
+        if primero >= ultimo:
+            sueltas = range(inicio, fin)
+        else:
+            sueltas = list(range(inicio, primero * BLOQUE_PESOS)) + list(range(ultimo * BLOQUE_PESOS, fin))
+            pendientes.extend((-self._maximos[b], b * BLOQUE_PESOS, 0) for b in range(primero, ultimo))
+        pendientes.extend((-pesos[self._entradas[i] >> 8], i, 1) for i in sueltas)
+        heapq.heapify(pendientes)
+
+        indices = []
+        while pendientes and len(indices) < limite:
+            _, posicion, tipo = heapq.heappop(pendientes)
+            if tipo == 0:
+                for i in range(posicion, posicion + BLOQUE_PESOS):
+                    heapq.heappush(pendientes, (-pesos[self._entradas[i] >> 8], i, 1))
+                continue
+            idx = self._entradas[posicion] >> 8
+            if idx not in indices:
+                indices.append(idx)
+        return indices
+
+    def sugerir(self, prefijo: str, limite: int = 8) -> List[Tuple[int, str]]:
+        """Devuelve (id, nombre) de los elementos más populares que empiezan por el prefijo."""
+        prefijo = normalizar(prefijo)
+        if not prefijo:
+            return []
+        if len(prefijo) <= PREFIJO_PRECALCULADO:
+            indices = self._top.get(prefijo, [])[:limite]
+        else:
+            inicio = bisect_left(self._entradas, prefijo, key=self._clave)
+            fin = bisect_left(self._entradas, prefijo + "\uffff", lo=inicio, key=self._clave)
+            indices = self._mejores(inicio, fin, limite)
+        return [(self._ids[idx], self._nombres[idx]) for idx in indices]
+
+
+class SuggestService:
+    """Autocompletado de juegos, consolas y empresas servido desde memoria."""
+
+    _lock = threading.Lock()
+    _temporizador: Optional[threading.Timer] = None
+    _empresas: Optional[IndicePrefijos] = None
+    _consolas: Optional[IndicePrefijos] = None
+    _juegos: Optional[IndicePrefijos] = None
+
+    @staticmethod
+    def cargar(db: Optional[sqlite3.Connection] = None):
+        """Construye los índices de prefijos y los sustituye de forma atómica."""
+        if db is None:
+            with get_pool().lector() as conn:
+                return SuggestService.cargar(conn)
+        cursor = db.cursor()
+        # Empresas y consolas pesan por nº de juegos con ruta; los juegos, por
+        # tener ruta y después por el nº de consolas en las que salieron
+        cursor.execute("""
+            SELECT e.ID, e.NOMBRE, IFNULL(d.NUM_JUEGOS, 0)
+            FROM EMPRESAS e
+            LEFT JOIN EMPRESAS_DISPONIBLES d ON d.EMPRESA_ID = e.ID
+        """)
+        empresas = IndicePrefijos(cursor.fetchall())
+        cursor.execute("""
+            SELECT c.ID, c.NOMBRE, IFNULL(d.NUM_JUEGOS, 0)
+            FROM CONSOLAS c
+            LEFT JOIN CONSOLAS_DISPONIBLES d ON d.CONSOLA_ID = c.ID
+        """)
+        consolas = IndicePrefijos(cursor.fetchall())
+        cursor.execute("""
+            SELECT j.ID, j.NOMBRE,
+                   MAX(IFNULL(jc.RUTA_NUBE, '') != '') * 1000 + COUNT(jc.CONSOLA_ID)
+            FROM JUEGOS j
+            LEFT JOIN JUEGOS_CONSOLAS jc ON j.ID = jc.JUEGO_ID
+            GROUP BY j.ID
+        """)
+        juegos = IndicePrefijos(cursor)
+        with SuggestService._lock:
+            SuggestService._empresas, SuggestService._consolas, SuggestService._juegos = empresas, consolas, juegos
+
+    @staticmethod
+    def cargar_en_segundo_plano():
+        """Construye los índices en un hilo aparte para no retrasar el arranque."""
+        threading.Thread(target=SuggestService.cargar, name="suggest-index", daemon=True).start()
+
+    @staticmethod
+    def invalidar():
+        """
+        Programa una reconstrucción tras un cambio en el catálogo. Mientras
+        tanto se sigue sirviendo el índice anterior.
+        """
+        with SuggestService._lock:
+            if SuggestService._temporizador is not None:
+                SuggestService._temporizador.cancel()
+            temporizador = threading.Timer(RETARDO_RECONSTRUCCION, SuggestService.cargar)
+            temporizador.daemon = True
+            temporizador.start()
+            SuggestService._temporizador = temporizador
+
+    @staticmethod
+    def sugerir(query: str, limite: int = 8) -> dict:
+        """Devuelve las mejores compleciones de juegos, consolas y empresas."""
+        result = {
+            "games": [],
+            "consoles": [],
+            "companies": []
+        }
+        if SuggestService._juegos is None:
+            return result
+        for clave, indice in (("games", SuggestService._juegos),
+                              ("consoles", SuggestService._consolas),
+                              ("companies", SuggestService._empresas)):
+            result[clave] = [{"id": item_id, "name": nombre} for item_id, nombre in indice.sugerir(query, limite)]
+        return result
+
+
+CatalogoVersion.suscribir(SuggestService.invalidar)